@@ -4,10 +4,12 @@
 from dataclasses import dataclass
 from typing import List, Tuple, Dict, Optional
 from datetime import datetime
-import geopy.distance
 from geopy.geocoders import Nominatim
 import folium
 import json
+from MiniProject_SB1c_DistanceKernels import ThresholdedDistance
+import logging
+from MiniProject_SB7_Metrics import timed, get_logger, configure_logging, EventLogger, LazyMessage
 
 @dataclass
 class Location:
@@ -36,23 +38,30 @@ class ResourceCenter:
     inventory: Dict[str, int]  # resource_name: quantity
 
 class GISService:
-    def __init__(self):
+    def __init__(self, distance_kernel: str = "haversine"):
         self.farms: Dict[str, Farm] = {}
         self.resource_centers: Dict[str, ResourceCenter] = {}
+        # Fast kernel with automatic exact-geodesic fallback near the radius thresholds
+        self.distance = ThresholdedDistance(distance_kernel)
         self.geocoder = Nominatim(user_agent="agricultural_management_system")
+        self.logger = get_logger("gis")
+        self.events = EventLogger(self.logger)
         
     def register_farm(self, farm: Farm) -> str:
         """Register a new farm in the system"""
         self.farms[farm.farmer_id] = farm
-        print(f"Farm registered successfully! Farmer ID: {farm.farmer_id}")
+        self.events.event("farm_registered", "Farm registered successfully! Farmer ID: %s",
+                          farm.farmer_id, level=logging.INFO, farmer_id=farm.farmer_id)
         return farm.farmer_id
     
     def register_resource_center(self, center: ResourceCenter) -> str:
         """Register a new resource center"""
         self.resource_centers[center.center_id] = center
-        print(f"Resource center registered successfully! Center ID: {center.center_id}")
+        self.events.event("center_registered", "Resource center registered successfully! Center ID: %s",
+                          center.center_id, level=logging.INFO, center_id=center.center_id)
         return center.center_id
     
+    @timed("gis.geocode_address")
     def geocode_address(self, address: str) -> Optional[Location]:
         """Convert address to coordinates"""
         try:
@@ -64,18 +73,21 @@ class GISService:
                     address=address
                 )
         except Exception as e:
-            print(f"Geocoding error: {e}")
+            self.logger.warning("Geocoding error: %s", e)
         return None
     
-    def calculate_distance(self, point1: Location, point2: Location) -> float:
-        """Calculate distance between two points in kilometers"""
-        distance = geopy.distance.geodesic(
-            (point1.latitude, point1.longitude),
-            (point2.latitude, point2.longitude)
-        ).kilometers
-        print(f"Distance calculated: {distance:.2f} km")
+    @timed("gis.calculate_distance")
+    def calculate_distance(self, point1: Location, point2: Location, thresholds: Optional[Tuple[float, ...]] = None) -> float:
+        """Calculate distance between two points in kilometers (exact when close to any of the thresholds)"""
+        distance = self.distance.distance(
+            point1.latitude, point1.longitude,
+            point2.latitude, point2.longitude,
+            thresholds
+        )
+        self.events.event("distance_calculated", "Distance calculated: %.2f km", distance)
         return distance
     
+    @timed("gis.find_nearest_centers")
     def find_nearest_centers(self, 
                            farmer_location: Location, 
                            radius: float,
@@ -84,7 +96,7 @@ class GISService:
         nearby_centers = []
         
         for center in self.resource_centers.values():
-            distance = self.calculate_distance(farmer_location, center.location)
+            distance = self.calculate_distance(farmer_location, center.location, thresholds=(radius,))
             if distance <= radius:
                 if service_type is None or service_type in center.services:
                     nearby_centers.append((distance, center))
@@ -93,15 +105,19 @@ class GISService:
         nearby_centers.sort(key=lambda x: x[0])
         centers = [center for _, center in nearby_centers]
         
-        print(f"\nFound {len(centers)} centers within {radius} km radius:")
-        for i, center in enumerate(centers, 1):
-            print(f"{i}. Center ID: {center.center_id}")
-            print(f"   Services: {', '.join(center.services)}")
-            print(f"   Operating Hours: {center.operating_hours}")
-            print(f"   Contact: {center.contact_info}\n")
-            
+        self.events.event("nearest_centers_found", "%s", LazyMessage(self._describe_centers, centers, radius),
+                          level=logging.INFO, found=len(centers), radius=radius)
         return centers
 
+    def _describe_centers(self, centers: List[ResourceCenter], radius: float) -> str:
+        lines = [f"\nFound {len(centers)} centers within {radius} km radius:"]
+        for i, center in enumerate(centers, 1):
+            lines.append(f"{i}. Center ID: {center.center_id}")
+            lines.append(f"   Services: {', '.join(center.services)}")
+            lines.append(f"   Operating Hours: {center.operating_hours}")
+            lines.append(f"   Contact: {center.contact_info}\n")
+        return "\n".join(lines)
+
     def display_farm_info(self, farmer_id: str):
         """Display detailed information about a farm"""
         farm = self.farms.get(farmer_id)
@@ -116,6 +132,7 @@ class GISService:
         else:
             print(f"Farm not found with ID: {farmer_id}")
 
+    @timed("gis.calculate_coverage_statistics")
     def calculate_coverage_statistics(self) -> Dict:
         """Calculate coverage statistics for resource centers"""
         total_farms = len(self.farms)
@@ -127,13 +144,16 @@ class GISService:
             if nearest_centers:
                 distance_to_nearest = self.calculate_distance(
                     farm.location, 
-                    nearest_centers[0].location
+                    nearest_centers[0].location,
+                    thresholds=(10, 25)
                 )
                 if distance_to_nearest <= 10:
                     farms_within_10km += 1
                 if distance_to_nearest <= 25:
                     farms_within_25km += 1
-                    
+        
+        self.events.event("coverage_calculated", "Coverage calculated for %d farms and %d centers",
+                          total_farms, len(self.resource_centers), level=logging.INFO, sample=False)
         return {
             "total_farms": total_farms,
             "farms_within_10km": farms_within_10km,
@@ -146,6 +166,7 @@ class GISService:
 # Test code
 def run_test():
     print("Starting GIS Service Test...\n")
+    configure_logging("INFO")
     
     # Initialize the service
     gis_service = GISService()
@@ -198,6 +219,10 @@ def run_test():
             print(f"{key}: {value:.1f}%")
         else:
             print(f"{key}: {value}")
+    
+    # One line per event type instead of the per-call output
+    print("\nEvent Summary:")
+    gis_service.events.log_summary()
 
 if __name__ == "__main__":
     run_test()
\ No newline at end of file
@@ -1,15 +1,21 @@
 # GIS service test (farm registered, farm info, search nearby resource, description of those nearby centers, calculate distance 
 # - for 10km and 25km radius & coverage statistics) - with respect to haryana data set 
 
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from typing import List, Tuple, Dict, Optional
 from datetime import datetime
-import geopy.distance
 from geopy.geocoders import Nominatim
 import folium
 import json
 import pandas as pd
 import random
+import math
+import heapq
+from MiniProject_SB7_Metrics import timed, get_logger, configure_logging, EventLogger, increment
+from MiniProject_SB1c_DistanceKernels import ThresholdedDistance
+from MiniProject_SB1j_DistrictBoundaries import DistrictResolver, DISTRICT_BOUNDARIES_PATH
+from MiniProject_SB1k_RegistrySnapshot import save_snapshot, load_snapshot
+from MiniProject_SB1m_DistrictMaps import generate_district_maps, DEFAULT_MAP_DIR
 
 @dataclass
 class Location:
@@ -43,11 +49,71 @@ class ResourceCenter:
     contact_info: str
     inventory: Dict[str, int]  # resource_name: quantity
 
+COVERAGE_RADII = (10, 25)  # km thresholds reported by the coverage statistics
+KM_PER_DEGREE_LAT = 111.32
+
+class SpatialGrid:
+    """Fixed-size lat/lon grid mapping cells to the ids of the points inside them, for radius queries"""
+    def __init__(self, cell_size: float = 0.2):
+        self.cell_size = cell_size  # degrees
+        self.cells: Dict[Tuple[int, int], List[str]] = {}
+    
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return int(math.floor(latitude / self.cell_size)), int(math.floor(longitude / self.cell_size))
+    
+    def insert(self, key: str, location: Location):
+        self.cells.setdefault(self._cell(location.latitude, location.longitude), []).append(key)
+    
+    def remove(self, key: str, location: Location):
+        cell = self._cell(location.latitude, location.longitude)
+        keys = self.cells.get(cell)
+        if keys and key in keys:
+            keys.remove(key)
+            if not keys:
+                del self.cells[cell]
+    
+    def query(self, location: Location, radius: float) -> List[str]:
+        """Ids of every point in the cells overlapping the bounding box of the radius (a superset of the answer)"""
+        # 1% margin covers the difference between this spherical box and the geodesic distance
+        lat_span = radius * 1.01 / KM_PER_DEGREE_LAT
+        max_lat = min(abs(location.latitude) + lat_span, 89.9)
+        lon_span = radius * 1.01 / (KM_PER_DEGREE_LAT * math.cos(math.radians(max_lat)))
+        lat_lo, lon_lo = self._cell(location.latitude - lat_span, location.longitude - lon_span)
+        lat_hi, lon_hi = self._cell(location.latitude + lat_span, location.longitude + lon_span)
+        keys = []
+        for i in range(lat_lo, lat_hi + 1):
+            for j in range(lon_lo, lon_hi + 1):
+                keys.extend(self.cells.get((i, j), ()))
+        return keys
+
 class HaryanaGISService:
-    def __init__(self):
+    def __init__(self, distance_kernel: str = "haversine"):
         self.farms: Dict[str, Farm] = {}
         self.resource_centers: Dict[str, ResourceCenter] = {}
+        # Fast kernel with automatic exact-geodesic fallback near the coverage / radius thresholds
+        self.distance = ThresholdedDistance(distance_kernel)
+        # Incrementally maintained coverage: nearest center within the largest coverage radius per farm,
+        # the farms assigned to each center, and per-district counters
+        self.farm_assignments: Dict[str, Tuple[Optional[str], float]] = {}
+        self.center_farms: Dict[str, set] = {}
+        self.district_counters: Dict[str, Dict[str, int]] = {}
+        self.farm_grid = SpatialGrid()
+        self.center_grid = SpatialGrid()
+        # (latitude, longitude, district) each farm was indexed under, so re-registering a farm whose
+        # Location was changed in place still removes it from its old grid cell and district
+        self.farm_positions: Dict[str, Tuple[float, float, str]] = {}
+        # Likewise (latitude, longitude, district, services) each center was indexed under
+        self.center_positions: Dict[str, Tuple[float, float, str, Tuple[str, ...]]] = {}
+        # Inverted indexes: service name / in-stock inventory item / district -> ids
+        self.service_index: Dict[str, set] = {}
+        self.inventory_index: Dict[str, set] = {}
+        self.center_district_index: Dict[str, set] = {}
+        self.farm_district_index: Dict[str, set] = {}
         self.geocoder = Nominatim(user_agent="haryana_agricultural_management_system")
+        # District polygons for tagging coordinates; see attach_district_boundaries
+        self.district_resolver: Optional[DistrictResolver] = None
+        self.logger = get_logger("gis")
+        self.events = EventLogger(self.logger)
         self.district_coordinates = {
             # Approximate coordinates for Haryana districts
             "Ambala": (30.3752, 76.7821),
@@ -74,12 +140,14 @@ class HaryanaGISService:
             "Yamunanagar": (30.1290, 77.2674)
         }
         
+    @timed("gis.load_haryana_data")
     def load_haryana_data(self, csv_file_path: str):
         """Load data from Haryana agricultural dataset CSV"""
         try:
             df = pd.read_csv(csv_file_path)
-            print(f"Successfully loaded data from {csv_file_path}")
-            print(f"Total districts: {df['District'].nunique()}")
+            df.columns = df.columns.str.strip()
+            self.logger.info("Successfully loaded data from %s", csv_file_path)
+            self.logger.info("Total districts: %d", df['District'].nunique())
             
             farmer_id_counter = 1
             for _, row in df.dropna(subset=['District']).iterrows():
@@ -121,7 +189,7 @@ class HaryanaGISService:
                     self.register_farm(farm)
                     farmer_id_counter += 1
                     
-            print(f"Successfully registered {len(self.farms)} farms")
+            self.logger.info("Successfully registered %d farms", len(self.farms))
             
             # Create resource centers (one per district)
             center_id_counter = 1
@@ -140,10 +208,9 @@ class HaryanaGISService:
                 )
                 
                 # Create service list based on main crops in the district
-                district_farms = [farm for farm in self.farms.values() if farm.location.district == district]
-                district_crops = []
-                for farm in district_farms:
-                    district_crops.extend(farm.crop_types)
+                district_crops = set()
+                for farmer_id in self.farm_district_index.get(district, ()):
+                    district_crops.update(self.farms[farmer_id].crop_types)
                 
                 # Default services
                 services = ["soil_testing", "equipment_rental", "fertilizer_distribution"]
@@ -172,10 +239,10 @@ class HaryanaGISService:
                 self.register_resource_center(center)
                 center_id_counter += 1
                 
-            print(f"Successfully registered {len(self.resource_centers)} resource centers")
+            self.logger.info("Successfully registered %d resource centers", len(self.resource_centers))
             
         except Exception as e:
-            print(f"Error loading data: {e}")
+            self.logger.error("Error loading data: %s", e)
     
     def generate_inventory(self, services: List[str]) -> Dict[str, int]:
         """Generate inventory based on services offered"""
@@ -199,38 +266,265 @@ class HaryanaGISService:
         
         return inventory
         
+    def save_snapshot(self, path: str = "agrihub_registry.snap") -> Dict:
+        """Write the full registry to a binary snapshot that from_snapshot() restores exactly"""
+        return save_snapshot(self, path)
+    
+    @classmethod
+    def from_snapshot(cls, path: str = "agrihub_registry.snap") -> "HaryanaGISService":
+        """Restore a registry saved by save_snapshot() without reparsing the CSV or regenerating farms"""
+        return load_snapshot(path)
+    
+    def attach_district_boundaries(self, path: str = DISTRICT_BOUNDARIES_PATH,
+                                   allow_approximate: bool = False) -> DistrictResolver:
+        """Resolve districts from coordinates against boundary polygons for farms registered without one.
+        Needs surveyed boundaries at `path`; the shipped placeholder only loads with allow_approximate=True"""
+        self.district_resolver = DistrictResolver(path, allow_approximate=allow_approximate)
+        if self.district_resolver.approximate:
+            self.logger.warning("District boundaries in %s are approximate (nearest-centroid); districts near "
+                                "borders may be wrong", path)
+        return self.district_resolver
+    
+    def tag_districts(self, locations: List[Location], overwrite: bool = False) -> int:
+        """Set the district of many locations in one vectorized lookup (only blank ones unless overwrite);
+        returns how many were tagged"""
+        if self.district_resolver is None:
+            raise ValueError("No district boundaries attached; call attach_district_boundaries() first")
+        targets = [location for location in locations if overwrite or not location.district]
+        if not targets:
+            return 0
+        districts = self.district_resolver.resolve_many([l.latitude for l in targets], [l.longitude for l in targets])
+        tagged = 0
+        for location, district in zip(targets, districts):
+            if district is not None:
+                location.district = district
+                tagged += 1
+        return tagged
+    
+    def register_farms(self, farms: List[Farm]) -> List[str]:
+        """Register many farms, resolving missing districts in bulk first"""
+        if self.district_resolver is not None:
+            farms = list(farms)
+            blank = [i for i, farm in enumerate(farms) if not farm.location.district]
+            if blank:
+                districts = self.district_resolver.resolve_many([farms[i].location.latitude for i in blank],
+                                                                [farms[i].location.longitude for i in blank])
+                for i, district in zip(blank, districts):
+                    if district is not None:
+                        farms[i] = self._with_district(farms[i], district)
+        return [self.register_farm(farm) for farm in farms]
+    
+    @staticmethod
+    def _with_district(farm: Farm, district: str) -> Farm:
+        # The caller's Farm and Location stay untouched; the registry keeps the tagged copy
+        return replace(farm, location=replace(farm.location, district=district))
+    
     def register_farm(self, farm: Farm) -> str:
-        """Register a new farm in the system"""
+        """Register a new farm in the system. A farm without a district is stored as a copy tagged from the
+        attached boundaries (see self.farms[farmer_id]); the farm passed in is not modified"""
+        if not farm.location.district and self.district_resolver is not None:
+            district = self.district_resolver.resolve(farm.location.latitude, farm.location.longitude)
+            if district is not None:
+                farm = self._with_district(farm, district)
+        if farm.farmer_id in self.farms:
+            self._unregister_farm(farm.farmer_id)
         self.farms[farm.farmer_id] = farm
+        self.farm_grid.insert(farm.farmer_id, farm.location)
+        self.farm_positions[farm.farmer_id] = (farm.location.latitude, farm.location.longitude, farm.location.district)
+        self.farm_district_index.setdefault(farm.location.district, set()).add(farm.farmer_id)
+        
+        # Only this farm's nearest center needs computing
+        counters = self._district_counters(farm.location.district)
+        counters["total_farms"] += 1
+        self._assign_farm(farm.farmer_id, *self._nearest_center_within(farm.location, max(COVERAGE_RADII)))
+        
+        self.events.event("farm_registered", "Farm registered: %s", farm.farmer_id, farmer_id=farm.farmer_id)
         return farm.farmer_id
     
     def register_resource_center(self, center: ResourceCenter) -> str:
         """Register a new resource center"""
+        if center.center_id in self.resource_centers:
+            self._unregister_center(center.center_id)
         self.resource_centers[center.center_id] = center
+        self.center_grid.insert(center.center_id, center.location)
+        self.center_positions[center.center_id] = (center.location.latitude, center.location.longitude,
+                                                   center.location.district, tuple(center.services))
+        self._index_center(center)
+        
+        # Only farms within the coverage radius of the new center can get a closer center
+        farmer_ids = self.farm_grid.query(center.location, max(COVERAGE_RADII))
+        if farmer_ids:
+            locations = [self.farms[farmer_id].location for farmer_id in farmer_ids]
+            distances = self.distance.distances(
+                center.location.latitude, center.location.longitude,
+                [location.latitude for location in locations],
+                [location.longitude for location in locations],
+                COVERAGE_RADII
+            )
+            for farmer_id, distance in zip(farmer_ids, distances.tolist()):
+                if distance <= max(COVERAGE_RADII) and distance < self.farm_assignments[farmer_id][1]:
+                    self._assign_farm(farmer_id, center.center_id, distance)
+        
+        self.events.event("center_registered", "Resource center registered: %s", center.center_id,
+                          center_id=center.center_id)
         return center.center_id
     
+    def _district_counters(self, district: str) -> Dict[str, int]:
+        if district not in self.district_counters:
+            self.district_counters[district] = {"total_farms": 0}
+            for radius in COVERAGE_RADII:
+                self.district_counters[district][f"farms_within_{radius}km"] = 0
+        return self.district_counters[district]
+    
+    def _nearest_center_within(self, location: Location, radius: float) -> Tuple[Optional[str], float]:
+        best_id, best_distance = None, math.inf
+        for center_id in self.center_grid.query(location, radius):
+            distance = self.calculate_distance(location, self.resource_centers[center_id].location, COVERAGE_RADII)
+            if distance <= radius and distance < best_distance:
+                best_id, best_distance = center_id, distance
+        return best_id, best_distance
+    
+    def _assign_farm(self, farmer_id: str, center_id: Optional[str], distance: float,
+                     district: Optional[str] = None):
+        """Point a farm at a (possibly new) nearest center and move the district counters with it"""
+        if district is None:
+            district = self.farms[farmer_id].location.district
+        counters = self._district_counters(district)
+        old_center_id, old_distance = self.farm_assignments.get(farmer_id, (None, math.inf))
+        if old_center_id is not None:
+            self.center_farms[old_center_id].discard(farmer_id)
+        for radius in COVERAGE_RADII:
+            counters[f"farms_within_{radius}km"] += (distance <= radius) - (old_distance <= radius)
+        self.farm_assignments[farmer_id] = (center_id, distance)
+        if center_id is not None:
+            self.center_farms.setdefault(center_id, set()).add(farmer_id)
+    
+    def _unregister_farm(self, farmer_id: str):
+        farm = self.farms[farmer_id]
+        # Farms restored from a snapshot have no recorded position; theirs is the one they were loaded with
+        latitude, longitude, district = self.farm_positions.pop(
+            farmer_id, (farm.location.latitude, farm.location.longitude, farm.location.district))
+        self._assign_farm(farmer_id, None, math.inf, district)
+        self._district_counters(district)["total_farms"] -= 1
+        del self.farm_assignments[farmer_id]
+        self.farm_grid.remove(farmer_id, Location(latitude, longitude))
+        self.farm_district_index[district].discard(farmer_id)
+        del self.farms[farmer_id]
+    
+    def _unregister_center(self, center_id: str):
+        center = self.resource_centers.pop(center_id)
+        # Centers restored from a snapshot have no recorded position; theirs is the one they were loaded with
+        latitude, longitude, district, services = self.center_positions.pop(
+            center_id, (center.location.latitude, center.location.longitude, center.location.district,
+                        tuple(center.services)))
+        self.center_grid.remove(center_id, Location(latitude, longitude))
+        self._unindex_center(center_id, services, district)
+        # Farms that relied on this center fall back to their next nearest one
+        for farmer_id in self.center_farms.pop(center_id, set()):
+            self.farm_assignments[farmer_id] = (None, self.farm_assignments[farmer_id][1])
+            self._assign_farm(farmer_id, *self._nearest_center_within(self.farms[farmer_id].location, max(COVERAGE_RADII)))
+    
+    def _index_center(self, center: ResourceCenter):
+        for service in center.services:
+            self.service_index.setdefault(service, set()).add(center.center_id)
+        for item, quantity in center.inventory.items():
+            if quantity > 0:
+                self.inventory_index.setdefault(item, set()).add(center.center_id)
+        self.center_district_index.setdefault(center.location.district, set()).add(center.center_id)
+    
+    def _unindex_center(self, center_id: str, services: Tuple[str, ...], district: str):
+        for service in services:
+            self.service_index.get(service, set()).discard(center_id)
+        for center_ids in self.inventory_index.values():
+            center_ids.discard(center_id)
+        self.center_district_index.get(district, set()).discard(center_id)
+    
+    def update_inventory(self, center_id: str, item: str, quantity: int):
+        """Set the stock of an item; inventory changes must go through here (or adjust_inventory) to keep the index current"""
+        center = self.resource_centers[center_id]
+        center.inventory[item] = quantity
+        if quantity > 0:
+            self.inventory_index.setdefault(item, set()).add(center_id)
+        else:
+            self.inventory_index.get(item, set()).discard(center_id)
+    
+    def adjust_inventory(self, center_id: str, item: str, delta: int) -> int:
+        """Add (or with a negative delta, remove) stock of an item and return the new quantity"""
+        quantity = self.resource_centers[center_id].inventory.get(item, 0) + delta
+        if quantity < 0:
+            raise ValueError(f"Insufficient {item} at {center_id}: {quantity - delta} in stock, {-delta} requested")
+        self.update_inventory(center_id, item, quantity)
+        return quantity
+    
+    def query_center_ids(self,
+                         services: Optional[List[str]] = None,
+                         items: Optional[List[str]] = None,
+                         district: Optional[str] = None) -> set:
+        """Ids of centers offering every service, with every item in stock, in the district (set intersections)"""
+        sets = [self.service_index.get(service, set()) for service in services or []]
+        sets += [self.inventory_index.get(item, set()) for item in items or []]
+        if district is not None:
+            sets.append(self.center_district_index.get(district, set()))
+        if not sets:
+            return set(self.resource_centers)
+        sets.sort(key=len)
+        return set(sets[0]).intersection(*sets[1:])
+    
+    def query_centers(self,
+                      services: Optional[List[str]] = None,
+                      items: Optional[List[str]] = None,
+                      district: Optional[str] = None,
+                      location: Optional[Location] = None,
+                      radius: Optional[float] = None) -> List[Tuple[Optional[float], ResourceCenter]]:
+        """Centers matching the index filters, optionally restricted to a radius around a location
+        (sorted by distance then); e.g. query_centers(services=["wheat_seed_distribution"], district="Karnal")"""
+        center_ids = self.query_center_ids(services, items, district)
+        if location is None or radius is None:
+            return [(None, self.resource_centers[center_id]) for center_id in sorted(center_ids)]
+        
+        nearby = []
+        for center_id in self.center_grid.query(location, radius):
+            if center_id in center_ids:
+                distance = self.calculate_distance(location, self.resource_centers[center_id].location, (radius,))
+                if distance <= radius:
+                    nearby.append((distance, self.resource_centers[center_id]))
+        nearby.sort(key=lambda x: x[0])
+        return nearby
+    
+    def get_farm_assignment(self, farmer_id: str) -> Tuple[Optional[str], float]:
+        """Nearest center id and its distance for a farm (None, inf when no center is within 25 km)"""
+        return self.farm_assignments[farmer_id]
+    
+    @timed("gis.geocode_address")
     def geocode_address(self, address: str) -> Optional[Location]:
         """Convert address to coordinates"""
         try:
             location = self.geocoder.geocode(address)
             if location:
+                district = ""
+                if self.district_resolver is not None:
+                    district = self.district_resolver.resolve(location.latitude, location.longitude) or ""
                 return Location(
                     latitude=location.latitude,
                     longitude=location.longitude,
-                    address=address
+                    address=address,
+                    district=district
                 )
         except Exception as e:
-            print(f"Geocoding error: {e}")
+            self.logger.warning("Geocoding error: %s", e)
         return None
     
-    def calculate_distance(self, point1: Location, point2: Location) -> float:
-        """Calculate distance between two points in kilometers"""
-        distance = geopy.distance.geodesic(
-            (point1.latitude, point1.longitude),
-            (point2.latitude, point2.longitude)
-        ).kilometers
+    @timed("gis.calculate_distance")
+    def calculate_distance(self, point1: Location, point2: Location, thresholds: Optional[Tuple[float, ...]] = None) -> float:
+        """Calculate distance between two points in kilometers (exact when close to any of the thresholds)"""
+        distance = self.distance.distance(
+            point1.latitude, point1.longitude,
+            point2.latitude, point2.longitude,
+            thresholds
+        )
         return distance
     
+    @timed("gis.find_nearest_centers")
     def find_nearest_centers(self, 
                            farm_location: Location, 
                            radius: float,
@@ -238,17 +532,86 @@ class HaryanaGISService:
         """Find resource centers within specified radius"""
         nearby_centers = []
         
-        for center in self.resource_centers.values():
-            distance = self.calculate_distance(farm_location, center.location)
+        offering = self.service_index.get(service_type, set()) if service_type is not None else None
+        for center_id in self.center_grid.query(farm_location, radius):
+            if offering is not None and center_id not in offering:
+                continue
+            center = self.resource_centers[center_id]
+            distance = self.calculate_distance(farm_location, center.location, (radius,))
             if distance <= radius:
-                if service_type is None or service_type in center.services:
-                    nearby_centers.append((distance, center))
+                nearby_centers.append((distance, center))
         
         # Sort by distance
         nearby_centers.sort(key=lambda x: x[0])
         
         return nearby_centers
     
+    @staticmethod
+    def center_matches(center: ResourceCenter,
+                       services: Optional[List[str]] = None,
+                       min_inventory: Optional[Dict[str, int]] = None) -> bool:
+        """True if the center offers every service and holds at least the given quantity of every item"""
+        if services and not all(service in center.services for service in services):
+            return False
+        if min_inventory and any(center.inventory.get(item, 0) < quantity for item, quantity in min_inventory.items()):
+            return False
+        return True
+    
+    @timed("gis.find_k_nearest_centers")
+    def find_k_nearest_centers(self,
+                               farm_location: Location,
+                               k: int = 3,
+                               services: Optional[List[str]] = None,
+                               min_inventory: Optional[Dict[str, int]] = None,
+                               initial_radius: float = 10,
+                               max_radius: Optional[float] = None) -> List[Tuple[float, ResourceCenter]]:
+        """The k nearest centers offering all `services` and holding at least `min_inventory`,
+        e.g. k=3, min_inventory={"harvesters": 1}. The search radius doubles until k matches are
+        confirmed, so only the centers near the farm are examined"""
+        if not initial_radius > 0:  # doubling a zero (or NaN) radius never grows the search
+            raise ValueError(f"initial_radius must be positive, got {initial_radius}")
+        if k <= 0 or not self.resource_centers:
+            return []
+        
+        # Candidates from the inverted indexes; quantities are still checked per center
+        candidates = self.query_center_ids(services, list(min_inventory or {}))
+        if not candidates:
+            return []
+        
+        heap: List[Tuple[float, str]] = []  # bounded max-heap of the k best (-distance, center_id)
+        seen = set()
+        examined = 0
+        radius = initial_radius
+        while True:
+            for center_id in self.center_grid.query(farm_location, radius):
+                if center_id in seen or center_id not in candidates:
+                    continue
+                seen.add(center_id)
+                center = self.resource_centers[center_id]
+                # Cheap quantity filter before the distance computation
+                if not self.center_matches(center, None, min_inventory):
+                    continue
+                examined += 1
+                distance = self.calculate_distance(farm_location, center.location,
+                                                   (max_radius,) if max_radius is not None else None)
+                if len(heap) < k:
+                    heapq.heappush(heap, (-distance, center_id))
+                elif distance < -heap[0][0]:
+                    heapq.heapreplace(heap, (-distance, center_id))
+            
+            # Every center within `radius` has been seen, so results inside it are final
+            if len(heap) == k and -heap[0][0] <= radius:
+                break
+            if len(seen) == len(candidates) or (max_radius is not None and radius >= max_radius):
+                break
+            radius = radius * 2 if max_radius is None else min(radius * 2, max_radius)
+        
+        increment("gis.knn_centers_examined", examined)
+        results = sorted((-neg_distance, center_id) for neg_distance, center_id in heap)
+        if max_radius is not None:
+            results = [(d, c) for d, c in results if d <= max_radius]
+        return [(distance, self.resource_centers[center_id]) for distance, center_id in results]
+    
     def display_farm_info(self, farmer_id: str):
         """Display detailed information about a farm"""
         farm = self.farms.get(farmer_id)
@@ -295,36 +658,18 @@ class HaryanaGISService:
         else:
             print(f"Farm not found with ID: {farmer_id}")
 
+    @timed("gis.calculate_coverage_statistics")
     def calculate_coverage_statistics(self) -> Dict:
         """Calculate coverage statistics for resource centers"""
+        # Read from the counters kept up to date by register_farm / register_resource_center, O(districts)
         total_farms = len(self.farms)
-        farms_within_10km = 0
-        farms_within_25km = 0
-        
-        district_coverage = {}
-        
-        for farm in self.farms.values():
-            nearest_centers = self.find_nearest_centers(farm.location, radius=25)
-            
-            # Initialize district coverage if not exists
-            district = farm.location.district
-            if district not in district_coverage:
-                district_coverage[district] = {
-                    "total_farms": 0,
-                    "farms_within_10km": 0,
-                    "farms_within_25km": 0
-                }
-            
-            district_coverage[district]["total_farms"] += 1
-            
-            if nearest_centers:
-                distance_to_nearest = nearest_centers[0][0]  # Get distance from tuple
-                if distance_to_nearest <= 10:
-                    farms_within_10km += 1
-                    district_coverage[district]["farms_within_10km"] += 1
-                if distance_to_nearest <= 25:
-                    farms_within_25km += 1
-                    district_coverage[district]["farms_within_25km"] += 1
+        district_coverage = {
+            district: dict(counters)
+            for district, counters in self.district_counters.items()
+            if counters["total_farms"] > 0
+        }
+        farms_within_10km = sum(c["farms_within_10km"] for c in district_coverage.values())
+        farms_within_25km = sum(c["farms_within_25km"] for c in district_coverage.values())
         
         # Calculate percentages for each district
         for district in district_coverage:
@@ -350,6 +695,7 @@ class HaryanaGISService:
             "district_coverage": district_coverage
         }
     
+    @timed("gis.generate_map")
     def generate_map(self, output_file: str = "haryana_agricultural_map.html"):
         """Generate an interactive map showing farms and resource centers"""
         # Create a map centered around Haryana
@@ -390,11 +736,18 @@ class HaryanaGISService:
         
         # Save the map
         m.save(output_file)
-        print(f"Map generated and saved to {output_file}")
+        self.logger.info("Map generated and saved to %s", output_file)
+    
+    def generate_district_maps(self, output_dir: str = DEFAULT_MAP_DIR, workers: Optional[int] = None) -> Dict:
+        """One map per district plus an index page, rendered in parallel on a process pool"""
+        summary = generate_district_maps(self, output_dir, workers)
+        self.logger.info("%d district maps generated in %s", len(summary["maps"]), output_dir)
+        return summary
 
 # Test code with the specific file path
 def run_haryana_test():
     print("Starting Haryana GIS Service Test...\n")
+    configure_logging("INFO")
     
     # Initialize the service
     gis_service = HaryanaGISService()
@@ -431,6 +784,71 @@ def run_haryana_test():
     
     # Generate interactive map
     gis_service.generate_map()
+    
+    # One line per event type instead of the per-call output
+    print("\nEvent Summary:")
+    gis_service.events.log_summary()
+
+# Move test - relocate registered centers in place, re-register them and check grid, indexes and coverage
+# counters against a full recompute
+def run_center_move_test(farm_count: int = 3000, center_count: int = 60, moves: int = 20, seed: int = 42):
+    print("Starting Center Move Test...\n")
+    rng = random.Random(seed)
+    service = HaryanaGISService()
+    districts = list(service.district_coordinates)
+    services = ["Soil Testing", "Seed Supply", "Equipment Rental", "Training"]
+
+    def random_location(district: str) -> Location:
+        latitude, longitude = service.district_coordinates[district]
+        return Location(latitude + rng.uniform(-0.3, 0.3), longitude + rng.uniform(-0.3, 0.3), district=district)
+
+    for i in range(center_count):
+        service.register_resource_center(ResourceCenter(
+            random_location(rng.choice(districts)), f"C{i:03d}", rng.sample(services, 2), "9 AM - 5 PM", "",
+            {"seeds": rng.randint(0, 5)}))
+    for i in range(farm_count):
+        service.register_farm(Farm(random_location(rng.choice(districts)), rng.uniform(1.0, 10.0), f"F{i:05d}",
+                                   ["Wheat"], "Loamy", "Rabi", "", "", "", "", datetime.now()))
+
+    # Move in place: mutate the registered objects, then register them again
+    for center_id in rng.sample(sorted(service.resource_centers), moves):
+        center = service.resource_centers[center_id]
+        district = rng.choice(districts)
+        moved = random_location(district)
+        center.location.latitude, center.location.longitude, center.location.district = \
+            moved.latitude, moved.longitude, district
+        center.services[:] = rng.sample(services, 2)
+        service.register_resource_center(center)
+
+    grid = {}
+    for cell, center_ids in service.center_grid.cells.items():
+        for center_id in center_ids:
+            grid.setdefault(center_id, []).append(cell)
+    grid_ok = all(grid.get(center_id) == [service.center_grid._cell(c.location.latitude, c.location.longitude)]
+                  for center_id, c in service.resource_centers.items())
+    index_ok = all(
+        {center_id for center_id, c in service.resource_centers.items() if name in c.services} == ids
+        for name, ids in service.service_index.items()) and all(
+        {center_id for center_id, c in service.resource_centers.items() if c.location.district == district} == ids
+        for district, ids in service.center_district_index.items())
+
+    expected: Dict[str, Dict[str, int]] = {}
+    for farm in service.farms.values():
+        nearest = min(service.calculate_distance(farm.location, c.location, COVERAGE_RADII)
+                      for c in service.resource_centers.values())
+        counters = expected.setdefault(farm.location.district, {"total_farms": 0, **{
+            f"farms_within_{radius}km": 0 for radius in COVERAGE_RADII}})
+        counters["total_farms"] += 1
+        for radius in COVERAGE_RADII:
+            counters[f"farms_within_{radius}km"] += nearest <= radius
+    actual = {district: counters for district, counters in service.district_counters.items()
+              if counters["total_farms"] > 0}
+
+    print(f"Moved {moves} of {center_count} centers serving {farm_count} farms")
+    print(f"Each center in exactly its current grid cell: {grid_ok}")
+    print(f"Service and district indexes current: {index_ok}")
+    print(f"Coverage counters match a full recompute: {actual == expected}")
+    return grid_ok and index_ok and actual == expected
 
 if __name__ == "__main__":
     run_haryana_test()
\ No newline at end of file
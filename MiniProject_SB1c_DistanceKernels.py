@@ -0,0 +1,198 @@
+# distance kernels for the GIS services - exact geodesic, vectorized haversine & an equirectangular fast path,
+# each with a declared error bound, plus a speed vs error benchmark on haryana coordinates
+
+import math
+import time
+from typing import Dict, Iterable, Optional
+
+import geopy.distance
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088  # mean radius of the WGS-84 ellipsoid
+
+# Bounding box of Haryana, used by the benchmark
+HARYANA_BOUNDS = {"min_lat": 27.65, "max_lat": 30.93, "min_lon": 74.46, "max_lon": 77.60}
+
+
+class DistanceKernel:
+    """Distance between (lat, lon) points in kilometers, with a bound on the error against the exact geodesic"""
+    name = "base"
+    max_relative_error = 0.0  # |approx - geodesic| <= max_relative_error * distance + max_absolute_error
+    max_absolute_error = 0.0  # km
+    max_range_km = math.inf  # the bound only holds below this distance
+
+    def distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+        raise NotImplementedError
+
+    def distances(self, lat1: float, lon1: float, lats2, lons2) -> np.ndarray:
+        """Distances from one point to arrays of points"""
+        return np.array([self.distance(lat1, lon1, lat, lon) for lat, lon in zip(lats2, lons2)], dtype=float)
+
+    def error_bound(self, distance):
+        """Largest possible error (km) of a result of this size; inf beyond the kernel's range"""
+        bound = self.max_relative_error * distance + self.max_absolute_error
+        if np.ndim(distance):
+            return np.where(np.asarray(distance) <= self.max_range_km, bound, np.inf)
+        return bound if distance <= self.max_range_km else math.inf
+
+    @property
+    def exact(self) -> bool:
+        return self.max_relative_error == 0 and self.max_absolute_error == 0
+
+
+class GeodesicKernel(DistanceKernel):
+    """geopy's Karney geodesic on the WGS-84 ellipsoid - the reference, and the slowest"""
+    name = "geodesic"
+
+    def distance(self, lat1, lon1, lat2, lon2):
+        return geopy.distance.geodesic((lat1, lon1), (lat2, lon2)).kilometers
+
+
+class HaversineKernel(DistanceKernel):
+    """Great-circle distance on a sphere of the mean earth radius; vectorized with NumPy"""
+    name = "haversine"
+    max_relative_error = 0.0056  # sphere vs ellipsoid, worst case over the globe
+
+    def distance(self, lat1, lon1, lat2, lon2):
+        phi1, phi2 = math.radians(lat1), math.radians(lat2)
+        dphi = phi2 - phi1
+        dlmb = math.radians(lon2 - lon1)
+        a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+    def distances(self, lat1, lon1, lats2, lons2):
+        phi1 = math.radians(lat1)
+        phi2 = np.radians(np.asarray(lats2, dtype=float))
+        dphi = phi2 - phi1
+        dlmb = np.radians(np.asarray(lons2, dtype=float) - lon1)
+        a = np.sin(dphi / 2) ** 2 + math.cos(phi1) * np.cos(phi2) * np.sin(dlmb / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+
+class EquirectangularKernel(DistanceKernel):
+    """Flat-earth projection around the mean latitude; only for short ranges"""
+    name = "equirectangular"
+    max_relative_error = 0.0065  # haversine's bound plus the projection error within max_range_km
+    max_range_km = 100.0
+
+    def distance(self, lat1, lon1, lat2, lon2):
+        x = math.radians(lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2))
+        y = math.radians(lat2 - lat1)
+        return EARTH_RADIUS_KM * math.sqrt(x * x + y * y)
+
+    def distances(self, lat1, lon1, lats2, lons2):
+        lats2 = np.asarray(lats2, dtype=float)
+        x = np.radians(np.asarray(lons2, dtype=float) - lon1) * np.cos(np.radians((lat1 + lats2) / 2))
+        y = np.radians(lats2 - lat1)
+        return EARTH_RADIUS_KM * np.sqrt(x * x + y * y)
+
+
+DISTANCE_KERNELS = {
+    "geodesic": GeodesicKernel,
+    "haversine": HaversineKernel,
+    "equirectangular": EquirectangularKernel,
+}
+
+
+def get_kernel(kernel) -> DistanceKernel:
+    """Accept a kernel instance or one of the names in DISTANCE_KERNELS"""
+    if isinstance(kernel, DistanceKernel):
+        return kernel
+    if kernel not in DISTANCE_KERNELS:
+        raise ValueError(f"Unknown distance kernel: {kernel} (choose from {', '.join(DISTANCE_KERNELS)})")
+    return DISTANCE_KERNELS[kernel]()
+
+
+class ThresholdedDistance:
+    """Runs the fast kernel and recomputes with the exact geodesic whenever the fast result is within its
+    error bound of one of the thresholds that matter to the caller (e.g. the 10 / 25 km coverage radii)"""
+
+    def __init__(self, kernel="haversine"):
+        self.kernel = get_kernel(kernel)
+        self.exact_kernel = GeodesicKernel()
+        self.fallbacks = 0
+
+    def _near(self, distance, thresholds: Iterable[float]) -> bool:
+        bound = self.kernel.error_bound(distance)
+        return any(abs(distance - t) <= bound for t in thresholds)
+
+    def distance(self, lat1, lon1, lat2, lon2, thresholds: Optional[Iterable[float]] = None) -> float:
+        if self.kernel.exact:
+            return self.kernel.distance(lat1, lon1, lat2, lon2)
+        distance = self.kernel.distance(lat1, lon1, lat2, lon2)
+        if thresholds and self._near(distance, thresholds):
+            self.fallbacks += 1
+            return self.exact_kernel.distance(lat1, lon1, lat2, lon2)
+        return distance
+
+    def distances(self, lat1, lon1, lats2, lons2, thresholds: Optional[Iterable[float]] = None) -> np.ndarray:
+        lats2 = np.asarray(lats2, dtype=float)
+        lons2 = np.asarray(lons2, dtype=float)
+        distances = self.kernel.distances(lat1, lon1, lats2, lons2)
+        if self.kernel.exact or not thresholds:
+            return distances
+        bound = self.kernel.error_bound(distances)
+        near = np.zeros(len(distances), dtype=bool)
+        for t in thresholds:
+            near |= np.abs(distances - t) <= bound
+        for i in np.flatnonzero(near):
+            distances[i] = self.exact_kernel.distance(lat1, lon1, lats2[i], lons2[i])
+        self.fallbacks += int(near.sum())
+        return distances
+
+
+def run_kernel_benchmark(pair_count: int = 20000, seed: int = 42) -> Dict:
+    """Speed against error of every kernel on random Haryana point pairs, short (< 30 km) and statewide"""
+    print("Starting Distance Kernel Benchmark...\n")
+    rng = np.random.default_rng(seed)
+    b = HARYANA_BOUNDS
+    lat1 = rng.uniform(b["min_lat"], b["max_lat"])
+    lon1 = rng.uniform(b["min_lon"], b["max_lon"])
+    scenarios = {
+        "statewide": (rng.uniform(b["min_lat"], b["max_lat"], pair_count),
+                      rng.uniform(b["min_lon"], b["max_lon"], pair_count)),
+        "short_range": (lat1 + rng.uniform(-0.2, 0.2, pair_count),
+                        lon1 + rng.uniform(-0.2, 0.2, pair_count)),
+    }
+
+    geodesic = GeodesicKernel()
+    report = {}
+    for scenario, (lats, lons) in scenarios.items():
+        start = time.perf_counter()
+        exact = np.array([geodesic.distance(lat1, lon1, lat, lon) for lat, lon in zip(lats, lons)])
+        exact_seconds = time.perf_counter() - start
+        print(f"{scenario} ({pair_count} pairs, up to {exact.max():.1f} km):")
+
+        report[scenario] = {}
+        for name, kernel_class in DISTANCE_KERNELS.items():
+            kernel = kernel_class()
+            if name == "geodesic":
+                scalar_seconds, vector_seconds, approx = exact_seconds, exact_seconds, exact
+            else:
+                start = time.perf_counter()
+                for lat, lon in zip(lats, lons):
+                    kernel.distance(lat1, lon1, lat, lon)
+                scalar_seconds = time.perf_counter() - start
+                start = time.perf_counter()
+                approx = kernel.distances(lat1, lon1, lats, lons)
+                vector_seconds = time.perf_counter() - start
+
+            error = np.abs(approx - exact)
+            within_bound = bool((error <= kernel.error_bound(exact) + 1e-9).all())
+            report[scenario][name] = {
+                "scalar_ns_per_pair": scalar_seconds / pair_count * 1e9,
+                "vector_ns_per_pair": vector_seconds / pair_count * 1e9,
+                "max_abs_error_km": float(error.max()),
+                "max_rel_error": float((error / np.maximum(exact, 1e-9)).max()),
+                "within_declared_bound": within_bound,
+            }
+            r = report[scenario][name]
+            print(f"  {name}: scalar {r['scalar_ns_per_pair']:.0f} ns, vectorized {r['vector_ns_per_pair']:.0f} ns, "
+                  f"max error {r['max_abs_error_km'] * 1000:.1f} m ({r['max_rel_error'] * 100:.3f}%), "
+                  f"within bound: {'yes' if within_bound else 'NO'}")
+        print()
+    return report
+
+
+if __name__ == "__main__":
+    run_kernel_benchmark()
@@ -0,0 +1,204 @@
+# farm x center distance matrix cache - float32, memory-mapped & persisted next to the registry, computed in
+# numpy chunks; only the rows / columns of added or moved farms and centers are recomputed
+
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from MiniProject_SB1c_DistanceKernels import ThresholdedDistance
+from MiniProject_SB7_Metrics import timed, increment
+
+COVERAGE_RADII = (10, 25)
+
+
+class DistanceMatrixCache:
+    """Distances from every registered farm (rows) to every resource center (columns) of a GIS service.
+
+    The matrix lives in `<path>.f32` as a raw float32 memory map, and the row/column ids, coordinates and
+    validity flags in `<path>.meta.json` / `<path>.coords.npz`, so a later run over the same registry
+    reads the distances back from the page cache instead of recomputing them. Call sync() after farms or
+    centers are added or moved; it only recomputes the affected rows and columns."""
+
+    def __init__(self, service, path: str = "agrihub_registry.distances", chunk_size: int = 4096,
+                 distance_kernel: str = "haversine", thresholds: Tuple[float, ...] = COVERAGE_RADII):
+        self.service = service
+        self.path = path
+        self.chunk_size = chunk_size
+        self.distance = ThresholdedDistance(distance_kernel)
+        self.thresholds = thresholds
+
+        self.farm_ids: List[str] = []
+        self.center_ids: List[str] = []
+        self.farm_index: Dict[str, int] = {}
+        self.center_index: Dict[str, int] = {}
+        self.farm_coords = np.empty((0, 2))
+        self.center_coords = np.empty((0, 2))
+        self.row_valid = np.zeros(0, dtype=bool)
+        self.col_valid = np.zeros(0, dtype=bool)
+        self.matrix: Optional[np.memmap] = None
+
+        if os.path.exists(self._meta_path):
+            self._load()
+
+    @property
+    def _matrix_path(self) -> str:
+        return f"{self.path}.f32"
+
+    @property
+    def _meta_path(self) -> str:
+        return f"{self.path}.meta.json"
+
+    @property
+    def _coords_path(self) -> str:
+        return f"{self.path}.coords.npz"
+
+    def _load(self):
+        with open(self._meta_path) as f:
+            meta = json.load(f)
+        coords = np.load(self._coords_path)
+        self.farm_ids, self.center_ids = meta["farm_ids"], meta["center_ids"]
+        self.farm_index = {farm_id: i for i, farm_id in enumerate(self.farm_ids)}
+        self.center_index = {center_id: j for j, center_id in enumerate(self.center_ids)}
+        self.farm_coords, self.center_coords = coords["farm_coords"], coords["center_coords"]
+        self.row_valid, self.col_valid = coords["row_valid"], coords["col_valid"]
+        if self.farm_ids and self.center_ids:
+            self.matrix = np.memmap(self._matrix_path, dtype=np.float32, mode="r+",
+                                    shape=(len(self.farm_ids), len(self.center_ids)))
+
+    def _save_meta(self):
+        with open(f"{self._meta_path}.tmp", "w") as f:
+            json.dump({"version": 1, "farm_ids": self.farm_ids, "center_ids": self.center_ids}, f)
+        np.savez(f"{self._coords_path}.tmp.npz", farm_coords=self.farm_coords, center_coords=self.center_coords,
+                 row_valid=self.row_valid, col_valid=self.col_valid)
+        os.replace(f"{self._coords_path}.tmp.npz", self._coords_path)
+        os.replace(f"{self._meta_path}.tmp", self._meta_path)
+
+    def _resize(self, rows: int, cols: int):
+        """Grow the on-disk matrix, copying the existing block over in row chunks"""
+        old = self.matrix
+        tmp_path = f"{self._matrix_path}.tmp"
+        new = np.memmap(tmp_path, dtype=np.float32, mode="w+", shape=(rows, cols))
+        if old is not None:
+            old_rows, old_cols = old.shape
+            for start in range(0, old_rows, self.chunk_size):
+                stop = min(start + self.chunk_size, old_rows)
+                new[start:stop, :old_cols] = old[start:stop]
+        new.flush()
+        del new, old
+        self.matrix = None
+        os.replace(tmp_path, self._matrix_path)
+        self.matrix = np.memmap(self._matrix_path, dtype=np.float32, mode="r+", shape=(rows, cols))
+
+    @timed("gis.distance_matrix_sync")
+    def sync(self) -> Dict[str, int]:
+        """Bring the matrix in line with the service's farms and centers; returns how much was recomputed"""
+        farms, centers = self.service.farms, self.service.resource_centers
+
+        # Append ids that are new; invalidate rows/columns whose coordinates changed
+        new_farms = [farm_id for farm_id in farms if farm_id not in self.farm_index]
+        new_centers = [center_id for center_id in centers if center_id not in self.center_index]
+        for farm_id in new_farms:
+            self.farm_index[farm_id] = len(self.farm_ids)
+            self.farm_ids.append(farm_id)
+        for center_id in new_centers:
+            self.center_index[center_id] = len(self.center_ids)
+            self.center_ids.append(center_id)
+
+        farm_coords = np.array([[farms[f].location.latitude, farms[f].location.longitude] if f in farms
+                                else [np.nan, np.nan] for f in self.farm_ids], dtype=float).reshape(-1, 2)
+        center_coords = np.array([[centers[c].location.latitude, centers[c].location.longitude] if c in centers
+                                  else [np.nan, np.nan] for c in self.center_ids], dtype=float).reshape(-1, 2)
+        row_valid = np.zeros(len(self.farm_ids), dtype=bool)
+        col_valid = np.zeros(len(self.center_ids), dtype=bool)
+        old_rows, old_cols = len(self.row_valid), len(self.col_valid)
+        row_valid[:old_rows] = self.row_valid & (farm_coords[:old_rows] == self.farm_coords).all(axis=1)
+        col_valid[:old_cols] = self.col_valid & (center_coords[:old_cols] == self.center_coords).all(axis=1)
+        self.farm_coords, self.center_coords = farm_coords, center_coords
+
+        if not self.farm_ids or not self.center_ids:
+            # Nothing to store until there is at least one farm and one center
+            self.row_valid, self.col_valid = row_valid, col_valid
+            return {"rows_computed": 0, "cols_computed": 0}
+        if self.matrix is None or self.matrix.shape != (len(self.farm_ids), len(self.center_ids)):
+            self._resize(len(self.farm_ids), len(self.center_ids))
+
+        # Stale rows get every column; the remaining stale columns only need the rows that stayed valid
+        stale_rows = np.flatnonzero(~row_valid & ~np.isnan(farm_coords[:, 0]))
+        stale_cols = np.flatnonzero(~col_valid & ~np.isnan(center_coords[:, 0]))
+        live_cols = np.flatnonzero(~np.isnan(center_coords[:, 0]))
+        for start in range(0, len(stale_rows), self.chunk_size):
+            self._fill(stale_rows[start:start + self.chunk_size], live_cols)
+        if len(stale_cols):
+            fresh_rows = np.flatnonzero(row_valid)
+            for start in range(0, len(fresh_rows), self.chunk_size):
+                self._fill(fresh_rows[start:start + self.chunk_size], stale_cols)
+
+        row_valid[stale_rows] = True
+        col_valid[stale_cols] = True
+        self.row_valid, self.col_valid = row_valid, col_valid
+        if len(stale_rows) or len(stale_cols) or new_farms or new_centers:
+            self.matrix.flush()
+            self._save_meta()
+
+        increment("gis.distance_matrix_rows_computed", len(stale_rows))
+        increment("gis.distance_matrix_cols_computed", len(stale_cols))
+        return {"rows_computed": int(len(stale_rows)), "cols_computed": int(len(stale_cols))}
+
+    def _fill(self, rows: np.ndarray, cols: np.ndarray):
+        """Compute one chunk of rows against the given columns, one vectorized call per center"""
+        if not len(rows) or not len(cols):
+            return
+        block = np.empty((len(rows), len(cols)), dtype=np.float32)
+        lats, lons = self.farm_coords[rows, 0], self.farm_coords[rows, 1]
+        for k, j in enumerate(cols):
+            block[:, k] = self.distance.distances(self.center_coords[j, 0], self.center_coords[j, 1],
+                                                  lats, lons, self.thresholds)
+        self.matrix[np.ix_(rows, cols)] = block
+
+    def _live_columns(self) -> np.ndarray:
+        return np.array([center_id in self.service.resource_centers for center_id in self.center_ids], dtype=bool)
+
+    def distances_for_farm(self, farmer_id: str) -> Dict[str, float]:
+        """Distance from one farm to every current center, keyed by center id"""
+        if self.matrix is None:
+            return {}
+        row = self.matrix[self.farm_index[farmer_id]]
+        return {center_id: float(row[j]) for j, center_id in enumerate(self.center_ids)
+                if center_id in self.service.resource_centers}
+
+    def nearest_centers(self, farmer_id: str, radius: float) -> List[Tuple[float, str]]:
+        """(distance, center_id) of the centers within the radius of a farm, nearest first"""
+        if self.matrix is None:
+            return []
+        row = np.where(self._live_columns(), self.matrix[self.farm_index[farmer_id]], np.inf)
+        within = np.flatnonzero(row <= radius)
+        order = within[np.argsort(row[within], kind="stable")]
+        return [(float(row[j]), self.center_ids[j]) for j in order]
+
+    @timed("gis.distance_matrix_coverage")
+    def coverage_statistics(self) -> Dict:
+        """Same totals as calculate_coverage_statistics, read from the matrix one chunk of rows at a time"""
+        live_cols = self._live_columns()
+        counts = {radius: 0 for radius in self.thresholds}
+        total = 0
+        live_rows = np.array([farm_id in self.service.farms for farm_id in self.farm_ids], dtype=bool)
+        for start in range(0, len(self.farm_ids), self.chunk_size):
+            rows = np.flatnonzero(live_rows[start:start + self.chunk_size]) + start
+            if not len(rows):
+                continue
+            total += len(rows)
+            if self.matrix is None or not live_cols.any():
+                continue
+            nearest = self.matrix[rows][:, live_cols].min(axis=1)
+            for radius in self.thresholds:
+                counts[radius] += int((nearest <= radius).sum())
+
+        stats = {"total_farms": total}
+        for radius in self.thresholds:
+            stats[f"farms_within_{radius}km"] = counts[radius]
+        for radius in self.thresholds:
+            stats[f"coverage_{radius}km_percent"] = counts[radius] / total * 100 if total > 0 else 0
+        stats["total_resource_centers"] = int(live_cols.sum())
+        return stats
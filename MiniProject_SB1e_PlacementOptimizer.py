@@ -0,0 +1,161 @@
+# resource center placement optimizer - proposes where to add N centers so that the most farm area gets within
+# 10 / 25 km of a center (greedy max-coverage with lazy marginal gains over a candidate grid)
+
+import heapq
+import math
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from MiniProject_SB1c_DistanceKernels import HaversineKernel, HARYANA_BOUNDS
+from MiniProject_SB7_Metrics import timed, increment, metrics
+
+KM_PER_DEGREE_LAT = 111.32
+
+
+def candidate_grid(lats: np.ndarray, lons: np.ndarray, spacing_km: float) -> np.ndarray:
+    """Regular grid of candidate sites (lat, lon) spanning the bounding box of the farms"""
+    mid_lat = math.radians((lats.min() + lats.max()) / 2)
+    lat_step = spacing_km / KM_PER_DEGREE_LAT
+    lon_step = spacing_km / (KM_PER_DEGREE_LAT * math.cos(mid_lat))
+    grid_lats = np.arange(lats.min(), lats.max() + lat_step, lat_step)
+    grid_lons = np.arange(lons.min(), lons.max() + lon_step, lon_step)
+    mesh_lat, mesh_lon = np.meshgrid(grid_lats, grid_lons, indexing="ij")
+    return np.column_stack([mesh_lat.ravel(), mesh_lon.ravel()])
+
+
+def coverage_sets(lats: np.ndarray, lons: np.ndarray, candidates: np.ndarray, radius_km: float) -> List[np.ndarray]:
+    """For each candidate, the indices of the farms within radius_km of it.
+
+    Farms are binned into cells at least radius_km wide, so each candidate only measures the farms in the
+    3x3 block of cells around it, with one vectorized haversine call."""
+    kernel = HaversineKernel()
+    cell_lat = radius_km / KM_PER_DEGREE_LAT
+    cell_lon = radius_km / (KM_PER_DEGREE_LAT * math.cos(math.radians(max(abs(lats.max()), abs(lats.min())))))
+    farm_cells_lat = np.floor(lats / cell_lat).astype(np.int64)
+    farm_cells_lon = np.floor(lons / cell_lon).astype(np.int64)
+
+    # Sort farms by cell so every cell is a contiguous slice of the order array
+    keys = farm_cells_lat * 1_000_003 + farm_cells_lon
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    unique_keys, starts = np.unique(sorted_keys, return_index=True)
+    ends = np.append(starts[1:], len(sorted_keys))
+    cell_slices = {int(k): (s, e) for k, s, e in zip(unique_keys, starts, ends)}
+
+    sets = []
+    for lat, lon in candidates:
+        ci, cj = int(math.floor(lat / cell_lat)), int(math.floor(lon / cell_lon))
+        pieces = [order[s:e] for di in (-1, 0, 1) for dj in (-1, 0, 1)
+                  for s, e in [cell_slices.get((ci + di) * 1_000_003 + (cj + dj), (0, 0))] if e > s]
+        if not pieces:
+            sets.append(np.empty(0, dtype=np.int64))
+            continue
+        local = np.concatenate(pieces)
+        distances = kernel.distances(lat, lon, lats[local], lons[local])
+        sets.append(np.sort(local[distances <= radius_km]))
+    return sets
+
+
+@timed("gis.optimize_placement")
+def optimize_placement(lats, lons, weights, new_centers: int, radius_km: float = 10,
+                       covered: Optional[np.ndarray] = None, spacing_km: Optional[float] = None,
+                       candidates: Optional[np.ndarray] = None) -> List[Dict]:
+    """Greedy max-coverage: pick `new_centers` sites maximizing the total weight of newly covered farms.
+
+    Uses lazy (CELF) evaluation - a candidate's marginal gain can only shrink as sites are picked, so a
+    stale gain is an upper bound and only the top of the heap is ever re-evaluated."""
+    lats, lons = np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    covered = np.zeros(len(lats), dtype=bool) if covered is None else np.asarray(covered, dtype=bool).copy()
+    if len(lats) == 0 or new_centers <= 0:
+        return []
+    if candidates is None:
+        candidates = candidate_grid(lats, lons, spacing_km or radius_km / 2)
+
+    sets = coverage_sets(lats, lons, candidates, radius_km)
+    total_weight = weights.sum()
+    covered_weight = weights[covered].sum()
+
+    heap = []
+    for index, farm_indices in enumerate(sets):
+        gain = weights[farm_indices][~covered[farm_indices]].sum()
+        if gain > 0:
+            heap.append((-gain, index, 0))
+    heapq.heapify(heap)
+
+    proposals = []
+    evaluations = len(heap)
+    round_number = 0
+    while heap and len(proposals) < new_centers:
+        neg_gain, index, evaluated_round = heapq.heappop(heap)
+        if evaluated_round != round_number:
+            farm_indices = sets[index]
+            gain = weights[farm_indices][~covered[farm_indices]].sum()
+            evaluations += 1
+            if gain > 0:
+                heapq.heappush(heap, (-gain, index, round_number))
+            continue
+
+        farm_indices = sets[index]
+        newly_covered = farm_indices[~covered[farm_indices]]
+        covered[newly_covered] = True
+        covered_weight += -neg_gain
+        proposals.append({
+            "latitude": float(candidates[index, 0]),
+            "longitude": float(candidates[index, 1]),
+            "weight_gain": float(-neg_gain),
+            "farms_newly_covered": int(len(newly_covered)),
+            "weighted_coverage_percent": float(covered_weight / total_weight * 100) if total_weight > 0 else 0.0,
+        })
+        round_number += 1
+
+    increment("gis.placement_gain_evaluations", evaluations)
+    return proposals
+
+
+def propose_centers(service, new_centers: int, radius_km: float = 10, spacing_km: Optional[float] = None) -> List[Dict]:
+    """Proposals for a HaryanaGISService, weighted by farm area and starting from the existing coverage"""
+    farm_ids = list(service.farms)
+    farms = [service.farms[farm_id] for farm_id in farm_ids]
+    lats = np.array([farm.location.latitude for farm in farms])
+    lons = np.array([farm.location.longitude for farm in farms])
+    weights = np.array([farm.area for farm in farms])
+    covered = np.array([service.farm_assignments[farm_id][1] <= radius_km for farm_id in farm_ids], dtype=bool)
+
+    proposals = optimize_placement(lats, lons, weights, new_centers, radius_km, covered, spacing_km)
+    for proposal in proposals:
+        # Label each site with the district whose centroid is nearest
+        proposal["district"] = min(
+            service.district_coordinates,
+            key=lambda d: (service.district_coordinates[d][0] - proposal["latitude"]) ** 2
+                          + (service.district_coordinates[d][1] - proposal["longitude"]) ** 2
+        )
+    return proposals
+
+
+# Scale test - synthetic statewide farms, proposals and timing
+def run_placement_test(farm_count: int = 100_000, new_centers: int = 20, radius_km: float = 10, seed: int = 42):
+    print("Starting Placement Optimizer Test...\n")
+    rng = np.random.default_rng(seed)
+    b = HARYANA_BOUNDS
+    lats = rng.uniform(b["min_lat"], b["max_lat"], farm_count)
+    lons = rng.uniform(b["min_lon"], b["max_lon"], farm_count)
+    areas = rng.uniform(1.0, 10.0, farm_count)
+
+    start = time.perf_counter()
+    candidates = candidate_grid(lats, lons, radius_km / 2)
+    proposals = optimize_placement(lats, lons, areas, new_centers, radius_km, candidates=candidates)
+    elapsed = time.perf_counter() - start
+
+    print(f"{farm_count} farms, {len(candidates)} candidate sites, {radius_km} km radius: {elapsed:.2f}s")
+    for i, p in enumerate(proposals, 1):
+        print(f"{i}. ({p['latitude']:.4f}, {p['longitude']:.4f}) covers {p['farms_newly_covered']} more farms, "
+              f"weighted coverage {p['weighted_coverage_percent']:.1f}%")
+    print(f"Marginal gain evaluations: {metrics.counters.get('gis.placement_gain_evaluations', 0)}")
+    return proposals
+
+
+if __name__ == "__main__":
+    run_placement_test()
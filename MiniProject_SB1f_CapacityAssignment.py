@@ -0,0 +1,188 @@
+# capacity-aware farm -> resource center assignment - minimizes total travel distance subject to the stock of an
+# inventory item (e.g. harvesters during stubble season), as a min-cost flow on a sparse radius graph
+
+import heapq
+import math
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from MiniProject_SB1c_DistanceKernels import HaversineKernel
+from MiniProject_SB7_Metrics import timed, increment
+
+
+def min_cost_assign(candidates: List[List[Tuple[int, float]]], capacities: List[int],
+                    unassigned_cost: float) -> List[Optional[int]]:
+    """Assign each farm (one unit of demand) to one of its candidate centers (index, cost) without exceeding
+    any center's capacity, minimizing total cost. Farms left unassigned cost `unassigned_cost` each.
+
+    Min-cost flow by successive shortest paths, adding one farm at a time. Since farms only move between
+    centers, the residual graph is collapsed onto the centers (plus an "unassigned" node of unlimited
+    capacity): the edge a -> b costs the cheapest move of a farm currently at a over to b, kept in a lazy
+    heap per pair. Each new farm is then one Bellman-Ford (queue based) pass over a few dozen nodes."""
+    farm_count = len(candidates)
+    unassigned = len(capacities)  # index of the unassigned node
+    capacities = list(capacities) + [math.inf]
+    costs = [dict(options) for options in candidates]
+    for farm_costs in costs:
+        farm_costs[unassigned] = unassigned_cost
+
+    assignment = [unassigned] * farm_count
+    load = [0] * len(capacities)
+    moves: Dict[Tuple[int, int], list] = {}  # (a, b) -> heap of (cost change, farm) for farms at a
+    out_edges: List[set] = [set() for _ in capacities]
+
+    def place(farm, center):
+        assignment[farm] = center
+        base = costs[farm][center]
+        for other, cost in costs[farm].items():
+            if other != center:
+                heapq.heappush(moves.setdefault((center, other), []), (cost - base, farm))
+                out_edges[center].add(other)
+
+    def cheapest_move(a, b):
+        heap = moves[(a, b)]
+        while heap and assignment[heap[0][1]] != a:
+            heapq.heappop(heap)  # the farm has moved away since
+        return heap[0] if heap else None
+
+    relaxations = 0
+    for farm in range(farm_count):
+        dist = {center: cost for center, cost in costs[farm].items()}
+        prev: Dict[int, Tuple[int, int]] = {}
+        queue = deque(dist)
+        queued = set(dist)
+        while queue:
+            a = queue.popleft()
+            queued.discard(a)
+            for b in list(out_edges[a]):
+                move = cheapest_move(a, b)
+                if move is None:
+                    out_edges[a].discard(b)
+                    continue
+                relaxations += 1
+                if dist[a] + move[0] < dist.get(b, math.inf) - 1e-12:
+                    dist[b] = dist[a] + move[0]
+                    prev[b] = (a, move[1])
+                    if b not in queued:
+                        queue.append(b)
+                        queued.add(b)
+
+        # Cheapest node with spare capacity ends the path; walk back shifting one farm per hop
+        target = min((center for center in dist if load[center] < capacities[center]), key=lambda c: (dist[c], c))
+        load[target] += 1
+        center = target
+        while center in prev:
+            previous, moved = prev[center]
+            place(moved, center)
+            center = previous
+        place(farm, center)
+
+    increment("gis.assignment_relaxations", relaxations)
+    return [None if center == unassigned else center for center in assignment]
+
+
+@timed("gis.capacity_assignment")
+def assign_farms_to_centers(service, item: str = "harvesters", farms_per_unit: int = 10,
+                            radius_km: float = 25, district: Optional[str] = None,
+                            unassigned_penalty_km: Optional[float] = None) -> Dict:
+    """Assign the farms of a HaryanaGISService (optionally one district) to centers holding `item`, each
+    center serving at most inventory[item] * farms_per_unit farms, minimizing total distance.
+
+    Candidate centers for a farm are the centers stocking the item within radius_km (grid radius query
+    plus the inventory index); farms with no center in range, or beyond every center's capacity, are
+    reported as unassigned."""
+    kernel = HaversineKernel()
+    if district is not None:
+        farm_ids = sorted(service.farm_district_index.get(district, ()))
+    else:
+        farm_ids = list(service.farms)
+    stocked = service.inventory_index.get(item, set())
+    center_ids = sorted(stocked)
+    center_position = {center_id: j for j, center_id in enumerate(center_ids)}
+    capacities = [service.resource_centers[c].inventory.get(item, 0) * farms_per_unit for c in center_ids]
+
+    candidates = []
+    for farm_id in farm_ids:
+        location = service.farms[farm_id].location
+        nearby = [c for c in service.center_grid.query(location, radius_km) if c in stocked]
+        if not nearby:
+            candidates.append([])
+            continue
+        distances = kernel.distances(
+            location.latitude, location.longitude,
+            [service.resource_centers[c].location.latitude for c in nearby],
+            [service.resource_centers[c].location.longitude for c in nearby]
+        )
+        candidates.append([(center_position[c], float(d)) for c, d in zip(nearby, distances) if d <= radius_km])
+
+    penalty = unassigned_penalty_km if unassigned_penalty_km is not None else 10 * radius_km
+    assignment = min_cost_assign(candidates, capacities, penalty)
+
+    result = {}
+    loads = {center_id: 0 for center_id in center_ids}
+    total_distance = 0.0
+    for farm_id, options, center in zip(farm_ids, candidates, assignment):
+        if center is None:
+            result[farm_id] = None
+            continue
+        distance = dict(options)[center]
+        result[farm_id] = (center_ids[center], distance)
+        loads[center_ids[center]] += 1
+        total_distance += distance
+
+    unassigned = sum(1 for value in result.values() if value is None)
+    return {
+        "assignments": result,
+        "total_distance_km": total_distance,
+        "assigned_farms": len(result) - unassigned,
+        "unassigned_farms": unassigned,
+        "center_load": {c: {"assigned": loads[c], "capacity": capacities[center_position[c]]} for c in center_ids},
+    }
+
+
+# District test - capacity-aware assignment against the nearest-center baseline
+def run_assignment_test(district: str = "Karnal", farm_count: int = 50_000, centers_per_district: int = 8,
+                        item: str = "harvesters", farms_per_unit: int = 60, seed: int = 42):
+    from MiniProject_SB1b_GISserviceTest import HaryanaGISService
+    from MiniProject_SB6_Benchmark import load_distributions, generate_farms, generate_centers
+    import random
+
+    print("Starting Capacity Assignment Test...\n")
+    rng = np.random.default_rng(seed)
+    random.seed(seed)
+    service = HaryanaGISService()
+    farms = generate_farms(farm_count, rng, load_distributions(), service)
+    for center in generate_centers(centers_per_district, rng, farms, service):
+        service.register_resource_center(center)
+    for farm in farms:
+        service.register_farm(farm)
+
+    start = time.perf_counter()
+    solution = assign_farms_to_centers(service, item, farms_per_unit, district=district)
+    elapsed = time.perf_counter() - start
+
+    # Baseline: everybody goes to the closest stocked center regardless of capacity
+    overloaded = {}
+    for farm_id in service.farm_district_index.get(district, ()):
+        nearest = service.find_k_nearest_centers(service.farms[farm_id].location, 1, min_inventory={item: 1})
+        if nearest:
+            center_id = nearest[0][1].center_id
+            overloaded[center_id] = overloaded.get(center_id, 0) + 1
+    over_capacity = sum(max(0, load - service.resource_centers[c].inventory[item] * farms_per_unit)
+                        for c, load in overloaded.items())
+
+    print(f"District: {district}, farms: {len(solution['assignments'])}, solved in {elapsed:.2f}s")
+    print(f"Assigned: {solution['assigned_farms']}, unassigned: {solution['unassigned_farms']}, "
+          f"total distance: {solution['total_distance_km']:.1f} km")
+    print(f"Nearest-center baseline sends {over_capacity} farms beyond center capacity")
+    for center_id, load in solution["center_load"].items():
+        if load["assigned"]:
+            print(f"{center_id}: {load['assigned']}/{load['capacity']}")
+    return solution
+
+
+if __name__ == "__main__":
+    run_assignment_test()
@@ -0,0 +1,367 @@
+# equipment rental bookings - per center & item calendars (segment tree over time slots for usage, sorted
+# interval list for overlaps) so "earliest slot with 2 harvesters within 15 km" stays logarithmic as bookings grow
+
+import bisect
+import itertools
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from MiniProject_SB7_Metrics import timed, increment
+
+SLOT = timedelta(hours=1)
+HORIZON_DAYS = 366
+MAX_BOOKING_RETRIES = 8
+
+
+class BookingConflict(ValueError):
+    """The requested units are not free for the period (as opposed to an invalid request)"""
+
+
+@dataclass
+class Booking:
+    booking_id: str
+    center_id: str
+    item: str
+    quantity: int
+    start: datetime
+    end: datetime
+    farmer_id: str = ""
+
+
+class UsageTree:
+    """Segment tree over a fixed number of time slots: add a quantity to a range of slots, read the
+    peak usage of a range, and find the first slot of a range whose usage is above / at most a limit -
+    O(log n) each. Only add() writes; the queries carry the pending adds down instead of pushing them"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.peak = [0] * (4 * size)
+        self.low = [0] * (4 * size)
+        self.pending = [0] * (4 * size)  # lazy adds not yet pushed to the children
+
+    def _push(self, node: int):
+        if self.pending[node]:
+            for child in (2 * node, 2 * node + 1):
+                self.peak[child] += self.pending[node]
+                self.low[child] += self.pending[node]
+                self.pending[child] += self.pending[node]
+            self.pending[node] = 0
+
+    def add(self, lo: int, hi: int, value: int, node: int = 1, left: int = 0, right: Optional[int] = None):
+        """Add value to the slots lo..hi-1"""
+        right = self.size if right is None else right
+        if hi <= left or right <= lo:
+            return
+        if lo <= left and right <= hi:
+            self.peak[node] += value
+            self.low[node] += value
+            self.pending[node] += value
+            return
+        self._push(node)
+        mid = (left + right) // 2
+        self.add(lo, hi, value, 2 * node, left, mid)
+        self.add(lo, hi, value, 2 * node + 1, mid, right)
+        self.peak[node] = max(self.peak[2 * node], self.peak[2 * node + 1])
+        self.low[node] = min(self.low[2 * node], self.low[2 * node + 1])
+
+    def max(self, lo: int, hi: int, node: int = 1, left: int = 0, right: Optional[int] = None,
+            carry: int = 0) -> int:
+        """Peak usage over the slots lo..hi-1"""
+        right = self.size if right is None else right
+        if hi <= left or right <= lo:
+            return 0
+        if lo <= left and right <= hi:
+            return self.peak[node] + carry
+        carry += self.pending[node]
+        mid = (left + right) // 2
+        return max(self.max(lo, hi, 2 * node, left, mid, carry), self.max(lo, hi, 2 * node + 1, mid, right, carry))
+
+    def first_above(self, lo: int, hi: int, limit: int, node: int = 1, left: int = 0,
+                    right: Optional[int] = None, carry: int = 0) -> int:
+        """First slot in lo..hi-1 with usage above limit, or -1"""
+        right = self.size if right is None else right
+        if hi <= left or right <= lo or self.peak[node] + carry <= limit:
+            return -1
+        if right - left == 1:
+            return left
+        carry += self.pending[node]
+        mid = (left + right) // 2
+        found = self.first_above(lo, hi, limit, 2 * node, left, mid, carry)
+        if found == -1:
+            found = self.first_above(lo, hi, limit, 2 * node + 1, mid, right, carry)
+        return found
+
+    def first_at_most(self, lo: int, hi: int, limit: int, node: int = 1, left: int = 0,
+                      right: Optional[int] = None, carry: int = 0) -> int:
+        """First slot in lo..hi-1 with usage at most limit, or -1"""
+        right = self.size if right is None else right
+        if hi <= left or right <= lo or self.low[node] + carry > limit:
+            return -1
+        if right - left == 1:
+            return left
+        carry += self.pending[node]
+        mid = (left + right) // 2
+        found = self.first_at_most(lo, hi, limit, 2 * node, left, mid, carry)
+        if found == -1:
+            found = self.first_at_most(lo, hi, limit, 2 * node + 1, mid, right, carry)
+        return found
+
+
+class ItemCalendar:
+    """Bookings of one item at one center. Usage per slot lives in a UsageTree; bookings are also kept
+    sorted by start, which together with the longest booking length bounds the overlap search"""
+
+    def __init__(self, epoch: datetime, slots: int):
+        self.epoch = epoch
+        self.usage = UsageTree(slots)
+        self.starts: List[Tuple[int, str]] = []  # (start slot, booking_id), sorted
+        self.bookings: Dict[str, Tuple[int, int, int]] = {}  # booking_id -> (start slot, end slot, quantity)
+        self.longest = 0
+        self.lock = threading.Lock()
+
+    def fits(self, lo: int, hi: int, quantity: int, capacity: int) -> bool:
+        return self.usage.max(lo, hi) + quantity <= capacity
+
+    def earliest_fit(self, lo: int, length: int, quantity: int, capacity: int) -> Optional[int]:
+        """First start slot >= lo where `quantity` units are free for `length` slots. A blocked slot moves
+        the start to the end of its busy stretch, so the cost is O(log n) per free gap too short to fit"""
+        limit = capacity - quantity
+        if limit < 0:
+            return None
+        start = lo
+        while start + length <= self.usage.size:
+            blocked = self.usage.first_above(start, start + length, limit)
+            if blocked == -1:
+                return start
+            start = self.usage.first_at_most(blocked, self.usage.size, limit)
+            if start == -1:
+                return None
+        return None
+
+    def add(self, booking_id: str, lo: int, hi: int, quantity: int):
+        self.usage.add(lo, hi, quantity)
+        bisect.insort(self.starts, (lo, booking_id))
+        self.bookings[booking_id] = (lo, hi, quantity)
+        self.longest = max(self.longest, hi - lo)
+
+    def remove(self, booking_id: str):
+        lo, hi, quantity = self.bookings.pop(booking_id)
+        self.usage.add(lo, hi, -quantity)
+        del self.starts[bisect.bisect_left(self.starts, (lo, booking_id))]
+
+    def overlapping(self, lo: int, hi: int) -> List[str]:
+        """Ids of the bookings sharing at least one slot with lo..hi-1"""
+        first = bisect.bisect_left(self.starts, (lo - self.longest + 1, ""))
+        last = bisect.bisect_left(self.starts, (hi, ""))
+        return [booking_id for _, booking_id in self.starts[first:last] if self.bookings[booking_id][1] > lo]
+
+
+class EquipmentBookingService:
+    """Time-based rental of center inventory (tractors, harvesters, ...) on top of a HaryanaGISService.
+
+    Time is cut into SLOT-sized slots from `epoch` over `horizon_days`; a booking holds `quantity` units
+    of an item for every slot it touches. The stock to book against is the center's current inventory,
+    so restocks through the GIS service apply immediately. Each calendar has its own lock; reserve()
+    checks and books under it, so concurrent callers can never overbook, and the availability queries
+    read under it, so they never see a booking half applied."""
+
+    def __init__(self, gis_service, epoch: Optional[datetime] = None, horizon_days: int = HORIZON_DAYS,
+                 slot: timedelta = SLOT):
+        self.gis = gis_service
+        self.epoch = epoch or datetime.now().replace(minute=0, second=0, microsecond=0)
+        self.slot = slot
+        self.slots = int(timedelta(days=horizon_days) / slot)
+        self.calendars: Dict[Tuple[str, str], ItemCalendar] = {}
+        self.bookings: Dict[str, Booking] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def _calendar(self, center_id: str, item: str) -> ItemCalendar:
+        key = (center_id, item)
+        calendar = self.calendars.get(key)
+        if calendar is None:
+            with self._lock:
+                calendar = self.calendars.setdefault(key, ItemCalendar(self.epoch, self.slots))
+        return calendar
+
+    def _slot_range(self, start: datetime, end: datetime) -> Tuple[int, int]:
+        """Slots touched by start..end: start rounded down, end rounded up"""
+        if end <= start:
+            raise ValueError(f"Booking ends ({end}) before it starts ({start})")
+        lo = (start - self.epoch) // self.slot
+        hi = -((self.epoch - end) // self.slot)
+        if lo < 0 or hi > self.slots:
+            raise ValueError(f"Booking {start} - {end} is outside the calendar ({self.epoch} + {self.slots} slots)")
+        return lo, hi
+
+    def _slot_time(self, slot: int) -> datetime:
+        return self.epoch + slot * self.slot
+
+    def _capacity(self, center_id: str, item: str) -> int:
+        return self.gis.resource_centers[center_id].inventory.get(item, 0)
+
+    def is_available(self, center_id: str, item: str, quantity: int, start: datetime, end: datetime) -> bool:
+        lo, hi = self._slot_range(start, end)
+        calendar = self._calendar(center_id, item)
+        with calendar.lock:
+            return calendar.fits(lo, hi, quantity, self._capacity(center_id, item))
+
+    def available_units(self, center_id: str, item: str, start: datetime, end: datetime) -> int:
+        """Units of the item free for the whole period"""
+        lo, hi = self._slot_range(start, end)
+        calendar = self._calendar(center_id, item)
+        with calendar.lock:
+            return max(0, self._capacity(center_id, item) - calendar.usage.max(lo, hi))
+
+    def overlapping_bookings(self, center_id: str, item: str, start: datetime, end: datetime) -> List[Booking]:
+        lo, hi = self._slot_range(start, end)
+        calendar = self._calendar(center_id, item)
+        with calendar.lock:
+            booking_ids = calendar.overlapping(lo, hi)
+        return [self.bookings[booking_id] for booking_id in booking_ids]
+
+    @timed("booking.reserve")
+    def reserve(self, center_id: str, item: str, quantity: int, start: datetime, end: datetime,
+                farmer_id: str = "") -> Booking:
+        """Book `quantity` units for start..end; raises BookingConflict if they are not free, ValueError for
+        an invalid request"""
+        if quantity <= 0:
+            raise ValueError(f"Quantity must be positive, got {quantity}")
+        lo, hi = self._slot_range(start, end)
+        calendar = self._calendar(center_id, item)
+        with calendar.lock:
+            capacity = self._capacity(center_id, item)
+            if not calendar.fits(lo, hi, quantity, capacity):
+                increment("booking.conflicts")
+                raise BookingConflict(f"Only {max(0, capacity - calendar.usage.max(lo, hi))} {item} free at "
+                                 f"{center_id} for {start} - {end}, {quantity} requested")
+            booking = Booking(f"BK{next(self._ids):07d}", center_id, item, quantity,
+                              self._slot_time(lo), self._slot_time(hi), farmer_id)
+            calendar.add(booking.booking_id, lo, hi, quantity)
+            self.bookings[booking.booking_id] = booking
+        return booking
+
+    def cancel(self, booking_id: str) -> Booking:
+        """Release a booking; raises ValueError if it does not exist or was already cancelled"""
+        booking = self.bookings.get(booking_id)
+        if booking is None:
+            raise ValueError(f"No booking {booking_id}")
+        calendar = self._calendar(booking.center_id, booking.item)
+        with calendar.lock:
+            # A concurrent cancel may have released it while this one waited for the lock
+            if self.bookings.pop(booking_id, None) is None:
+                raise ValueError(f"No booking {booking_id}")
+            calendar.remove(booking_id)
+        return booking
+
+    @timed("booking.earliest_slot")
+    def earliest_slot(self, location, item: str, quantity: int, duration: timedelta,
+                      not_before: Optional[datetime] = None, radius: float = 15,
+                      not_after: Optional[datetime] = None) -> List[Tuple[datetime, float, str]]:
+        """(start, distance, center_id) per center within the radius that can supply `quantity` units for
+        `duration`, earliest start first (ties go to the nearer center); not_after caps the start time"""
+        not_before = max(not_before or self.epoch, self.epoch)
+        lo = (not_before - self.epoch) // self.slot
+        if not_before > self._slot_time(lo):
+            lo += 1
+        length = -(-duration // self.slot)
+        options = []
+        for distance, center in self.gis.query_centers(items=[item], location=location, radius=radius):
+            capacity = center.inventory.get(item, 0)
+            if capacity < quantity:
+                continue
+            calendar = self._calendar(center.center_id, item)
+            with calendar.lock:
+                slot = calendar.earliest_fit(lo, length, quantity, capacity)
+            if slot is None:
+                continue
+            start = self._slot_time(slot)
+            if not_after is not None and start > not_after:
+                continue
+            options.append((start, distance, center.center_id))
+        options.sort()
+        return options
+
+    def book_earliest(self, location, item: str, quantity: int, duration: timedelta,
+                      not_before: Optional[datetime] = None, radius: float = 15,
+                      farmer_id: str = "", not_after: Optional[datetime] = None,
+                      max_retries: int = MAX_BOOKING_RETRIES) -> Optional[Booking]:
+        """Reserve the earliest option of earliest_slot (None if there is none); if another caller takes it
+        first, search again, up to max_retries times before raising BookingConflict"""
+        if quantity <= 0:
+            raise ValueError(f"Quantity must be positive, got {quantity}")
+        if duration <= timedelta(0):
+            raise ValueError(f"Duration must be positive, got {duration}")
+        for attempt in range(max_retries + 1):
+            options = self.earliest_slot(location, item, quantity, duration, not_before, radius, not_after)
+            if not options:
+                return None
+            start, _, center_id = options[0]
+            try:
+                return self.reserve(center_id, item, quantity, start, start + duration, farmer_id)
+            except BookingConflict:
+                if attempt == max_retries:
+                    raise
+                increment("booking.retries")
+
+
+# Scale test - hundreds of thousands of harvester bookings across the state, then availability queries
+def run_booking_test(booking_count: int = 200_000, query_count: int = 1000, seed: int = 42):
+    from MiniProject_SB1b_GISserviceTest import HaryanaGISService
+    from MiniProject_SB6_Benchmark import CENTERS_PER_DISTRICT, load_distributions, generate_farms, generate_centers
+    import random
+
+    print("Starting Equipment Booking Test...\n")
+    rng = np.random.default_rng(seed)
+    random.seed(seed)
+    gis = HaryanaGISService()
+    farms = generate_farms(2000, rng, load_distributions(), gis)
+    for center in generate_centers(CENTERS_PER_DISTRICT * 4, rng, farms, gis):
+        gis.register_resource_center(center)
+    # The stubble window: rice harvest in October to wheat sowing in mid November
+    epoch = datetime(2025, 10, 1)
+    bookings = EquipmentBookingService(gis, epoch=epoch)
+    rental_centers = sorted(gis.query_center_ids(items=["harvesters"]))
+
+    start = time.perf_counter()
+    booked = conflicts = 0
+    for _ in range(booking_count):
+        center_id = rental_centers[rng.integers(len(rental_centers))]
+        begin = epoch + timedelta(hours=int(rng.integers(0, 24 * 300)))
+        try:
+            bookings.reserve(center_id, "harvesters", 1, begin, begin + timedelta(hours=int(rng.integers(2, 48))))
+            booked += 1
+        except BookingConflict:
+            conflicts += 1
+    elapsed = time.perf_counter() - start
+    print(f"{booked} bookings made, {conflicts} refused as overbooked: {elapsed / booking_count * 1e6:.1f} us per reserve")
+
+    start = time.perf_counter()
+    found = 0
+    for farm in farms[:query_count]:
+        options = bookings.earliest_slot(farm.location, "harvesters", 2, timedelta(days=2),
+                                         not_before=epoch + timedelta(days=20), radius=15)
+        found += bool(options)
+    elapsed = time.perf_counter() - start
+    print(f"{query_count} 'earliest 2 harvesters for 2 days within 15 km' queries: "
+          f"{elapsed / query_count * 1000:.2f} ms each, {found} with an option")
+
+    farm = farms[0]
+    options = bookings.earliest_slot(farm.location, "harvesters", 2, timedelta(days=2),
+                                     not_before=epoch + timedelta(days=20), radius=15)
+    for begin, distance, center_id in options[:3]:
+        print(f"{center_id} ({distance:.1f} km): from {begin:%Y-%m-%d %H:%M}")
+    if options:
+        begin, _, center_id = options[0]
+        overlapping = bookings.overlapping_bookings(center_id, "harvesters", begin, begin + timedelta(days=2))
+        print(f"{len(overlapping)} existing bookings overlap the earliest option at {center_id}")
+    return bookings
+
+
+if __name__ == "__main__":
+    run_booking_test()
@@ -0,0 +1,225 @@
+# inventory reservations - atomic reserve / commit / release of resource center stock (urea bags, seed packets,
+# ...) under per-center striped locks, with idempotency keys, a low-stock event feed and a thread pool stress test
+
+import itertools
+import queue
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from MiniProject_SB7_Metrics import timed, increment, get_logger
+
+# Available quantity at or below which a low-stock event is published
+LOW_STOCK_THRESHOLDS = {
+    "urea_bags": 50,
+    "dap_bags": 30,
+    "potash_bags": 20,
+    "seed_packets": 100,
+    "soil_testing_kits": 10,
+    "tractors": 1,
+    "power_tillers": 1,
+    "harvesters": 1,
+}
+
+RESERVED, COMMITTED, RELEASED = "reserved", "committed", "released"
+
+
+@dataclass
+class Reservation:
+    reservation_id: str
+    center_id: str
+    item: str
+    quantity: int
+    status: str = RESERVED
+    idempotency_key: Optional[str] = None
+    created: float = field(default_factory=time.time)
+
+
+class InventoryReservationService:
+    """Reservations against the inventory of a HaryanaGISService's resource centers.
+
+    reserve() sets stock aside without removing it; commit() removes it from the center's inventory
+    (through the GIS service, so the inventory index stays current) and release() returns it. A center's
+    available quantity is its inventory minus the open reservations, and can never go negative.
+
+    Every center maps to one of `stripes` locks, so operations on different centers rarely contend.
+    Retrying a reserve() with the same idempotency key returns the original reservation instead of
+    reserving twice; commit() and release() are idempotent per reservation."""
+
+    def __init__(self, gis_service, stripes: int = 64, low_stock_thresholds: Optional[Dict[str, int]] = None):
+        self.gis = gis_service
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self.low_stock_thresholds = dict(LOW_STOCK_THRESHOLDS if low_stock_thresholds is None else low_stock_thresholds)
+        self.reserved: Dict[Tuple[str, str], int] = {}  # (center_id, item) -> quantity held by open reservations
+        self.reservations: Dict[str, Reservation] = {}
+        self._keys: Dict[str, Reservation] = {}
+        self._ids = itertools.count(1)
+        self._subscribers: List[queue.Queue] = []
+        self.logger = get_logger("inventory")
+
+    def _lock(self, center_id: str) -> threading.Lock:
+        return self._locks[zlib.crc32(center_id.encode()) % len(self._locks)]
+
+    def _available(self, center_id: str, item: str) -> int:
+        stock = self.gis.resource_centers[center_id].inventory.get(item, 0)
+        return stock - self.reserved.get((center_id, item), 0)
+
+    def available(self, center_id: str, item: str) -> int:
+        """Stock not yet reserved"""
+        with self._lock(center_id):
+            return self._available(center_id, item)
+
+    def subscribe(self) -> queue.Queue:
+        """A queue receiving every low-stock event from now on"""
+        feed = queue.Queue()
+        self._subscribers.append(feed)
+        return feed
+
+    def _check_low_stock(self, center_id: str, item: str, before: int, after: int):
+        """Publish when the available quantity crosses the item's threshold downwards"""
+        threshold = self.low_stock_thresholds.get(item)
+        if threshold is None or not after <= threshold < before:
+            return
+        event = {"center_id": center_id, "item": item, "available": after, "threshold": threshold, "time": time.time()}
+        increment("inventory.low_stock_events")
+        self.logger.info("Low stock: %s %s available at %s", after, item, center_id)
+        for feed in list(self._subscribers):
+            feed.put(event)
+
+    @timed("inventory.reserve")
+    def reserve(self, center_id: str, item: str, quantity: int, idempotency_key: Optional[str] = None) -> Reservation:
+        """Set aside `quantity` units; raises ValueError if fewer are available"""
+        if quantity <= 0:
+            raise ValueError(f"Quantity must be positive, got {quantity}")
+        if center_id not in self.gis.resource_centers:
+            raise ValueError(f"Unknown resource center: {center_id}")
+        with self._lock(center_id):
+            if idempotency_key is not None:
+                existing = self._keys.get(idempotency_key)
+                if existing is not None:
+                    if (existing.center_id, existing.item, existing.quantity) != (center_id, item, quantity):
+                        raise ValueError(f"Idempotency key {idempotency_key} was used for a different reservation")
+                    increment("inventory.idempotent_replays")
+                    return existing
+            available = self._available(center_id, item)
+            if available < quantity:
+                increment("inventory.reserve_rejected")
+                raise ValueError(f"Insufficient {item} at {center_id}: {available} available, {quantity} requested")
+            reservation = Reservation(f"RS{next(self._ids):08d}", center_id, item, quantity,
+                                      idempotency_key=idempotency_key)
+            self.reserved[(center_id, item)] = self.reserved.get((center_id, item), 0) + quantity
+            self.reservations[reservation.reservation_id] = reservation
+            if idempotency_key is not None:
+                self._keys[idempotency_key] = reservation
+            self._check_low_stock(center_id, item, available, available - quantity)
+        return reservation
+
+    @timed("inventory.commit")
+    def commit(self, reservation_id: str) -> Reservation:
+        """Remove the reserved units from the center's inventory"""
+        reservation = self.reservations[reservation_id]
+        with self._lock(reservation.center_id):
+            if reservation.status == COMMITTED:
+                return reservation
+            if reservation.status == RELEASED:
+                raise ValueError(f"Reservation {reservation_id} was already released")
+            key = (reservation.center_id, reservation.item)
+            self.reserved[key] -= reservation.quantity
+            self.gis.adjust_inventory(reservation.center_id, reservation.item, -reservation.quantity)
+            reservation.status = COMMITTED
+        return reservation
+
+    @timed("inventory.release")
+    def release(self, reservation_id: str) -> Reservation:
+        """Return the reserved units to the available stock"""
+        reservation = self.reservations[reservation_id]
+        with self._lock(reservation.center_id):
+            if reservation.status == RELEASED:
+                return reservation
+            if reservation.status == COMMITTED:
+                raise ValueError(f"Reservation {reservation_id} was already committed")
+            self.reserved[(reservation.center_id, reservation.item)] -= reservation.quantity
+            reservation.status = RELEASED
+        return reservation
+
+    def restock(self, center_id: str, item: str, delta: int) -> int:
+        """Add stock (delivery) or remove it outside of reservations; cannot eat into reserved units"""
+        with self._lock(center_id):
+            if delta < 0 and self._available(center_id, item) + delta < 0:
+                raise ValueError(f"Cannot remove {-delta} {item} at {center_id}: "
+                                 f"only {self._available(center_id, item)} unreserved")
+            before = self._available(center_id, item)
+            quantity = self.gis.adjust_inventory(center_id, item, delta)
+            self._check_low_stock(center_id, item, before, before + delta)
+            return quantity
+
+
+# Stress test - reserve / commit / release from a thread pool, then check nothing was over-allocated
+def run_reservation_stress_test(threads: int = 16, operations: int = 200_000, seed: int = 42):
+    from MiniProject_SB1b_GISserviceTest import HaryanaGISService
+    from MiniProject_SB6_Benchmark import CENTERS_PER_DISTRICT, load_distributions, generate_farms, generate_centers
+    import random
+
+    print("Starting Inventory Reservation Stress Test...\n")
+    items = ["urea_bags", "seed_packets"]
+    for stripes in (1, 64):
+        rng = np.random.default_rng(seed)
+        random.seed(seed)
+        gis = HaryanaGISService()
+        farms = generate_farms(500, rng, load_distributions(), gis)
+        for center in generate_centers(CENTERS_PER_DISTRICT, rng, farms, gis):
+            gis.register_resource_center(center)
+        service = InventoryReservationService(gis, stripes=stripes)
+        feed = service.subscribe()
+        center_ids = sorted(gis.query_center_ids(items=items))
+        initial = {(c, item): gis.resource_centers[c].inventory.get(item, 0) for c in center_ids for item in items}
+
+        def worker(worker_id: int) -> Tuple[int, int, int]:
+            local = np.random.default_rng([seed, worker_id])
+            committed = rejected = restocked = 0
+            for n in range(operations // threads):
+                center_id = center_ids[local.integers(len(center_ids))]
+                item = items[local.integers(len(items))]
+                key = f"{worker_id}-{n}"
+                try:
+                    reservation = service.reserve(center_id, item, int(local.integers(1, 5)), key)
+                except ValueError:
+                    rejected += 1
+                    # Ran dry: a delivery arrives
+                    service.restock(center_id, item, 100)
+                    restocked += 100
+                    continue
+                # A retried request must not reserve twice
+                if local.random() < 0.05:
+                    assert service.reserve(center_id, item, reservation.quantity, key) is reservation
+                if local.random() < 0.5:
+                    service.commit(reservation.reservation_id)
+                    committed += reservation.quantity
+                else:
+                    service.release(reservation.reservation_id)
+            return committed, rejected, restocked
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(worker, range(threads)))
+        elapsed = time.perf_counter() - start
+
+        committed = sum(r[0] for r in results)
+        rejected = sum(r[1] for r in results)
+        restocked = sum(r[2] for r in results)
+        final = {(c, item): gis.resource_centers[c].inventory.get(item, 0) for c in center_ids for item in items}
+        assert all(quantity >= 0 for quantity in final.values()), "inventory went negative"
+        assert sum(initial.values()) + restocked - sum(final.values()) == committed, "committed units do not match inventory"
+        assert all(value == 0 for value in service.reserved.values()), "reservations left open"
+        print(f"{stripes} lock stripe(s), {threads} threads: {operations / elapsed:,.0f} reservations/s, "
+              f"{committed} units committed, {rejected} rejected for stock, {feed.qsize()} low-stock events")
+    print("No over-allocation: inventory never negative and matches the committed reservations")
+
+
+if __name__ == "__main__":
+    run_reservation_stress_test()
@@ -0,0 +1,290 @@
+# stubble hotspot grid - farms binned into fixed square cells or hexagons with numpy; per cell farm count, rice
+# area (stubble load), 10 / 25 km coverage and distance to the nearest center, updated incrementally, as geojson
+
+import json
+import math
+import os
+import time
+from dataclasses import replace
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from MiniProject_SB1c_DistanceKernels import HaversineKernel, HARYANA_BOUNDS
+from MiniProject_SB7_Metrics import timed, increment
+
+KM_PER_DEGREE_LAT = 111.32
+KEY_STRIDE = 1_000_003  # cell key = row * KEY_STRIDE + column
+SQRT3 = math.sqrt(3)
+
+# Per-farm contribution to its cell, in column order
+FIELDS = ("farm_count", "total_area", "rice_area", "uncovered_rice_area", "farms_within_10km", "farms_within_25km")
+
+
+class HotspotGrid:
+    """Aggregates of the farms of a HaryanaGISService over a grid anchored at the south-west corner of
+    Haryana, so cell ids are stable between runs.
+
+    shape="square": cells of cell_km x cell_km; shape="hex": pointy-top hexagons cell_km across the flats.
+    Each farm's contribution (the FIELDS row) is remembered, so update() with the ids of added, moved,
+    removed or re-covered farms only subtracts their old rows and adds their new ones."""
+
+    def __init__(self, service, cell_km: float = 5.0, shape: str = "square"):
+        if shape not in ("square", "hex"):
+            raise ValueError(f"Unknown grid shape: {shape} (choose from square, hex)")
+        self.service = service
+        self.cell_km = cell_km
+        self.shape = shape
+        self.origin = (HARYANA_BOUNDS["min_lat"], HARYANA_BOUNDS["min_lon"])
+        mid_lat = (HARYANA_BOUNDS["min_lat"] + HARYANA_BOUNDS["max_lat"]) / 2
+        self.km_per_degree_lon = KM_PER_DEGREE_LAT * math.cos(math.radians(mid_lat))
+        self.hex_size = cell_km / SQRT3  # center-to-corner
+
+        self.cell_keys = np.empty(0, dtype=np.int64)
+        self.cell_rows: Dict[int, int] = {}
+        self.totals = np.zeros((0, len(FIELDS)))
+        self.farm_rows: Dict[str, int] = {}
+        self.farm_cells = np.empty(0, dtype=np.int64)  # per farm row: cell row, -1 once removed
+        self.farm_values = np.zeros((0, len(FIELDS)))
+
+    # Projection - km east / north of the origin
+    def _project(self, lats, lons):
+        return ((np.asarray(lons, dtype=float) - self.origin[1]) * self.km_per_degree_lon,
+                (np.asarray(lats, dtype=float) - self.origin[0]) * KM_PER_DEGREE_LAT)
+
+    def _unproject(self, x, y):
+        return self.origin[0] + np.asarray(y) / KM_PER_DEGREE_LAT, self.origin[1] + np.asarray(x) / self.km_per_degree_lon
+
+    def keys_for(self, lats, lons) -> np.ndarray:
+        """Cell key of every point, vectorized"""
+        x, y = self._project(lats, lons)
+        if self.shape == "square":
+            rows = np.floor(y / self.cell_km).astype(np.int64)
+            cols = np.floor(x / self.cell_km).astype(np.int64)
+            return rows * KEY_STRIDE + cols
+
+        # Axial hex coordinates, rounded through cube coordinates
+        q = (SQRT3 / 3 * x - y / 3) / self.hex_size
+        r = (2 / 3 * y) / self.hex_size
+        s = -q - r
+        rq, rr, rs = np.round(q), np.round(r), np.round(s)
+        dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+        fix_q = (dq > dr) & (dq > ds)
+        fix_r = ~fix_q & (dr > ds)
+        rq = np.where(fix_q, -rr - rs, rq)
+        rr = np.where(fix_r, -rq - rs, rr)
+        return rr.astype(np.int64) * KEY_STRIDE + rq.astype(np.int64)
+
+    def _split(self, keys: np.ndarray):
+        rows = np.floor_divide(keys + KEY_STRIDE // 2, KEY_STRIDE)
+        return rows, keys - rows * KEY_STRIDE
+
+    def cell_centers(self, keys: np.ndarray):
+        """(lats, lons) of the cell centers"""
+        rows, cols = self._split(np.asarray(keys, dtype=np.int64))
+        if self.shape == "square":
+            return self._unproject((cols + 0.5) * self.cell_km, (rows + 0.5) * self.cell_km)
+        return self._unproject(self.hex_size * (SQRT3 * cols + SQRT3 / 2 * rows), self.hex_size * 1.5 * rows)
+
+    def cell_polygon(self, key: int) -> List[List[float]]:
+        """Closed [lon, lat] ring of one cell"""
+        rows, cols = self._split(np.array([key], dtype=np.int64))
+        row, col = int(rows[0]), int(cols[0])
+        if self.shape == "square":
+            xs = np.array([col, col + 1, col + 1, col, col]) * self.cell_km
+            ys = np.array([row, row, row + 1, row + 1, row]) * self.cell_km
+        else:
+            cx, cy = self.hex_size * (SQRT3 * col + SQRT3 / 2 * row), self.hex_size * 1.5 * row
+            angles = np.radians(np.arange(30, 420, 60))
+            xs, ys = cx + self.hex_size * np.cos(angles), cy + self.hex_size * np.sin(angles)
+        lats, lons = self._unproject(xs, ys)
+        return [[round(float(lon), 6), round(float(lat), 6)] for lat, lon in zip(lats, lons)]
+
+    def _cell_rows_for(self, keys: np.ndarray) -> np.ndarray:
+        """Rows of the totals table for the keys, appending cells seen for the first time"""
+        unique, inverse = np.unique(keys, return_inverse=True)
+        new = [int(k) for k in unique if int(k) not in self.cell_rows]
+        if new:
+            for key in new:
+                self.cell_rows[key] = len(self.cell_rows)
+            self.cell_keys = np.append(self.cell_keys, np.array(new, dtype=np.int64))
+            self.totals = np.vstack([self.totals, np.zeros((len(new), len(FIELDS)))])
+        lookup = np.array([self.cell_rows[int(k)] for k in unique], dtype=np.int64)
+        return lookup[inverse]
+
+    def _contributions(self, farm_ids: List[str]):
+        farms, assignments = self.service.farms, self.service.farm_assignments
+        n = len(farm_ids)
+        lats = np.empty(n)
+        lons = np.empty(n)
+        values = np.zeros((n, len(FIELDS)))
+        for i, farm_id in enumerate(farm_ids):
+            farm = farms[farm_id]
+            lats[i], lons[i] = farm.location.latitude, farm.location.longitude
+            distance = assignments.get(farm_id, (None, math.inf))[1]
+            rice = farm.area if "Rice" in farm.crop_types else 0.0
+            values[i] = (1, farm.area, rice, rice if distance > 10 else 0.0, distance <= 10, distance <= 25)
+        return lats, lons, values
+
+    @timed("gis.hotspot_grid_update")
+    def update(self, farm_ids: Optional[Iterable[str]] = None) -> int:
+        """Re-aggregate the given farms (all registered farms when None); ids no longer registered are
+        removed from their cells. Returns the number of farms processed"""
+        if farm_ids is None:
+            present = list(self.service.farms)
+            removed = [f for f in self.farm_rows if f not in self.service.farms]
+        else:
+            farm_ids = list(farm_ids)
+            present = [f for f in farm_ids if f in self.service.farms]
+            removed = [f for f in farm_ids if f not in self.service.farms]
+
+        # Take back the previous contribution of every farm being updated or removed
+        previous = [self.farm_rows[f] for f in present + removed if f in self.farm_rows]
+        if previous:
+            previous = np.array(previous, dtype=np.int64)
+            live = previous[self.farm_cells[previous] >= 0]
+            np.subtract.at(self.totals, self.farm_cells[live], self.farm_values[live])
+            self.farm_cells[previous] = -1
+
+        if present:
+            lats, lons, values = self._contributions(present)
+            cells = self._cell_rows_for(self.keys_for(lats, lons))
+            np.add.at(self.totals, cells, values)
+            new = [f for f in present if f not in self.farm_rows]
+            for farm_id in new:
+                self.farm_rows[farm_id] = len(self.farm_rows)
+            if new:
+                self.farm_cells = np.append(self.farm_cells, np.full(len(new), -1, dtype=np.int64))
+                self.farm_values = np.vstack([self.farm_values, np.zeros((len(new), len(FIELDS)))])
+            positions = np.array([self.farm_rows[f] for f in present], dtype=np.int64)
+            self.farm_cells[positions] = cells
+            self.farm_values[positions] = values
+
+        increment("gis.hotspot_farms_updated", len(present) + len(removed))
+        return len(present) + len(removed)
+
+    def nearest_center_km(self, keys: np.ndarray) -> np.ndarray:
+        """Distance from each cell center to the nearest resource center (inf without centers)"""
+        lats, lons = self.cell_centers(keys)
+        nearest = np.full(len(keys), np.inf)
+        kernel = HaversineKernel()
+        for center in self.service.resource_centers.values():
+            nearest = np.minimum(nearest, kernel.distances(center.location.latitude, center.location.longitude,
+                                                           lats, lons))
+        return nearest
+
+    @timed("gis.hotspot_grid_cells")
+    def cells(self, min_farms: int = 1) -> List[Dict]:
+        """Per-cell statistics, highest uncovered rice area (the stubble hotspots) first"""
+        occupied = np.flatnonzero(self.totals[:, 0] >= max(min_farms, 1))
+        order = occupied[np.argsort(-self.totals[occupied, FIELDS.index("uncovered_rice_area")], kind="stable")]
+        keys = self.cell_keys[order]
+        lats, lons = self.cell_centers(keys)
+        nearest = self.nearest_center_km(keys)
+
+        results = []
+        for k, row in enumerate(order):
+            stats = dict(zip(FIELDS, self.totals[row].tolist()))
+            count = stats["farm_count"]
+            for field in ("farm_count", "farms_within_10km", "farms_within_25km"):
+                stats[field] = int(round(stats[field]))
+            stats.update({
+                "cell": int(keys[k]),
+                "latitude": float(lats[k]),
+                "longitude": float(lons[k]),
+                "coverage_10km_percent": stats["farms_within_10km"] / count * 100,
+                "coverage_25km_percent": stats["farms_within_25km"] / count * 100,
+                "nearest_center_km": float(nearest[k]),
+            })
+            results.append(stats)
+        return results
+
+    def hotspots(self, top: int = 10) -> List[Dict]:
+        return self.cells()[:top]
+
+    def to_geojson(self, output_file: Optional[str] = None, min_farms: int = 1) -> Dict:
+        """FeatureCollection with one polygon per occupied cell; written atomically when output_file is given"""
+        features = []
+        for stats in self.cells(min_farms):
+            properties = {key: (round(value, 3) if isinstance(value, float) and math.isfinite(value) else value)
+                          for key, value in stats.items()}
+            if not math.isfinite(properties["nearest_center_km"]):
+                properties["nearest_center_km"] = None
+            features.append({
+                "type": "Feature",
+                "geometry": {"type": "Polygon", "coordinates": [self.cell_polygon(stats["cell"])]},
+                "properties": properties,
+            })
+        collection = {"type": "FeatureCollection", "features": features}
+        if output_file:
+            tmp_path = f"{output_file}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(collection, f)
+            os.replace(tmp_path, output_file)
+        return collection
+
+    def add_to_map(self, folium_map, min_farms: int = 1):
+        """Overlay the cells on a folium map, shaded by uncovered rice area"""
+        import folium
+
+        collection = self.to_geojson(min_farms=min_farms)
+        peak = max((f["properties"]["uncovered_rice_area"] for f in collection["features"]), default=0) or 1
+        folium.GeoJson(
+            collection,
+            name="Stubble hotspots",
+            style_function=lambda feature: {
+                "fillColor": "red",
+                "color": "gray",
+                "weight": 0.5,
+                "fillOpacity": 0.1 + 0.7 * feature["properties"]["uncovered_rice_area"] / peak,
+            },
+            tooltip=folium.GeoJsonTooltip(fields=["farm_count", "rice_area", "uncovered_rice_area",
+                                                  "coverage_10km_percent", "nearest_center_km"]),
+        ).add_to(folium_map)
+        return folium_map
+
+
+# Scale test - statewide hotspots over synthetic farms, full build against incremental update
+def run_hotspot_test(farm_count: int = 100_000, cell_km: float = 5.0, seed: int = 42):
+    from MiniProject_SB1b_GISserviceTest import HaryanaGISService
+    from MiniProject_SB6_Benchmark import CENTERS_PER_DISTRICT, load_distributions, generate_farms, generate_centers
+    import random
+
+    print("Starting Hotspot Grid Test...\n")
+    rng = np.random.default_rng(seed)
+    random.seed(seed)
+    service = HaryanaGISService()
+    farms = generate_farms(farm_count, rng, load_distributions(), service)
+    for center in generate_centers(CENTERS_PER_DISTRICT, rng, farms, service):
+        service.register_resource_center(center)
+    for farm in farms:
+        service.register_farm(farm)
+
+    for shape in ("square", "hex"):
+        grid = HotspotGrid(service, cell_km, shape)
+        start = time.perf_counter()
+        grid.update()
+        collection = grid.to_geojson(f"haryana_hotspots_{shape}.geojson")
+        elapsed = time.perf_counter() - start
+        print(f"{shape}: {farm_count} farms into {len(collection['features'])} cells of {cell_km} km, "
+              f"aggregated and exported in {elapsed:.2f}s")
+
+    # Incremental: move a few farms (re-registered with a new Location) and re-aggregate only those
+    moved = [farm.farmer_id for farm in farms[:100]]
+    for farmer_id in moved:
+        farm = service.farms[farmer_id]
+        location = replace(farm.location, latitude=farm.location.latitude + 0.1)
+        service.register_farm(replace(farm, location=location))
+    start = time.perf_counter()
+    grid.update(moved)
+    print(f"Incremental update of {len(moved)} moved farms: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    print("\nTop stubble hotspots (rice area beyond 10 km of a center):")
+    for stats in grid.hotspots(5):
+        print(f"({stats['latitude']:.3f}, {stats['longitude']:.3f}): {stats['farm_count']} farms, "
+              f"{stats['uncovered_rice_area']:.0f} ha uncovered rice, nearest center {stats['nearest_center_km']:.1f} km")
+    return grid
+
+
+if __name__ == "__main__":
+    run_hotspot_test()
@@ -0,0 +1,292 @@
+# district resolution - which haryana district a coordinate falls in, from the boundary polygons of a local geojson
+# file, with a grid index & vectorized point-in-polygon tests (only a centroid-voronoi placeholder ships so far)
+
+import json
+import math
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from MiniProject_SB1c_DistanceKernels import HARYANA_BOUNDS
+from MiniProject_SB7_Metrics import timed, increment
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Surveyed district boundaries go here; none ship yet, so nothing resolves districts by default
+DISTRICT_BOUNDARIES_PATH = os.path.join(BASE_DIR, "haryana_districts.geojson")
+# The placeholder: nearest-centroid cells within the state outline, usable only with allow_approximate=True
+APPROXIMATE_BOUNDARIES_PATH = os.path.join(BASE_DIR, "haryana_districts_approximate.geojson")
+KEY_STRIDE = 1_000_003
+# Hand-traced approximation of the state border as (lat, lon), accurate to a few km: enough to tell Delhi,
+# Chandigarh and the neighbouring states' towns from Haryana's, not for surveying
+HARYANA_OUTLINE = [
+    (30.93, 76.93), (30.82, 77.10), (30.62, 77.25), (30.50, 77.45), (30.40, 77.58), (30.20, 77.45), (30.00, 77.30),
+    (29.75, 77.17), (29.45, 77.15), (29.10, 77.15), (28.88, 77.20), (28.87, 77.05), (28.78, 76.98), (28.69, 76.96),
+    (28.60, 76.86), (28.52, 76.93), (28.47, 77.05), (28.45, 77.15), (28.50, 77.33), (28.45, 77.40), (28.30, 77.50),
+    (28.05, 77.52), (27.85, 77.47), (27.80, 77.25), (27.66, 77.05), (27.70, 76.90), (27.95, 76.93), (28.18, 76.92),
+    (28.26, 76.84), (28.15, 76.78), (28.00, 76.60), (27.95, 76.25), (27.82, 76.10), (27.95, 75.95), (28.15, 75.85),
+    (28.40, 75.75), (28.70, 75.50), (28.95, 75.35), (29.15, 75.10), (29.35, 74.80), (29.50, 74.50), (29.80, 74.47),
+    (30.00, 74.60), (29.97, 74.80), (29.85, 75.00), (29.62, 75.20), (29.80, 75.55), (29.78, 75.90), (29.98, 76.20),
+    (30.10, 76.35), (30.12, 76.60), (30.25, 76.65), (30.42, 76.75), (30.55, 76.90), (30.68, 76.83), (30.80, 76.88),
+]
+
+
+def _rings(geometry: Dict) -> List[np.ndarray]:
+    """Every ring (outer boundaries and holes) of a Polygon / MultiPolygon as (n, 2) lon, lat arrays"""
+    if geometry["type"] == "Polygon":
+        polygons = [geometry["coordinates"]]
+    elif geometry["type"] == "MultiPolygon":
+        polygons = geometry["coordinates"]
+    else:
+        raise ValueError(f"Unsupported district geometry: {geometry['type']}")
+    return [np.asarray(ring, dtype=float)[:, :2] for polygon in polygons for ring in polygon]
+
+
+def points_in_rings(lons: np.ndarray, lats: np.ndarray, rings: List[np.ndarray]) -> np.ndarray:
+    """Even-odd ray casting over all rings at once, so holes and multi-part districts need no special case.
+    Loops over edges, vectorized over the points"""
+    inside = np.zeros(len(lons), dtype=bool)
+    for ring in rings:
+        x1, y1 = ring[:-1, 0], ring[:-1, 1]
+        x2, y2 = ring[1:, 0], ring[1:, 1]
+        for ax, ay, bx, by in zip(x1, y1, x2, y2):
+            if ay == by:
+                continue
+            crosses = (ay > lats) != (by > lats)
+            if not crosses.any():
+                continue
+            x_at = ax + (lats - ay) * (bx - ax) / (by - ay)
+            inside ^= crosses & (lons < x_at)
+    return inside
+
+
+class DistrictResolver:
+    """District lookup against the boundary polygons of a GeoJSON FeatureCollection (district name in the
+    "district" or "name" property). A feature with the property "boundary": "state" is the state outline:
+    points outside it resolve to None whichever district polygon covers them. A file whose features' "source"
+    says "approximate" (the centroid-voronoi placeholder, which gives the nearest-centroid answer) is refused
+    unless allow_approximate is set.
+
+    A grid of cell_size degrees indexes the polygons: each cell keeps the districts whose bounding box
+    touches it, and cells lying wholly inside one district (and the outline) answer directly, so only points
+    near a border reach the point-in-polygon test."""
+
+    def __init__(self, path: str = DISTRICT_BOUNDARIES_PATH, cell_size: float = 0.05, allow_approximate: bool = False):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No district boundaries at {path}; add surveyed boundaries there, or pass "
+                                    f"APPROXIMATE_BOUNDARIES_PATH with allow_approximate=True for the placeholder")
+        with open(path) as f:
+            collection = json.load(f)
+        self.cell_size = cell_size
+        self.names: List[str] = []
+        self.rings: List[List[np.ndarray]] = []
+        self.outline: List[np.ndarray] = []
+        self.approximate = False
+        for feature in collection["features"]:
+            properties = feature.get("properties") or {}
+            self.approximate |= str(properties.get("source", "")).startswith("approximate")
+            if properties.get("boundary") == "state":
+                self.outline.extend(_rings(feature["geometry"]))
+                continue
+            self.names.append(properties.get("district") or properties.get("name"))
+            self.rings.append(_rings(feature["geometry"]))
+        self.bounds = np.array([[min(r[:, 0].min() for r in rings), min(r[:, 1].min() for r in rings),
+                                 max(r[:, 0].max() for r in rings), max(r[:, 1].max() for r in rings)]
+                                for rings in self.rings])
+        if self.approximate and not allow_approximate:
+            raise ValueError(f"{path} holds approximate boundaries; pass allow_approximate=True to use them")
+        self._build_index()
+
+    def _cell_keys(self, lons, lats) -> np.ndarray:
+        rows = np.floor(np.asarray(lats, dtype=float) / self.cell_size).astype(np.int64)
+        cols = np.floor(np.asarray(lons, dtype=float) / self.cell_size).astype(np.int64)
+        return rows * KEY_STRIDE + cols
+
+    def _build_index(self):
+        self.candidates: Dict[int, List[int]] = {}
+        for index, (min_lon, min_lat, max_lon, max_lat) in enumerate(self.bounds):
+            for row in range(math.floor(min_lat / self.cell_size), math.floor(max_lat / self.cell_size) + 1):
+                for col in range(math.floor(min_lon / self.cell_size), math.floor(max_lon / self.cell_size) + 1):
+                    self.candidates.setdefault(row * KEY_STRIDE + col, []).append(index)
+
+        # A cell is interior to a district when its corners are inside and no boundary edge crosses it
+        self.interior: Dict[int, int] = {}
+        edges = [np.vstack([np.column_stack([r[:-1], r[1:]]) for r in rings]) for rings in self.rings]
+        outline_edges = np.vstack([np.column_stack([r[:-1], r[1:]]) for r in self.outline]) if self.outline else None
+        inside_outline = []
+        for key, indices in self.candidates.items():
+            row, col = divmod(key + KEY_STRIDE // 2, KEY_STRIDE)
+            col -= KEY_STRIDE // 2
+            x0, y0 = col * self.cell_size, row * self.cell_size
+            x1, y1 = x0 + self.cell_size, y0 + self.cell_size
+            if outline_edges is not None:
+                # Cells the outline crosses or that lie outside it never answer directly
+                if self._edges_cross_cell(outline_edges, x0, y0, x1, y1) or not points_in_rings(
+                        np.array([x0, x1, x1, x0]), np.array([y0, y0, y1, y1]), self.outline).all():
+                    continue
+                inside_outline.append(key)
+            for index in indices:
+                if self._edges_cross_cell(edges[index], x0, y0, x1, y1):
+                    continue
+                corners = points_in_rings(np.array([x0, x1, x1, x0]), np.array([y0, y0, y1, y1]), self.rings[index])
+                if corners.all():
+                    self.interior[key] = index
+                    break
+        self.inside_outline = np.array(sorted(inside_outline), dtype=np.int64)
+
+    @staticmethod
+    def _edges_cross_cell(edges: np.ndarray, x0: float, y0: float, x1: float, y1: float) -> bool:
+        """True if any (ax, ay, bx, by) edge overlaps the rectangle: bounding boxes overlap and the corners
+        of the rectangle are not all on one side of the edge's line"""
+        ax, ay, bx, by = edges[:, 0], edges[:, 1], edges[:, 2], edges[:, 3]
+        near = ((np.minimum(ax, bx) <= x1) & (np.maximum(ax, bx) >= x0)
+                & (np.minimum(ay, by) <= y1) & (np.maximum(ay, by) >= y0))
+        if not near.any():
+            return False
+        ax, ay, bx, by = ax[near], ay[near], bx[near], by[near]
+        sides = np.stack([(bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+                          for cx, cy in ((x0, y0), (x1, y0), (x1, y1), (x0, y1))])
+        return bool(((sides.min(axis=0) <= 0) & (sides.max(axis=0) >= 0)).any())
+
+    def resolve(self, latitude: float, longitude: float) -> Optional[str]:
+        """District containing the point, or None outside every district (or the state outline)"""
+        return self.resolve_many([latitude], [longitude])[0]
+
+    @timed("gis.resolve_districts")
+    def resolve_many(self, lats, lons) -> List[Optional[str]]:
+        """Districts of many points at once"""
+        lats, lons = np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)
+        result = np.full(len(lats), -1, dtype=np.int64)
+        keys = self._cell_keys(lons, lats)
+
+        unique, inverse = np.unique(keys, return_inverse=True)
+        interior = np.array([self.interior.get(int(k), -1) for k in unique], dtype=np.int64)
+        result[:] = interior[inverse]
+
+        # Border cells: test the points against each candidate district in turn
+        pending = np.flatnonzero(result < 0)
+        tested = 0
+        if len(pending):
+            pending_keys = keys[pending]
+            pending_cells = [int(k) for k in np.unique(pending_keys)]
+            for index in range(len(self.names)):
+                cells = [k for k in pending_cells if index in self.candidates.get(k, ())]
+                if not cells:
+                    continue
+                subset = pending[np.isin(pending_keys, cells) & (result[pending] < 0)]
+                if not len(subset):
+                    continue
+                tested += len(subset)
+                inside = points_in_rings(lons[subset], lats[subset], self.rings[index])
+                result[subset[inside]] = index
+
+            if self.outline:
+                # Border cells of the outline itself: drop the points that fall outside the state
+                check = pending[(result[pending] >= 0) & ~np.isin(pending_keys, self.inside_outline)]
+                tested += len(check)
+                outside = ~points_in_rings(lons[check], lats[check], self.outline)
+                result[check[outside]] = -1
+
+        increment("gis.district_pip_tests", tested)
+        return [self.names[i] if i >= 0 else None for i in result.tolist()]
+
+
+def build_approximate_boundaries(district_coordinates: Dict[str, Tuple[float, float]],
+                                 output_file: str = APPROXIMATE_BOUNDARIES_PATH) -> Dict:
+    """Write a placeholder boundary file: the Voronoi cells of the district centroids, clipped to the state's
+    bounding box, plus HARYANA_OUTLINE as the state boundary. Inside the outline this is exactly the nearest-
+    centroid assignment, so every feature is marked "approximate" and DistrictResolver only reads it with
+    allow_approximate=True. Surveyed boundaries (same "district" property) belong at DISTRICT_BOUNDARIES_PATH."""
+    b = HARYANA_BOUNDS
+    scale = math.cos(math.radians((b["min_lat"] + b["max_lat"]) / 2))  # lon degrees -> equal-length units
+    box = [(b["min_lon"], b["min_lat"]), (b["max_lon"], b["min_lat"]),
+           (b["max_lon"], b["max_lat"]), (b["min_lon"], b["max_lat"])]
+
+    def clip(polygon, site, other):
+        # Keep the half-plane closer to site than to other (Sutherland-Hodgman against the bisector)
+        sx, sy = site[1] * scale, site[0]
+        ox, oy = other[1] * scale, other[0]
+        nx, ny = ox - sx, oy - sy
+        c = (ox * ox + oy * oy - sx * sx - sy * sy) / 2
+
+        def side(p):
+            return p[0] * scale * nx + p[1] * ny - c
+
+        clipped = []
+        for i, p in enumerate(polygon):
+            q = polygon[(i + 1) % len(polygon)]
+            sp, sq = side(p), side(q)
+            if sp <= 0:
+                clipped.append(p)
+            if (sp < 0) != (sq < 0) and sp != sq:
+                t = sp / (sp - sq)
+                clipped.append((p[0] + t * (q[0] - p[0]), p[1] + t * (q[1] - p[1])))
+        return clipped
+
+    features = []
+    for district, site in district_coordinates.items():
+        polygon = box
+        for other_district, other in district_coordinates.items():
+            if other_district != district:
+                polygon = clip(polygon, site, other)
+        ring = [[round(lon, 6), round(lat, 6)] for lon, lat in polygon]
+        ring.append(ring[0])
+        features.append({
+            "type": "Feature",
+            "properties": {"district": district, "source": "approximate (centroid voronoi)"},
+            "geometry": {"type": "Polygon", "coordinates": [ring]},
+        })
+    outline = [[lon, lat] for lat, lon in HARYANA_OUTLINE]
+    features.append({
+        "type": "Feature",
+        "properties": {"boundary": "state", "name": "Haryana", "source": "approximate (hand-traced)"},
+        "geometry": {"type": "Polygon", "coordinates": [outline + [outline[0]]]},
+    })
+    collection = {"type": "FeatureCollection", "features": features}
+    tmp_path = f"{output_file}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(collection, f, indent=1)
+    os.replace(tmp_path, output_file)
+    return collection
+
+
+# Bulk test - tag a million random points statewide and compare a sample with a plain loop over all polygons
+def run_district_test(point_count: int = 1_000_000, seed: int = 42):
+    print("Starting District Resolution Test...\n")
+    path = DISTRICT_BOUNDARIES_PATH if os.path.exists(DISTRICT_BOUNDARIES_PATH) else APPROXIMATE_BOUNDARIES_PATH
+    resolver = DistrictResolver(path, allow_approximate=True)
+    if resolver.approximate:
+        print("(approximate placeholder boundaries - nearest-centroid districts, timing only)")
+    rng = np.random.default_rng(seed)
+    b = HARYANA_BOUNDS
+    lats = rng.uniform(b["min_lat"], b["max_lat"], point_count)
+    lons = rng.uniform(b["min_lon"], b["max_lon"], point_count)
+
+    start = time.perf_counter()
+    districts = resolver.resolve_many(lats, lons)
+    elapsed = time.perf_counter() - start
+    interior = sum(1 for k in resolver._cell_keys(lons[:10000], lats[:10000]) if int(k) in resolver.interior)
+    print(f"{point_count} points tagged in {elapsed:.2f}s ({elapsed / point_count * 1e9:.0f} ns per point), "
+          f"{interior / 100:.0f}% answered from interior cells")
+
+    sample = slice(0, 2000)
+    brute = []
+    for lat, lon in zip(lats[sample], lons[sample]):
+        hits = [name for name, rings in zip(resolver.names, resolver.rings)
+                if points_in_rings(np.array([lon]), np.array([lat]), rings)[0]]
+        if resolver.outline and not points_in_rings(np.array([lon]), np.array([lat]), resolver.outline)[0]:
+            hits = []
+        brute.append(hits[0] if hits else None)
+    print(f"Matches the unindexed point-in-polygon test: {brute == districts[sample]}")
+
+    counts: Dict[str, int] = {}
+    for district in districts:
+        counts[district or "outside"] = counts.get(district or "outside", 0) + 1
+    for district, count in sorted(counts.items(), key=lambda item: -item[1])[:5]:
+        print(f"{district}: {count}")
+    return districts
+
+
+if __name__ == "__main__":
+    run_district_test()
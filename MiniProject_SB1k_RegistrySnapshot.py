@@ -0,0 +1,483 @@
+# registry snapshot - save the whole HaryanaGISService state (farms, centers, inventories, coverage assignments,
+# grids & indexes) to one binary file and restore it with memory-mapped columns and lazily decoded tables
+
+import json
+import os
+import struct
+import time
+from collections.abc import MutableMapping
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from MiniProject_SB7_Metrics import timed
+
+MAGIC = b"AGRISNAP"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+EPOCH = datetime(1970, 1, 1)
+CROP_SEPARATOR = "\x1f"
+
+# Farm fields stored as int32 codes into a table of distinct values
+CATEGORICAL_FIELDS = ("district", "name", "address", "type", "soil_type", "season", "soil_npk", "soil_ph",
+                      "microbial_solution", "water_requirement", "crops")
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+class SnapshotFile:
+    """Read side of a snapshot: the header, numeric columns as read-only memory maps and JSON tables
+    decoded on first use.
+
+    Layout: MAGIC, uint32 version, uint64 header length, the JSON header, then every column and table
+    at a 64-byte aligned offset (relative to the end of the header) listed in the header."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, header_length = struct.unpack("<8sIQ", f.read(20))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a registry snapshot")
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Snapshot format version {version} is not supported (expected {FORMAT_VERSION})")
+            self.header = json.loads(f.read(header_length))
+        self.data_offset = _align(20 + header_length)
+        self._tables: Dict[str, object] = {}
+
+    def column(self, name: str) -> np.ndarray:
+        spec = self.header["columns"][name]
+        if not spec["shape"][0]:
+            return np.empty(spec["shape"], dtype=spec["dtype"])
+        return np.memmap(self.path, dtype=spec["dtype"], mode="r", offset=self.data_offset + spec["offset"],
+                         shape=tuple(spec["shape"]))
+
+    def table(self, name: str):
+        if name not in self._tables:
+            spec = self.header["tables"][name]
+            with open(self.path, "rb") as f:
+                f.seek(self.data_offset + spec["offset"])
+                self._tables[name] = json.loads(f.read(spec["length"]))
+        return self._tables[name]
+
+
+def _write_snapshot(path: str, header: Dict, columns: Dict[str, np.ndarray], tables: Dict[str, object]):
+    blobs = []
+    header = dict(header, columns={}, tables={})
+    offset = 0
+    for name, array in columns.items():
+        array = np.ascontiguousarray(array)
+        header["columns"][name] = {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+        blobs.append((offset, array.tobytes()))
+        offset = _align(offset + array.nbytes)
+    for name, value in tables.items():
+        data = json.dumps(value, separators=(",", ":")).encode()
+        header["tables"][name] = {"offset": offset, "length": len(data)}
+        blobs.append((offset, data))
+        offset = _align(offset + len(data))
+
+    header_bytes = json.dumps(header, separators=(",", ":")).encode()
+    data_offset = _align(20 + len(header_bytes))
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(struct.pack("<8sIQ", MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for blob_offset, data in blobs:
+            f.seek(data_offset + blob_offset)
+            f.write(data)
+        f.truncate(data_offset + offset)
+    os.replace(tmp_path, path)
+
+
+class _OverlayMapping(MutableMapping):
+    """Mapping over the rows of a snapshot: values are built from the columns on first access and cached,
+    and changes made after the restore are layered on top, so the service can keep mutating it as a dict"""
+
+    def __init__(self, base_size: int):
+        self._base_size = base_size
+        self._overlay: Dict = {}
+        self._new: Dict = {}  # keys added after the restore, in insertion order
+        self._deleted = set()  # snapshot keys deleted since (possibly added again, then also in _new)
+
+    def _base_row(self, key) -> int:
+        raise NotImplementedError
+
+    def _base_keys(self) -> Iterator:
+        raise NotImplementedError
+
+    def _load(self, row: int):
+        raise NotImplementedError
+
+    def __getitem__(self, key):
+        try:
+            return self._overlay[key]
+        except KeyError:
+            pass
+        if key in self._deleted:
+            raise KeyError(key)
+        row = self._base_row(key)
+        if row < 0:
+            raise KeyError(key)
+        value = self._overlay[key] = self._load(row)
+        return value
+
+    def __setitem__(self, key, value):
+        # Like a dict, a key deleted and set again moves to the end
+        if key in self._deleted or (key not in self._overlay and key not in self._new and self._base_row(key) < 0):
+            self._new[key] = None
+        self._overlay[key] = value
+
+    def __delitem__(self, key):
+        if key in self._new:
+            del self._new[key]
+            del self._overlay[key]
+            return
+        if key in self._deleted or self._base_row(key) < 0:
+            raise KeyError(key)
+        self._overlay.pop(key, None)
+        self._deleted.add(key)
+
+    def __contains__(self, key):
+        if key in self._overlay:
+            return True
+        return key not in self._deleted and self._base_row(key) >= 0
+
+    def __iter__(self):
+        for key in self._base_keys():
+            if key not in self._deleted:
+                yield key
+        yield from list(self._new)
+
+    def __len__(self):
+        return self._base_size - len(self._deleted) + len(self._new)
+
+
+class _FarmIds:
+    """Farmer ids of the snapshot rows: row order for iteration, a sorted copy for O(log n) lookups"""
+
+    def __init__(self, snapshot: SnapshotFile):
+        self.ids = snapshot.column("farm_ids")
+        self.sorted_ids = snapshot.column("farm_ids_sorted")
+        self.sorted_rows = snapshot.column("farm_ids_sorted_rows")
+
+    def __len__(self):
+        return len(self.ids)
+
+    def row(self, farmer_id) -> int:
+        if not isinstance(farmer_id, str) or not len(self.ids):
+            return -1
+        key = farmer_id.encode()
+        position = int(np.searchsorted(self.sorted_ids, key))
+        if position < len(self.sorted_ids) and self.sorted_ids[position] == key:
+            return int(self.sorted_rows[position])
+        return -1
+
+    def decode(self, rows) -> List[str]:
+        return [value.decode() for value in self.ids[rows].tolist()]
+
+    def __iter__(self):
+        chunk = 65536
+        for start in range(0, len(self.ids), chunk):
+            yield from (value.decode() for value in self.ids[start:start + chunk].tolist())
+
+
+class FarmTable(_OverlayMapping):
+    """service.farms restored from a snapshot; Farm objects are built per id on first access"""
+
+    def __init__(self, snapshot: SnapshotFile, ids: _FarmIds):
+        super().__init__(len(ids))
+        self._snapshot = snapshot
+        self._ids = ids
+        self._lat, self._lon = snapshot.column("farm_lat"), snapshot.column("farm_lon")
+        self._area = snapshot.column("farm_area")
+        self._registered = snapshot.column("farm_registered_us")
+        self._codes = {field: snapshot.column(f"farm_{field}") for field in CATEGORICAL_FIELDS}
+
+    def _base_row(self, key):
+        return self._ids.row(key)
+
+    def _base_keys(self):
+        return iter(self._ids)
+
+    def _category(self, field: str, row: int):
+        return self._snapshot.table(f"categories_{field}")[int(self._codes[field][row])]
+
+    def _load(self, row):
+        from MiniProject_SB1b_GISserviceTest import Farm, Location
+        crops = self._category("crops", row)
+        return Farm(
+            location=Location(
+                latitude=float(self._lat[row]),
+                longitude=float(self._lon[row]),
+                name=self._category("name", row),
+                address=self._category("address", row),
+                district=self._category("district", row),
+                type=self._category("type", row),
+            ),
+            area=float(self._area[row]),
+            farmer_id=self._ids.decode([row])[0],
+            crop_types=crops.split(CROP_SEPARATOR) if crops else [],
+            soil_type=self._category("soil_type", row),
+            season=self._category("season", row),
+            soil_npk=self._category("soil_npk", row),
+            soil_ph=self._category("soil_ph", row),
+            microbial_solution=self._category("microbial_solution", row),
+            water_requirement=self._category("water_requirement", row),
+            registration_date=EPOCH + timedelta(microseconds=int(self._registered[row])),
+        )
+
+
+class AssignmentTable(_OverlayMapping):
+    """service.farm_assignments restored from a snapshot: (center_id | None, distance) per farm"""
+
+    def __init__(self, snapshot: SnapshotFile, ids: _FarmIds):
+        super().__init__(len(ids))
+        self._snapshot = snapshot
+        self._ids = ids
+        self._centers = snapshot.column("assignment_center")
+        self._distances = snapshot.column("assignment_distance")
+
+    def _base_row(self, key):
+        return self._ids.row(key)
+
+    def _base_keys(self):
+        return iter(self._ids)
+
+    def _load(self, row):
+        code = int(self._centers[row])
+        center_id = self._snapshot.table("center_ids")[code] if code >= 0 else None
+        return center_id, float(self._distances[row])
+
+
+class GroupedIds(_OverlayMapping):
+    """A key -> collection of farmer ids structure (grid cells, district and center indexes) restored
+    from farm rows grouped by key; each group is decoded when first touched"""
+
+    def __init__(self, keys: List, offsets: np.ndarray, rows: np.ndarray, ids: _FarmIds, as_set: bool):
+        super().__init__(len(keys))
+        self._keys = keys
+        self._positions = {key: i for i, key in enumerate(keys)}
+        self._offsets = offsets
+        self._rows = rows
+        self._ids = ids
+        self._as_set = as_set
+
+    def _base_row(self, key):
+        return self._positions.get(key, -1)
+
+    def _base_keys(self):
+        return iter(self._keys)
+
+    def _load(self, row):
+        farmer_ids = self._ids.decode(self._rows[self._offsets[row]:self._offsets[row + 1]])
+        return set(farmer_ids) if self._as_set else farmer_ids
+
+
+def _group(keys: List, groups: Dict, row_of: Dict[str, int]) -> Tuple[np.ndarray, np.ndarray]:
+    """Offsets and concatenated farm rows of every key's group"""
+    offsets = [0]
+    rows = []
+    for key in keys:
+        rows.extend(row_of[farmer_id] for farmer_id in groups[key])
+        offsets.append(len(rows))
+    return np.array(offsets, dtype=np.int64), np.array(rows, dtype=np.int64)
+
+
+def _center_to_json(center) -> Dict:
+    location = center.location
+    return {
+        "location": [location.latitude, location.longitude, location.name, location.address,
+                     location.district, location.type],
+        "center_id": center.center_id,
+        "services": center.services,
+        "operating_hours": center.operating_hours,
+        "contact_info": center.contact_info,
+        "inventory": center.inventory,
+    }
+
+
+@timed("gis.snapshot_save")
+def save_snapshot(service, path: str = "agrihub_registry.snap") -> Dict:
+    """Write the full registry of a HaryanaGISService; returns the header"""
+    farm_ids = list(service.farms)
+    farms = [service.farms[farmer_id] for farmer_id in farm_ids]
+    row_of = {farmer_id: row for row, farmer_id in enumerate(farm_ids)}
+    center_ids = list(service.resource_centers)
+    center_code = {center_id: code for code, center_id in enumerate(center_ids)}
+
+    columns: Dict[str, np.ndarray] = {}
+    tables: Dict[str, object] = {}
+    encoded = np.array([farmer_id.encode() for farmer_id in farm_ids], dtype=bytes)
+    if not len(encoded):
+        encoded = np.empty(0, dtype="S1")
+    order = np.argsort(encoded, kind="stable")
+    columns["farm_ids"] = encoded
+    columns["farm_ids_sorted"] = encoded[order]
+    columns["farm_ids_sorted_rows"] = order.astype(np.int64)
+    columns["farm_lat"] = np.array([farm.location.latitude for farm in farms], dtype=np.float64)
+    columns["farm_lon"] = np.array([farm.location.longitude for farm in farms], dtype=np.float64)
+    columns["farm_area"] = np.array([farm.area for farm in farms], dtype=np.float64)
+    columns["farm_registered_us"] = np.array([(farm.registration_date - EPOCH) // timedelta(microseconds=1)
+                                              for farm in farms], dtype=np.int64)
+
+    values = {
+        "district": [farm.location.district for farm in farms],
+        "name": [farm.location.name for farm in farms],
+        "address": [farm.location.address for farm in farms],
+        "type": [farm.location.type for farm in farms],
+        "soil_type": [farm.soil_type for farm in farms],
+        "season": [farm.season for farm in farms],
+        "soil_npk": [farm.soil_npk for farm in farms],
+        "soil_ph": [farm.soil_ph for farm in farms],
+        "microbial_solution": [farm.microbial_solution for farm in farms],
+        "water_requirement": [farm.water_requirement for farm in farms],
+        "crops": [CROP_SEPARATOR.join(farm.crop_types) for farm in farms],
+    }
+    for field in CATEGORICAL_FIELDS:
+        categories: Dict = {}
+        codes = np.array([categories.setdefault(value, len(categories)) for value in values[field]], dtype=np.int32)
+        columns[f"farm_{field}"] = codes
+        tables[f"categories_{field}"] = list(categories)
+
+    assignments = [service.farm_assignments[farmer_id] for farmer_id in farm_ids]
+    columns["assignment_center"] = np.array([center_code[c] if c is not None else -1 for c, _ in assignments],
+                                            dtype=np.int32)
+    columns["assignment_distance"] = np.array([d for _, d in assignments], dtype=np.float64)
+
+    # Grouped structures keep their exact member order (grid cells are lists)
+    grid_keys = list(service.farm_grid.cells)
+    columns["grid_offsets"], columns["grid_rows"] = _group(grid_keys, service.farm_grid.cells, row_of)
+    district_keys = list(service.farm_district_index)
+    columns["district_offsets"], columns["district_rows"] = _group(district_keys, service.farm_district_index, row_of)
+    center_farm_keys = list(service.center_farms)
+    columns["center_farm_offsets"], columns["center_farm_rows"] = _group(center_farm_keys, service.center_farms, row_of)
+
+    tables["center_ids"] = center_ids
+    header = {
+        "format": "agrihub-registry",
+        "created": datetime.now().isoformat(),
+        "farm_count": len(farm_ids),
+        "center_count": len(center_ids),
+        "distance_kernel": service.distance.kernel.name,
+        "farm_grid_cell_size": service.farm_grid.cell_size,
+        "center_grid_cell_size": service.center_grid.cell_size,
+        "grid_keys": [list(key) for key in grid_keys],
+        "district_keys": district_keys,
+        "center_farm_keys": center_farm_keys,
+        "centers": [_center_to_json(service.resource_centers[c]) for c in center_ids],
+        "center_grid": [[list(key), ids] for key, ids in service.center_grid.cells.items()],
+        "service_index": {k: sorted(v) for k, v in service.service_index.items()},
+        "inventory_index": {k: sorted(v) for k, v in service.inventory_index.items()},
+        "center_district_index": {k: sorted(v) for k, v in service.center_district_index.items()},
+        "district_counters": service.district_counters,
+    }
+    _write_snapshot(path, header, columns, tables)
+    return header
+
+
+@timed("gis.snapshot_load")
+def load_snapshot(path: str = "agrihub_registry.snap", service=None):
+    """Restore a registry into a new (or the given) HaryanaGISService. Farm columns stay memory-mapped;
+    farms, assignments and index groups are materialized only as they are used"""
+    from MiniProject_SB1b_GISserviceTest import (HaryanaGISService, ResourceCenter, Location, SpatialGrid)
+    from MiniProject_SB1c_DistanceKernels import ThresholdedDistance
+
+    snapshot = SnapshotFile(path)
+    header = snapshot.header
+    if service is None:
+        service = HaryanaGISService(header["distance_kernel"])
+    else:
+        service.distance = ThresholdedDistance(header["distance_kernel"])
+    ids = _FarmIds(snapshot)
+
+    service.farms = FarmTable(snapshot, ids)
+    service.farm_assignments = AssignmentTable(snapshot, ids)
+    service.farm_grid = SpatialGrid(header["farm_grid_cell_size"])
+    service.farm_grid.cells = GroupedIds([tuple(key) for key in header["grid_keys"]], snapshot.column("grid_offsets"),
+                                         snapshot.column("grid_rows"), ids, as_set=False)
+    service.farm_district_index = GroupedIds(header["district_keys"], snapshot.column("district_offsets"),
+                                             snapshot.column("district_rows"), ids, as_set=True)
+    service.center_farms = GroupedIds(header["center_farm_keys"], snapshot.column("center_farm_offsets"),
+                                      snapshot.column("center_farm_rows"), ids, as_set=True)
+
+    service.resource_centers = {}
+    for data in header["centers"]:
+        latitude, longitude, name, address, district, location_type = data["location"]
+        center = ResourceCenter(
+            location=Location(latitude, longitude, name, address, district, location_type),
+            center_id=data["center_id"],
+            services=data["services"],
+            operating_hours=data["operating_hours"],
+            contact_info=data["contact_info"],
+            inventory=data["inventory"],
+        )
+        service.resource_centers[center.center_id] = center
+    service.center_grid = SpatialGrid(header["center_grid_cell_size"])
+    service.center_grid.cells = {tuple(key): list(center_ids) for key, center_ids in header["center_grid"]}
+    service.service_index = {k: set(v) for k, v in header["service_index"].items()}
+    service.inventory_index = {k: set(v) for k, v in header["inventory_index"].items()}
+    service.center_district_index = {k: set(v) for k, v in header["center_district_index"].items()}
+    service.district_counters = {k: dict(v) for k, v in header["district_counters"].items()}
+    return service
+
+
+def _registry_state(service) -> Dict:
+    """Everything that makes up the registry, as plain containers, for comparisons"""
+    return {
+        "farms": list(service.farms.items()),
+        "farm_assignments": list(service.farm_assignments.items()),
+        "center_farms": {k: set(v) for k, v in service.center_farms.items()},
+        "farm_grid": {k: list(v) for k, v in service.farm_grid.cells.items()},
+        "farm_district_index": {k: set(v) for k, v in service.farm_district_index.items()},
+        "resource_centers": dict(service.resource_centers),
+        "center_grid": dict(service.center_grid.cells),
+        "service_index": service.service_index,
+        "inventory_index": service.inventory_index,
+        "center_district_index": service.center_district_index,
+        "district_counters": service.district_counters,
+    }
+
+
+# Restart test - build a million-farm registry once, snapshot it, restore it and compare
+def run_snapshot_test(farm_count: int = 1_000_000, path: str = "agrihub_registry.snap", seed: int = 42):
+    from MiniProject_SB1b_GISserviceTest import HaryanaGISService
+    from MiniProject_SB6_Benchmark import CENTERS_PER_DISTRICT, load_distributions, generate_farms, generate_centers
+    import random
+
+    print("Starting Registry Snapshot Test...\n")
+    rng = np.random.default_rng(seed)
+    random.seed(seed)
+    service = HaryanaGISService()
+    start = time.perf_counter()
+    farms = generate_farms(farm_count, rng, load_distributions(), service)
+    for center in generate_centers(CENTERS_PER_DISTRICT, rng, farms, service):
+        service.register_resource_center(center)
+    for farm in farms:
+        service.register_farm(farm)
+    print(f"Rebuilt {farm_count} farms from scratch in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    save_snapshot(service, path)
+    print(f"Snapshot written in {time.perf_counter() - start:.2f}s ({os.path.getsize(path) / 1e6:.1f} MB)")
+
+    start = time.perf_counter()
+    restored = load_snapshot(path)
+    print(f"Restored in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    start = time.perf_counter()
+    stats = restored.calculate_coverage_statistics()
+    farm = restored.farms[farms[len(farms) // 2].farmer_id]
+    nearest = restored.find_nearest_centers(farm.location, 25)
+    print(f"First queries after restore: {(time.perf_counter() - start) * 1000:.1f} ms "
+          f"({stats['coverage_25km_percent']:.1f}% within 25 km, {len(nearest)} centers near {farm.farmer_id})")
+
+    start = time.perf_counter()
+    identical = _registry_state(restored) == _registry_state(service)
+    print(f"Restored registry identical to the original: {identical} (compared in {time.perf_counter() - start:.1f}s)")
+    return restored
+
+
+if __name__ == "__main__":
+    run_snapshot_test()
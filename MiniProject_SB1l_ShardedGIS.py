@@ -0,0 +1,277 @@
+# sharded GIS service - farms partitioned by district (or grid cell) across worker processes, each running its own
+# HaryanaGISService with every resource center replicated; radius, k-nearest and coverage queries scatter-gather
+
+import multiprocessing
+import os
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from MiniProject_SB1b_GISserviceTest import (HaryanaGISService, Farm, ResourceCenter, Location, COVERAGE_RADII,
+                                             SpatialGrid)
+from MiniProject_SB7_Metrics import timed
+
+
+def _shard_worker(conn, distance_kernel: str):
+    """Worker loop: owns one HaryanaGISService and answers (command, args) messages until "close"."""
+    service = HaryanaGISService(distance_kernel)
+    while True:
+        command, args = conn.recv()
+        try:
+            if command == "close":
+                conn.send(("ok", None))
+                break
+            elif command == "register_farms":
+                for farm in args:
+                    service.register_farm(farm)
+                result = len(service.farms)
+            elif command == "register_centers":
+                for center in args:
+                    service.register_resource_center(center)
+                result = len(service.resource_centers)
+            elif command == "district_counters":
+                result = service.district_counters
+            elif command == "farms_within":
+                location, radius = args
+                result = []
+                for farmer_id in service.farm_grid.query(location, radius):
+                    distance = service.calculate_distance(location, service.farms[farmer_id].location, (radius,))
+                    if distance <= radius:
+                        result.append((distance, farmer_id))
+            elif command == "nearest_centers":
+                farmer_ids, radius, service_type = args
+                farmer_ids = service.farms if farmer_ids is None else farmer_ids
+                result = {farmer_id: [(distance, center.center_id) for distance, center in
+                                      service.find_nearest_centers(service.farms[farmer_id].location, radius, service_type)]
+                          for farmer_id in farmer_ids if farmer_id in service.farms}
+            elif command == "k_nearest_centers":
+                farmer_ids, k, services, min_inventory = args
+                farmer_ids = service.farms if farmer_ids is None else farmer_ids
+                result = {farmer_id: [(distance, center.center_id) for distance, center in
+                                      service.find_k_nearest_centers(service.farms[farmer_id].location, k,
+                                                                     services, min_inventory)]
+                          for farmer_id in farmer_ids if farmer_id in service.farms}
+            elif command == "assignments":
+                result = dict(service.farm_assignments)
+            else:
+                raise ValueError(f"Unknown shard command: {command}")
+            conn.send(("ok", result))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+class ShardedGISService:
+    """Front end for a pool of shard processes, each holding part of the farms and all resource centers.
+
+    Centers are few (hundreds) and every farm's coverage depends on centers across district lines, so
+    they are replicated to every shard instead of partitioned with an overlap margin; that keeps every
+    per-farm answer local to the farm's shard. partition="district" balances whole districts over the
+    shards by farm count; partition="grid" hashes the farm's SpatialGrid cell. Queries go to all shards
+    at once and are merged here, so bulk work runs on every core in parallel."""
+
+    def __init__(self, workers: Optional[int] = None, partition: str = "district", distance_kernel: str = "haversine"):
+        if partition not in ("district", "grid"):
+            raise ValueError(f"Unknown partition: {partition} (choose from district, grid)")
+        self.partition = partition
+        self.workers = workers or os.cpu_count() or 1
+        context = multiprocessing.get_context("spawn")
+        self._connections = []
+        self._processes = []
+        for _ in range(self.workers):
+            parent, child = context.Pipe()
+            process = context.Process(target=_shard_worker, args=(child, distance_kernel), daemon=True)
+            process.start()
+            self._connections.append(parent)
+            self._processes.append(process)
+        self.farm_shards: Dict[str, int] = {}
+        self.district_shards: Dict[str, int] = {}
+        self._shard_load = [0] * self.workers
+        self._grid = SpatialGrid()
+        self.resource_centers: Dict[str, ResourceCenter] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for conn in self._connections:
+            conn.send(("close", None))
+        for conn, process in zip(self._connections, self._processes):
+            conn.recv()
+            process.join()
+        self._connections, self._processes = [], []
+
+    def _scatter(self, messages: Dict[int, Tuple[str, object]]) -> Dict[int, object]:
+        """Send one message per shard, then collect every reply - the shards work concurrently"""
+        for shard, message in messages.items():
+            self._connections[shard].send(message)
+        results = {}
+        errors = []
+        for shard in messages:
+            status, result = self._connections[shard].recv()
+            if status == "error":
+                errors.append(f"shard {shard}: {result}")
+            results[shard] = result
+        if errors:
+            raise RuntimeError("; ".join(errors))
+        return results
+
+    def _broadcast(self, command: str, args=None) -> Dict[int, object]:
+        return self._scatter({shard: (command, args) for shard in range(self.workers)})
+
+    def shard_for(self, farm: Farm) -> int:
+        if self.partition == "grid":
+            cell = self._grid._cell(farm.location.latitude, farm.location.longitude)
+            return zlib.crc32(repr(cell).encode()) % self.workers
+        district = farm.location.district
+        if district not in self.district_shards:
+            self._place_district(district)
+        return self.district_shards[district]
+
+    def _place_district(self, district: str):
+        """New districts go to the least loaded shard"""
+        self.district_shards[district] = min(range(self.workers), key=lambda shard: self._shard_load[shard])
+
+    @timed("gis.sharded_register_farms")
+    def register_farms(self, farms: List[Farm]) -> int:
+        """Register farms on their shards; with district partitioning, bigger districts are placed first"""
+        if self.partition == "district":
+            sizes: Dict[str, int] = {}
+            for farm in farms:
+                sizes[farm.location.district] = sizes.get(farm.location.district, 0) + 1
+            for district, size in sorted(sizes.items(), key=lambda item: -item[1]):
+                if district not in self.district_shards:
+                    self._place_district(district)
+                self._shard_load[self.district_shards[district]] += size
+
+        batches: Dict[int, List[Farm]] = {shard: [] for shard in range(self.workers)}
+        for farm in farms:
+            shard = self.shard_for(farm)
+            previous = self.farm_shards.get(farm.farmer_id)
+            if previous is not None and previous != shard:
+                raise ValueError(f"Farm {farm.farmer_id} moved between shards; unregister it first")
+            self.farm_shards[farm.farmer_id] = shard
+            batches[shard].append(farm)
+        results = self._scatter({shard: ("register_farms", batch) for shard, batch in batches.items() if batch})
+        return sum(results.values())
+
+    @timed("gis.sharded_register_centers")
+    def register_resource_centers(self, centers: List[ResourceCenter]) -> int:
+        for center in centers:
+            self.resource_centers[center.center_id] = center
+        self._broadcast("register_centers", centers)
+        return len(self.resource_centers)
+
+    @timed("gis.sharded_coverage")
+    def calculate_coverage_statistics(self) -> Dict:
+        """Same result shape as HaryanaGISService.calculate_coverage_statistics, merged from the shards"""
+        district_coverage: Dict[str, Dict] = {}
+        for counters in self._broadcast("district_counters").values():
+            for district, values in counters.items():
+                merged = district_coverage.setdefault(district, {key: 0 for key in values})
+                for key, value in values.items():
+                    merged[key] += value
+        district_coverage = {d: c for d, c in district_coverage.items() if c["total_farms"] > 0}
+        total_farms = sum(c["total_farms"] for c in district_coverage.values())
+        for counters in district_coverage.values():
+            for radius in COVERAGE_RADII:
+                counters[f"coverage_{radius}km_percent"] = counters[f"farms_within_{radius}km"] / counters["total_farms"] * 100
+
+        stats = {"total_farms": total_farms}
+        for radius in COVERAGE_RADII:
+            stats[f"farms_within_{radius}km"] = sum(c[f"farms_within_{radius}km"] for c in district_coverage.values())
+        for radius in COVERAGE_RADII:
+            stats[f"coverage_{radius}km_percent"] = (stats[f"farms_within_{radius}km"] / total_farms * 100
+                                                     if total_farms > 0 else 0)
+        stats["total_resource_centers"] = len(self.resource_centers)
+        stats["district_coverage"] = district_coverage
+        return stats
+
+    @timed("gis.sharded_farms_within")
+    def farms_within(self, location: Location, radius: float) -> List[Tuple[float, str]]:
+        """(distance, farmer_id) of every farm within the radius, nearest first"""
+        results = []
+        for shard_results in self._broadcast("farms_within", (location, radius)).values():
+            results.extend(shard_results)
+        return sorted(results)
+
+    def _per_shard(self, farmer_ids: Optional[List[str]]) -> Dict[int, Optional[List[str]]]:
+        if farmer_ids is None:
+            return {shard: None for shard in range(self.workers)}
+        groups: Dict[int, List[str]] = {}
+        for farmer_id in farmer_ids:
+            groups.setdefault(self.farm_shards[farmer_id], []).append(farmer_id)
+        return groups
+
+    @timed("gis.sharded_nearest_centers")
+    def nearest_centers(self, farmer_ids: Optional[List[str]] = None, radius: float = 10,
+                        service_type: Optional[str] = None) -> Dict[str, List[Tuple[float, str]]]:
+        """(distance, center_id) within the radius for each farm (all farms when None), run on the shards"""
+        groups = self._per_shard(farmer_ids)
+        results: Dict[str, List[Tuple[float, str]]] = {}
+        for shard_results in self._scatter({shard: ("nearest_centers", (ids, radius, service_type))
+                                            for shard, ids in groups.items()}).values():
+            results.update(shard_results)
+        return results
+
+    @timed("gis.sharded_k_nearest_centers")
+    def k_nearest_centers(self, farmer_ids: Optional[List[str]] = None, k: int = 3,
+                          services: Optional[List[str]] = None,
+                          min_inventory: Optional[Dict[str, int]] = None) -> Dict[str, List[Tuple[float, str]]]:
+        """The k nearest matching centers for each farm (all farms when None), run on the shards"""
+        groups = self._per_shard(farmer_ids)
+        results: Dict[str, List[Tuple[float, str]]] = {}
+        for shard_results in self._scatter({shard: ("k_nearest_centers", (ids, k, services, min_inventory))
+                                            for shard, ids in groups.items()}).values():
+            results.update(shard_results)
+        return results
+
+    def farm_assignments(self) -> Dict[str, Tuple[Optional[str], float]]:
+        merged = {}
+        for assignments in self._broadcast("assignments").values():
+            merged.update(assignments)
+        return merged
+
+
+# Scaling test - the same bulk work on 1 shard and on every core, checked against the single-process service
+def run_sharding_test(farm_count: int = 100_000, seed: int = 42):
+    from MiniProject_SB6_Benchmark import CENTERS_PER_DISTRICT, load_distributions, generate_farms, generate_centers
+    import random
+
+    print("Starting Sharded GIS Test...\n")
+    rng = np.random.default_rng(seed)
+    random.seed(seed)
+    reference = HaryanaGISService()
+    farms = generate_farms(farm_count, rng, load_distributions(), reference)
+    centers = generate_centers(CENTERS_PER_DISTRICT, rng, farms, reference)
+    for center in centers:
+        reference.register_resource_center(center)
+    for farm in farms:
+        reference.register_farm(farm)
+    expected = reference.calculate_coverage_statistics()
+
+    timings = {}
+    for workers in sorted({1, os.cpu_count() or 1}):
+        with ShardedGISService(workers) as sharded:
+            start = time.perf_counter()
+            sharded.register_resource_centers(centers)
+            sharded.register_farms(farms)
+            stats = sharded.calculate_coverage_statistics()
+            nearest = sharded.k_nearest_centers(k=3)
+            timings[workers] = time.perf_counter() - start
+            sample = farms[0].farmer_id
+            print(f"{workers} shard(s): registration + coverage + 3-nearest for {farm_count} farms in "
+                  f"{timings[workers]:.2f}s")
+            print(f"  coverage matches single process: {stats == expected}, "
+                  f"{sample} nearest: {[c for _, c in nearest[sample]]}")
+    if len(timings) > 1:
+        print(f"Speedup on {max(timings)} cores: {timings[1] / timings[max(timings)]:.1f}x")
+    return timings
+
+
+if __name__ == "__main__":
+    run_sharding_test()
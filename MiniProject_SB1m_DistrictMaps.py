@@ -0,0 +1,212 @@
+# district maps - batch build of one folium map per district plus an index page, rendered in parallel on a
+# process pool from compact per-district arrays, every file written atomically
+
+import html
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from MiniProject_SB7_Metrics import timed, increment
+
+DEFAULT_MAP_DIR = "district_maps"
+INDEX_FILE = "index.html"
+
+
+def _map_file(district: str) -> str:
+    return f"{district.lower().replace(' ', '_')}_map.html"
+
+
+def pack_district(service, district: str) -> Dict:
+    """The farms and centers of one district as flat arrays + small lookup tables, so a worker receives a
+    few buffers instead of thousands of pickled Farm / Location objects"""
+    farm_ids = sorted(service.farm_district_index.get(district, ()))
+    farms = [service.farms[farmer_id] for farmer_id in farm_ids]
+    assignments = [service.farm_assignments.get(farmer_id, (None, float("inf"))) for farmer_id in farm_ids]
+
+    vocab: Dict[str, List[str]] = {"crop": [], "soil": [], "season": [], "center": []}
+    lookup: Dict[str, Dict[str, int]] = {name: {} for name in vocab}
+
+    def codes(name: str, values) -> np.ndarray:
+        table, words = lookup[name], vocab[name]
+        out = np.empty(len(farms), dtype=np.int32)
+        for i, value in enumerate(values):
+            code = table.get(value)
+            if code is None:
+                code = table[value] = len(words)
+                words.append(value)
+            out[i] = code
+        return out
+
+    centers = [service.resource_centers[center_id]
+               for center_id in sorted(service.center_district_index.get(district, ()))]
+    return {
+        "district": district,
+        "farm_ids": np.array(farm_ids, dtype=str),
+        "coords": np.array([(f.location.latitude, f.location.longitude) for f in farms],
+                           dtype=np.float64).reshape(-1, 2),
+        "area": np.array([f.area for f in farms], dtype=np.float32),
+        "crop": codes("crop", (", ".join(f.crop_types) for f in farms)),
+        "soil": codes("soil", (f.soil_type for f in farms)),
+        "season": codes("season", (f.season for f in farms)),
+        "center": codes("center", (center_id or "none" for center_id, _ in assignments)),
+        "center_km": np.array([distance for _, distance in assignments], dtype=np.float32),
+        "vocab": vocab,
+        "centers": [(c.center_id, c.location.latitude, c.location.longitude, ", ".join(c.services),
+                     c.operating_hours, c.contact_info) for c in centers],
+        "coverage": dict(service.district_counters.get(district, {})),
+    }
+
+
+def _atomic_save(folium_map, path: str):
+    tmp_path = f"{path}.tmp"
+    folium_map.save(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def render_district(packed: Dict, output_dir: str) -> Dict:
+    """Render one packed district to <output_dir>/<district>_map.html; runs in a pool worker"""
+    import folium
+    from folium.plugins import MarkerCluster
+
+    start = time.perf_counter()
+    district, coords, vocab = packed["district"], packed["coords"], packed["vocab"]
+    centers = packed["centers"]
+    points = coords if len(coords) else np.array([(c[1], c[2]) for c in centers]).reshape(-1, 2)
+    middle = points.mean(axis=0).tolist() if len(points) else [29.0588, 76.0856]
+    m = folium.Map(location=middle, zoom_start=10)
+    if len(points) > 1:
+        m.fit_bounds([points.min(axis=0).tolist(), points.max(axis=0).tolist()])
+
+    cluster = MarkerCluster(name="Farms").add_to(m)
+    for i, farmer_id in enumerate(packed["farm_ids"].tolist()):
+        center = vocab["center"][packed["center"][i]]
+        popup_text = f"""
+        <b>Farm ID:</b> {farmer_id}<br>
+        <b>District:</b> {district}<br>
+        <b>Area:</b> {packed["area"][i]:.2f} hectares<br>
+        <b>Crop:</b> {vocab["crop"][packed["crop"][i]]}<br>
+        <b>Soil Type:</b> {vocab["soil"][packed["soil"][i]]}<br>
+        <b>Season:</b> {vocab["season"][packed["season"][i]]}<br>
+        <b>Nearest Center:</b> {center}{f" ({packed['center_km'][i]:.1f} km)" if center != "none" else ""}
+        """
+        folium.Marker(
+            location=coords[i].tolist(),
+            popup=folium.Popup(popup_text, max_width=300),
+            tooltip=f"Farm: {farmer_id}",
+            icon=folium.Icon(color='green', icon='leaf', prefix='fa')
+        ).add_to(cluster)
+
+    for center_id, lat, lon, services, hours, contact in centers:
+        popup_text = f"""
+        <b>Center ID:</b> {center_id}<br>
+        <b>District:</b> {district}<br>
+        <b>Services:</b> {services}<br>
+        <b>Operating Hours:</b> {hours}<br>
+        <b>Contact:</b> {contact}
+        """
+        folium.Marker(
+            location=[lat, lon],
+            popup=folium.Popup(popup_text, max_width=300),
+            tooltip=f"Resource Center: {center_id}",
+            icon=folium.Icon(color='red', icon='building', prefix='fa')
+        ).add_to(m)
+
+    path = os.path.join(output_dir, _map_file(district))
+    _atomic_save(m, path)
+    return {"district": district, "file": path, "farms": len(coords), "centers": len(centers),
+            "coverage": packed["coverage"], "seconds": time.perf_counter() - start, "pid": os.getpid()}
+
+
+def write_index(results: List[Dict], output_dir: str, title: str = "Haryana District Maps") -> str:
+    """A plain HTML table linking every district map with its farm / center counts and coverage"""
+    rows = []
+    for result in sorted(results, key=lambda r: r["district"]):
+        coverage = result["coverage"]
+        total = coverage.get("total_farms", 0)
+        within = (f"{coverage.get('farms_within_10km', 0) / total * 100:.1f}%",
+                  f"{coverage.get('farms_within_25km', 0) / total * 100:.1f}%") if total else ("-", "-")
+        rows.append(f"<tr><td><a href=\"{html.escape(os.path.basename(result['file']))}\">"
+                    f"{html.escape(result['district'])}</a></td><td>{result['farms']}</td>"
+                    f"<td>{result['centers']}</td><td>{within[0]}</td><td>{within[1]}</td></tr>")
+    page = f"""<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>{html.escape(title)}</title>
+<style>body {{font-family: sans-serif}} td, th {{padding: 4px 12px; text-align: right}} td:first-child {{text-align: left}}</style>
+</head>
+<body>
+<h2>{html.escape(title)}</h2>
+<p>Generated {time.strftime("%Y-%m-%d %H:%M")}, {sum(r["farms"] for r in results)} farms in {len(results)} districts</p>
+<table>
+<tr><th>District</th><th>Farms</th><th>Centers</th><th>Within 10 km</th><th>Within 25 km</th></tr>
+{chr(10).join(rows)}
+</table>
+</body>
+</html>
+"""
+    path = os.path.join(output_dir, INDEX_FILE)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        f.write(page)
+    os.replace(f"{path}.tmp", path)
+    return path
+
+
+@timed("map.generate_district_maps")
+def generate_district_maps(service, output_dir: str = DEFAULT_MAP_DIR, workers: Optional[int] = None,
+                           districts: Optional[List[str]] = None) -> Dict:
+    """Render a map for every district (or the given ones) and the index page.
+
+    Districts are packed in this process and rendered on a spawn-context process pool, largest first so
+    the big districts do not end up last on a single worker. workers=1 renders in-process."""
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    if districts is None:
+        districts = sorted(set(service.farm_district_index) | set(service.center_district_index))
+    packed = sorted((pack_district(service, district) for district in districts), key=lambda p: -len(p["coords"]))
+
+    start = time.perf_counter()
+    if workers == 1 or len(packed) <= 1:
+        results = [render_district(p, output_dir) for p in packed]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(packed)),
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = list(pool.map(render_district, packed, [output_dir] * len(packed)))
+    index = write_index(results, output_dir)
+    increment("map.district_maps", len(results))
+    return {"index": index, "maps": {r["district"]: r["file"] for r in results}, "results": results,
+            "seconds": time.perf_counter() - start}
+
+
+# Batch test - render all district maps serially and on every core, and compare wall-clock time
+def run_district_maps_test(farm_count: int = 20_000, seed: int = 42, output_dir: str = DEFAULT_MAP_DIR):
+    from MiniProject_SB1b_GISserviceTest import HaryanaGISService
+    from MiniProject_SB6_Benchmark import CENTERS_PER_DISTRICT, load_distributions, generate_farms, generate_centers
+    import random
+
+    print("Starting District Map Generation Test...\n")
+    rng = np.random.default_rng(seed)
+    random.seed(seed)
+    service = HaryanaGISService()
+    farms = generate_farms(farm_count, rng, load_distributions(), service)
+    for center in generate_centers(CENTERS_PER_DISTRICT, rng, farms, service):
+        service.register_resource_center(center)
+    service.register_farms(farms)
+
+    timings: Dict[int, float] = {}
+    for workers in sorted({1, os.cpu_count() or 1}):
+        summary = generate_district_maps(service, output_dir, workers=workers)
+        timings[workers] = summary["seconds"]
+        slowest = max(summary["results"], key=lambda r: r["seconds"])
+        print(f"{workers} worker(s): {len(summary['maps'])} district maps for {farm_count} farms in "
+              f"{timings[workers]:.2f}s (slowest: {slowest['district']}, {slowest['seconds']:.2f}s)")
+    if len(timings) > 1:
+        print(f"Speedup on {max(timings)} cores: {timings[1] / timings[max(timings)]:.1f}x")
+    print(f"Index page: {summary['index']}")
+    return summary
+
+
+if __name__ == "__main__":
+    run_district_maps_test()
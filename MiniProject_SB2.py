@@ -3,10 +3,12 @@
 from dataclasses import dataclass
 from typing import List, Tuple, Dict, Optional
 from datetime import datetime
-import geopy.distance
 from geopy.geocoders import Nominatim
 import folium
 import json
+from MiniProject_SB1c_DistanceKernels import ThresholdedDistance
+from MiniProject_SB1d_DistanceMatrix import DistanceMatrixCache
+from MiniProject_SB7_Metrics import timed, get_logger
 
 @dataclass
 class Location:
@@ -35,11 +37,21 @@ class ResourceCenter:
     inventory: Dict[str, int]  # resource_name: quantity
 
 class GISService:
-    def __init__(self):
+    def __init__(self, distance_kernel: str = "haversine"):
         self.farms: Dict[str, Farm] = {}
         self.resource_centers: Dict[str, ResourceCenter] = {}
+        # Fast kernel with automatic exact-geodesic fallback near the radius thresholds
+        self.distance = ThresholdedDistance(distance_kernel)
+        self.distance_cache: Optional[DistanceMatrixCache] = None
         self.geocoder = Nominatim(user_agent="agricultural_management_system")
+        self.logger = get_logger("gis")
         
+    def attach_distance_cache(self, path: str = "agrihub_registry.distances") -> DistanceMatrixCache:
+        """Keep farm-to-center distances in an on-disk matrix that the map and coverage analytics read from"""
+        self.distance_cache = DistanceMatrixCache(self, path)
+        self.distance_cache.sync()
+        return self.distance_cache
+    
     def register_farm(self, farm: Farm) -> str:
         """Register a new farm in the system"""
         self.farms[farm.farmer_id] = farm
@@ -50,6 +62,7 @@ class GISService:
         self.resource_centers[center.center_id] = center
         return center.center_id
     
+    @timed("gis.geocode_address")
     def geocode_address(self, address: str) -> Optional[Location]:
         """Convert address to coordinates"""
         try:
@@ -61,16 +74,19 @@ class GISService:
                     address=address
                 )
         except Exception as e:
-            print(f"Geocoding error: {e}")
+            self.logger.warning("Geocoding error: %s", e)
         return None
     
-    def calculate_distance(self, point1: Location, point2: Location) -> float:
-        """Calculate distance between two points in kilometers"""
-        return geopy.distance.geodesic(
-            (point1.latitude, point1.longitude),
-            (point2.latitude, point2.longitude)
-        ).kilometers
+    @timed("gis.calculate_distance")
+    def calculate_distance(self, point1: Location, point2: Location, thresholds: Optional[Tuple[float, ...]] = None) -> float:
+        """Calculate distance between two points in kilometers (exact when close to any of the thresholds)"""
+        return self.distance.distance(
+            point1.latitude, point1.longitude,
+            point2.latitude, point2.longitude,
+            thresholds
+        )
     
+    @timed("gis.find_nearest_centers")
     def find_nearest_centers(self, 
                            farmer_location: Location, 
                            radius: float,
@@ -79,7 +95,7 @@ class GISService:
         nearby_centers = []
         
         for center in self.resource_centers.values():
-            distance = self.calculate_distance(farmer_location, center.location)
+            distance = self.calculate_distance(farmer_location, center.location, thresholds=(radius,))
             if distance <= radius:
                 if service_type is None or service_type in center.services:
                     nearby_centers.append((distance, center))
@@ -88,6 +104,7 @@ class GISService:
         nearby_centers.sort(key=lambda x: x[0])
         return [center for _, center in nearby_centers]
     
+    @timed("gis.generate_farm_map")
     def generate_farm_map(self, farmer_id: str, include_centers: bool = True) -> str:
         """Generate an interactive map for a specific farm"""
         farm = self.farms.get(farmer_id)
@@ -109,8 +126,15 @@ class GISService:
         
         # Add resource centers if requested
         if include_centers:
+            cached = None
+            if self.distance_cache is not None:
+                self.distance_cache.sync()
+                cached = self.distance_cache.distances_for_farm(farmer_id)
             for center in self.resource_centers.values():
-                distance = self.calculate_distance(farm.location, center.location)
+                if cached is not None:
+                    distance = cached[center.center_id]
+                else:
+                    distance = self.calculate_distance(farm.location, center.location)
                 folium.Marker(
                     [center.location.latitude, center.location.longitude],
                     popup=f"Center ID: {center.center_id}\nServices: {', '.join(center.services)}\nDistance: {distance:.2f} km",
@@ -140,8 +164,15 @@ class GISService:
             }
         }
     
+    @timed("gis.calculate_coverage_statistics")
     def calculate_coverage_statistics(self) -> Dict:
         """Calculate coverage statistics for resource centers"""
+        if self.distance_cache is not None:
+            self.distance_cache.sync()
+            stats = self.distance_cache.coverage_statistics()
+            stats.pop("total_resource_centers")
+            return stats
+        
         total_farms = len(self.farms)
         farms_within_10km = 0
         farms_within_25km = 0
@@ -151,7 +182,8 @@ class GISService:
             if nearest_centers:
                 distance_to_nearest = self.calculate_distance(
                     farm.location, 
-                    nearest_centers[0].location
+                    nearest_centers[0].location,
+                    thresholds=(10, 25)
                 )
                 if distance_to_nearest <= 10:
                     farms_within_10km += 1
@@ -6,7 +6,6 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import LabelEncoder
 import numpy as np
 import re
 import requests
@@ -17,6 +16,10 @@ import os
 from datetime import datetime
 from PIL import Image, ImageTk
 import io
+from MiniProject_SB3d_FlatForest import flat_forest_for
+from MiniProject_SB3e_JointModels import train_joint_model
+from MiniProject_SB3g_FeatureEncoder import CategoricalEncoder
+from MiniProject_SB7_Metrics import timed, track
 
 # Download the Haryana Agriculture Dataset
 drive_url = "https://drive.google.com/uc?id=1ZGISXNO710PORByb5h4FTUOPC8TsIG40"
@@ -73,6 +76,7 @@ temperature_ranges = {
 # Initialize geolocation service
 geolocator = Nominatim(user_agent="haryana_farm_advisor")
 
+@timed("gis.geocode_district")
 def get_coordinates(district, state="Haryana", country="India"):
     try:
         location = geolocator.geocode(f"{district}, {state}, {country}")
@@ -84,6 +88,7 @@ def get_coordinates(district, state="Haryana", country="India"):
         print(f"Geocoding error: {e}")
         return None
 
+@timed("weather.get_weather_data")
 def get_weather_data(lat, lon):
     # Using OpenWeatherMap free API (replace with actual API key)
     api_key = "YOUR_OPENWEATHERMAP_API_KEY"  # Replace with your actual API key
@@ -110,6 +115,7 @@ def get_weather_data(lat, lon):
             "wind": {"speed": 3.5}
         }
 
+@timed("map.create_map")
 def create_map(lat, lon, district):
     map_file = f"{district}_map.html"
     m = folium.Map(location=[lat, lon], zoom_start=10)
@@ -160,17 +166,18 @@ def recommend_crops(temperature, season):
     
     return suitable_crops
 
-def train_models(df):
+@timed("ml.train_models")
+def train_models(df, unknown="error"):
+    # `unknown`: what predict_recommendation does with an unseen district / crop / soil / season - "error",
+    # "most_frequent" or a class code (see ColumnEncoder)
     # Extract required columns
     required_columns = ['District', 'Crop', 'Soil Type', 'Season', 'Microbial Solution', 'Microbial Solution Dosage']
     df_cleaned = df[required_columns].dropna()
     
-    # Create label encoders for categorical variables
-    label_encoders = {}
-    for col in required_columns:
-        le = LabelEncoder()
-        df_cleaned[col] = le.fit_transform(df_cleaned[col])
-        label_encoders[col] = le
+    # Build the categorical encoder once (LabelEncoder-compatible codes) and encode every column in one pass
+    label_encoders = CategoricalEncoder.fit(df_cleaned, required_columns)
+    df_cleaned[required_columns] = label_encoders.transform(df_cleaned, required_columns)
+    label_encoders.set_unknown(unknown, required_columns[:4])
     
     # Define features and targets
     X = df_cleaned[['District', 'Crop', 'Soil Type', 'Season']]
@@ -191,6 +198,36 @@ def train_models(df):
     
     return solution_model, dosage_model, label_encoders
 
+def train_joint_models(df, unknown="error"):
+    """One forest predicting solution and dosage together, with train_models' encoders and training split;
+    pass it to predict_recommendation as solution_model with dosage_model=None"""
+    required_columns = ['District', 'Crop', 'Soil Type', 'Season', 'Microbial Solution', 'Microbial Solution Dosage']
+    model, label_encoders = train_joint_model(df[required_columns].dropna(), required_columns[4:])
+    label_encoders.set_unknown(unknown, required_columns[:4])
+    return model, label_encoders
+
+@timed("ml.predict_recommendation")
+def predict_recommendation(solution_model, dosage_model, label_encoders, district, crop, soil_type, season):
+    """Predict (microbial solution, dosage) for one request; raises ValueError for unknown inputs.
+    With dosage_model=None, solution_model is the joint forest from train_joint_models"""
+    # Encode input data: one dict lookup per field (plain dicts of LabelEncoders are wrapped on the fly)
+    encoders = CategoricalEncoder.from_label_encoders(label_encoders)
+    row = encoders.encode_row(['District', 'Crop', 'Soil Type', 'Season'], [district, crop, soil_type, season])
+    
+    # Flattened copies of the forests (compiled on first use) give sklearn's exact predictions for one row
+    # without its per-call validation
+    with track("ml.inference"):
+        if dosage_model is None:
+            solution_pred, dosage_pred = flat_forest_for(solution_model).predict_one(row)
+        else:
+            solution_pred = flat_forest_for(solution_model).predict_one(row)
+            dosage_pred = flat_forest_for(dosage_model).predict_one(row)
+    
+    # Transform predictions back to original values
+    solution_name = encoders['Microbial Solution'].decode(solution_pred)
+    dosage_value = encoders['Microbial Solution Dosage'].decode(dosage_pred)
+    return solution_name, dosage_value
+
 class HaryanaFarmAdvisor:
     def __init__(self, root):
         self.root = root
@@ -333,26 +370,16 @@ class HaryanaFarmAdvisor:
         else:  # Already in acres
             land_size_acres = land_size
         
-        # Encode input data
+        # Encode input data and predict solution and dosage
         try:
-            district_encoded = self.label_encoders['District'].transform([district])[0]
-            crop_encoded = self.label_encoders['Crop'].transform([crop])[0]
-            soil_encoded = self.label_encoders['Soil Type'].transform([soil_type])[0]
-            season_encoded = self.label_encoders['Season'].transform([season])[0]
+            solution_name, dosage_value = predict_recommendation(
+                self.solution_model, self.dosage_model, self.label_encoders,
+                district, crop, soil_type, season
+            )
         except ValueError as e:
             messagebox.showerror("Input Error", f"Invalid input: {e}")
             return
         
-        # Predict solution and dosage
-        # Create a DataFrame with proper column names
-        input_df = pd.DataFrame({'District': [district_encoded],'Crop': [crop_encoded],'Soil Type': [soil_encoded],'Season': [season_encoded]})
-        solution_pred = self.solution_model.predict(input_df)[0]
-        dosage_pred = self.dosage_model.predict(input_df)[0]
-        
-        # Transform predictions back to original values
-        solution_name = self.label_encoders['Microbial Solution'].inverse_transform([solution_pred])[0]
-        dosage_value = self.label_encoders['Microbial Solution Dosage'].inverse_transform([dosage_pred])[0]
-        
         # Calculate adjusted dosage
         dosage_numeric = re.findall(r'\d+\.?\d*', dosage_value)
         if dosage_numeric:
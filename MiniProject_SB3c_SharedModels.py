@@ -0,0 +1,246 @@
+# shared model store - random forests flattened into node arrays & label encoders into class tables, published in one
+# shared memory block that worker processes attach to zero-copy instead of training or unpickling their own models
+
+import multiprocessing
+import os
+import pickle
+import time
+from multiprocessing import shared_memory
+from typing import Dict, Optional
+
+import numpy as np
+
+from MiniProject_SB3d_FlatForest import FlatForest, flatten_forest
+from MiniProject_SB7_Metrics import timed
+
+ALIGNMENT = 64
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+class SharedEncoder:
+    """LabelEncoder.transform / inverse_transform over a sorted class table, with the training mode's code
+    when the publisher had one (CategoricalEncoder's most_frequent)"""
+
+    def __init__(self, classes: np.ndarray, most_frequent: Optional[int] = None):
+        self.classes_ = classes
+        self.most_frequent = most_frequent
+        self._index: Optional[Dict[str, int]] = None
+
+    def transform(self, values) -> np.ndarray:
+        # Looked up as Python strings: casting to the table's fixed-width dtype would truncate longer inputs
+        # onto a class ("Ambala_x" -> "Ambala")
+        if self._index is None:
+            self._index = {value: code for code, value in enumerate(self.classes_.tolist())}
+        values = [str(value) for value in np.asarray(values, dtype=object).ravel().tolist()]
+        unseen = [value for value in values if value not in self._index]
+        if unseen:
+            raise ValueError(f"y contains previously unseen labels: {unseen}")
+        return np.array([self._index[value] for value in values], dtype=np.int64)
+
+    def inverse_transform(self, codes) -> np.ndarray:
+        return self.classes_[np.asarray(codes)]
+
+
+def _encoder_arrays(prefix: str, encoder) -> Dict[str, np.ndarray]:
+    arrays = {f"{prefix}/classes": np.asarray(encoder.classes_).astype(str)}
+    if getattr(encoder, "most_frequent", None) is not None:
+        arrays[f"{prefix}/most_frequent"] = np.array([encoder.most_frequent], dtype=np.int64)
+    return arrays
+
+
+def _shared_encoder(fields: Dict[str, np.ndarray]) -> SharedEncoder:
+    most_frequent = fields.get("most_frequent")
+    return SharedEncoder(fields["classes"], int(most_frequent[0]) if most_frequent is not None else None)
+
+
+def _model_arrays(models: Dict[str, object]) -> Dict[str, np.ndarray]:
+    """Flatten forests, label encoders and dicts of label encoders into "<name>/<field>" arrays"""
+    arrays = {}
+    for name, model in models.items():
+        if isinstance(model, dict):
+            for column, encoder in model.items():
+                arrays.update(_encoder_arrays(f"{name}/{column}", encoder))
+        elif isinstance(model, FlatForest) or hasattr(model, "estimators_"):
+            flat = model.arrays if isinstance(model, FlatForest) else flatten_forest(model)
+            for field, array in flat.items():
+                arrays[f"{name}/{field}"] = array
+        elif hasattr(model, "classes_"):
+            arrays.update(_encoder_arrays(name, model))
+        else:
+            raise TypeError(f"Cannot share {name}: {type(model).__name__}")
+    return arrays
+
+
+class SharedModelStore:
+    """Publisher side: copies the models into one shared memory block, owns it and unlinks it on close().
+
+    The manifest (block name, plus offset / dtype / shape of every array) is small and picklable; pass it
+    to workers, which build the models over the block with attach_models()."""
+
+    @timed("ml.publish_shared_models")
+    def __init__(self, models: Dict[str, object], name: Optional[str] = None):
+        arrays = _model_arrays(models)
+        fields, offset = {}, 0
+        for key, array in arrays.items():
+            fields[key] = {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+            offset = _align(offset + array.nbytes)
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=max(offset, 1))
+        for key, array in arrays.items():
+            spec = fields[key]
+            target = np.ndarray(array.shape, dtype=array.dtype, buffer=self.shm.buf, offset=spec["offset"])
+            target[...] = array
+        self.manifest = {
+            "name": self.shm.name,
+            "size": offset,
+            "groups": {name: ("encoders" if isinstance(model, dict) else
+                              "forest" if isinstance(model, FlatForest) or hasattr(model, "estimators_")
+                              else "encoder")
+                       for name, model in models.items()},
+            "fields": fields,
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+class SharedModels:
+    """Attached side: read-only NumPy views into the published block, wrapped as FlatForest / SharedEncoder
+    (or dicts of SharedEncoder), so they drop into code written against the sklearn objects"""
+
+    def __init__(self, manifest: Dict):
+        self.manifest = manifest
+        self.shm = shared_memory.SharedMemory(name=manifest["name"])
+        views = {}
+        for key, spec in manifest["fields"].items():
+            view = np.ndarray(tuple(spec["shape"]), dtype=np.dtype(spec["dtype"]), buffer=self.shm.buf,
+                              offset=spec["offset"])
+            view.flags.writeable = False
+            views[key] = view
+
+        self.models: Dict[str, object] = {}
+        for name, group in manifest["groups"].items():
+            prefix = f"{name}/"
+            own = {key[len(prefix):]: view for key, view in views.items() if key.startswith(prefix)}
+            if group == "forest":
+                self.models[name] = FlatForest(own)
+            elif group == "encoder":
+                self.models[name] = _shared_encoder(own)
+            else:
+                columns: Dict[str, Dict[str, np.ndarray]] = {}
+                for key, view in own.items():
+                    column, field = key.rsplit("/", 1)
+                    columns.setdefault(column, {})[field] = view
+                self.models[name] = {column: _shared_encoder(fields) for column, fields in columns.items()}
+
+    def __getitem__(self, name: str):
+        return self.models[name]
+
+    def close(self):
+        # Views into the buffer must be gone before the mapping can close
+        self.models = {}
+        self.shm.close()
+
+
+@timed("ml.attach_shared_models")
+def attach_models(manifest: Dict) -> SharedModels:
+    return SharedModels(manifest)
+
+
+def publish_recommender(recommender) -> SharedModelStore:
+    """Share a trained SB3b SolutionRecommender's four forests and its encoders"""
+    return SharedModelStore(recommender.models())
+
+
+def attach_recommender(manifest: Dict, df_micro, df_fert, unknown="error"):
+    """A SolutionRecommender predicting from the shared block, ready without any training"""
+    from MiniProject_SB3b_MLcore import SolutionRecommender
+
+    shared = attach_models(manifest)
+    recommender = SolutionRecommender(df_micro, df_fert, models=shared.models, unknown=unknown)
+    recommender.shared_models = shared
+    return recommender
+
+
+# Worker side of the test: attach, predict every row, report readiness time and resident memory
+def _attach_and_predict(manifest: Dict, X: np.ndarray) -> Dict:
+    start = time.perf_counter()
+    shared = attach_models(manifest)
+    ready = time.perf_counter() - start
+    predictions = {name: model.predict(X).tolist() for name, model in shared.models.items()
+                   if isinstance(model, FlatForest)}
+    result = {"pid": os.getpid(), "ready_seconds": ready, "predictions": predictions, "rss_kb": _rss_kb()}
+    shared.close()
+    return result
+
+
+def _unpickle_and_predict(blob: bytes, X: np.ndarray) -> Dict:
+    import sklearn.ensemble  # not part of the unpickling time
+
+    start = time.perf_counter()
+    models = pickle.loads(blob)
+    ready = time.perf_counter() - start
+    for model in models.values():
+        if hasattr(model, "estimators_"):
+            model.predict(X)
+    return {"pid": os.getpid(), "ready_seconds": ready, "rss_kb": _rss_kb()}
+
+
+def _rss_kb() -> Optional[int]:
+    """Resident set size from /proc (None where unavailable, e.g. Windows)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+# Test - publish the SB3b models once, attach from several workers and compare with sklearn's predictions
+def run_shared_models_test(workers: int = 4):
+    from concurrent.futures import ProcessPoolExecutor
+    from MiniProject_SB3b_MLcore import SolutionRecommender, load_solution_dataset
+    from MiniProject_SB6_Benchmark import MICROBIAL_DATASET_PATH, FERTILIZER_DATASET_PATH
+
+    print("Starting Shared Model Serving Test...\n")
+    recommender = SolutionRecommender(load_solution_dataset(MICROBIAL_DATASET_PATH),
+                                      load_solution_dataset(FERTILIZER_DATASET_PATH))
+    models = recommender.models()
+    rng = np.random.default_rng(42)
+    X = np.column_stack([rng.integers(0, len(recommender.micro_encoders[c].classes_), 2000)
+                         for c in ["District", "Crop", "Soil Type", "Season"]])
+    expected = {name: model.predict(X).tolist() for name, model in models.items() if hasattr(model, "estimators_")}
+
+    context = multiprocessing.get_context("spawn")
+    with SharedModelStore(models) as store:
+        print(f"Published {len(store.manifest['fields'])} arrays, {store.manifest['size'] / 1024:.0f} KiB in "
+              f"shared memory block {store.manifest['name']}")
+        with ProcessPoolExecutor(workers, mp_context=context) as pool:
+            attached = list(pool.map(_attach_and_predict, [store.manifest] * workers, [X] * workers))
+        blob = pickle.dumps(models)
+        with ProcessPoolExecutor(workers, mp_context=context) as pool:
+            unpickled = list(pool.map(_unpickle_and_predict, [blob] * workers, [X] * workers))
+
+    matches = all(result["predictions"] == expected for result in attached)
+    print(f"Predictions identical to sklearn in all {workers} workers: {matches}")
+    print(f"Worker ready after attach: {np.mean([r['ready_seconds'] for r in attached]) * 1000:.2f} ms, "
+          f"after unpickling {len(blob) / 1024:.0f} KiB: {np.mean([r['ready_seconds'] for r in unpickled]) * 1000:.2f} ms")
+    if attached[0]["rss_kb"] is not None:
+        print(f"Worker resident memory: attached {np.mean([r['rss_kb'] for r in attached]) / 1024:.1f} MiB, "
+              f"unpickled {np.mean([r['rss_kb'] for r in unpickled]) / 1024:.1f} MiB")
+    return matches
+
+
+if __name__ == "__main__":
+    run_shared_models_test()
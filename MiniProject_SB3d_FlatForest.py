@@ -0,0 +1,254 @@
+# flat forest inference - trained random forests exported to flat node arrays & evaluated with a branch-free numpy
+# traversal, single row or batched, giving exactly the sklearn model's predictions without its per-call overhead
+
+import time
+import weakref
+from typing import Dict
+
+import numpy as np
+
+from MiniProject_SB7_Metrics import timed, track, increment
+
+FOREST_FIELDS = ("feature", "threshold", "left", "value", "roots", "n_classes", "depth")
+BATCH_CHUNK = 2048  # rows per traversal chunk, bounds the (rows, trees, outputs, classes) leaf value gather
+DEDUPLICATE_MIN_ROWS = 256  # integer-coded batches at least this long are evaluated once per distinct row
+
+
+def _sibling_order(tree) -> np.ndarray:
+    """New position of every node when nodes are renumbered breadth first with each node's two children
+    next to each other, so the right child is always left + 1"""
+    order = np.empty(tree.node_count, dtype=np.int64)
+    order[0] = 0
+    queue, next_id = [0], 1
+    for node in queue:
+        left, right = tree.children_left[node], tree.children_right[node]
+        if left >= 0:
+            order[left], order[right] = next_id, next_id + 1
+            next_id += 2
+            queue.extend((left, right))
+    return order
+
+
+def flatten_forest(model) -> Dict[str, np.ndarray]:
+    """All trees of a fitted RandomForestClassifier (single or multi-output) as one set of node arrays.
+
+    Nodes are renumbered so siblings are adjacent and indices are global: a step is
+    node = left[node] + (x[feature[node]] > threshold[node]). Leaves point to themselves with an infinite
+    threshold, so every tree can be walked a fixed `depth` steps with no leaf test. value holds each node's
+    class probabilities normalized the way DecisionTreeClassifier.predict_proba does, which keeps
+    predictions exact"""
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    offsets = np.concatenate([[0], np.cumsum([tree.node_count for tree in trees])[:-1]]).astype(np.intp)
+    classes = model.classes_ if model.n_outputs_ > 1 else [model.classes_]
+    n_classes = np.array([len(c) for c in classes], dtype=np.int32)
+
+    features, thresholds, lefts, values = [], [], [], []
+    for tree, offset in zip(trees, offsets):
+        order = _sibling_order(tree)
+        leaf = tree.children_left < 0
+        position = np.empty_like(order)
+        position[order] = np.arange(tree.node_count)  # old index at each new position
+        feature = np.where(leaf, 0, tree.feature)
+        threshold = np.where(leaf, np.inf, tree.threshold)
+        left = np.where(leaf, order, order[tree.children_left]) + offset
+        value = np.zeros((tree.node_count, len(classes), n_classes.max()))
+        for k, count in enumerate(n_classes):
+            proba = tree.value[:, k, :count]
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            value[:, k, :count] = proba / normalizer
+        features.append(feature[position])
+        thresholds.append(threshold[position])
+        lefts.append(left[position])
+        values.append(value[position])
+
+    arrays = {
+        "feature": np.concatenate(features).astype(np.intp),
+        "threshold": np.concatenate(thresholds).astype(np.float64),
+        "left": np.concatenate(lefts).astype(np.intp),
+        "value": np.concatenate(values),
+        "roots": offsets,
+        "n_classes": n_classes,
+        "depth": np.array([max(tree.max_depth for tree in trees)], dtype=np.int32),
+    }
+    for k, c in enumerate(classes):
+        arrays[f"classes_{k}"] = np.asarray(c)
+    return arrays
+
+
+def _distinct_rows(X: np.ndarray):
+    """(distinct rows, inverse) for small non-negative integer codes (the encoded categorical features),
+    via one int64 key per row; None when X does not look like that"""
+    if X.size == 0 or not np.array_equal(X, np.floor(X)) or X.min() < 0:
+        return None
+    dims = X.max(axis=0).astype(np.int64) + 1
+    if np.prod(dims.astype(float)) >= 2 ** 62:
+        return None
+    keys = np.ravel_multi_index(X.T.astype(np.int64), dims)
+    unique, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    return X[first], inverse
+
+
+class FlatForest:
+    """predict / predict_proba over flattened forest arrays (from flatten_forest, an .npz export or a
+    shared memory block).
+
+    All trees advance together one level per step, vectorized over rows x trees. Inputs are cast to
+    float32 like sklearn's trees do, and the per-tree probabilities are summed in tree order, so the
+    outputs are bit-identical to the sklearn model's."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.arrays = arrays
+        for name in FOREST_FIELDS:
+            setattr(self, name, arrays[name])
+        self.max_depth = int(self.depth[0])
+        self.n_outputs = len(self.n_classes)
+        self.classes = [arrays[f"classes_{k}"] for k in range(self.n_outputs)]
+        self.classes_ = self.classes[0] if self.n_outputs == 1 else self.classes
+        self.n_estimators = len(self.roots)
+
+    @classmethod
+    def from_model(cls, model) -> "FlatForest":
+        return cls(flatten_forest(model))
+
+    def save(self, path: str):
+        np.savez(path, **self.arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "FlatForest":
+        with np.load(path) as data:
+            return cls({name: data[name] for name in data.files})
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in self.arrays.values())
+
+    def apply(self, X) -> np.ndarray:
+        """Leaf index reached in every tree, shape (rows, trees)"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        flat_x = X.ravel()
+        base = (np.arange(len(X)) * X.shape[1])[:, np.newaxis]
+        nodes = np.broadcast_to(self.roots, (len(X), self.n_estimators))
+        for _ in range(self.max_depth):
+            nodes = self.left[nodes] + (flat_x[base + self.feature[nodes]] > self.threshold[nodes])
+        return nodes
+
+    def _proba(self, X) -> np.ndarray:
+        """(rows, outputs, classes) averaged leaf probabilities, traversed in chunks of rows"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if len(X) >= DEDUPLICATE_MIN_ROWS:
+            distinct = _distinct_rows(X)
+            if distinct is not None and len(distinct[0]) < len(X):
+                rows, inverse = distinct
+                increment("ml.flat_forest_deduplicated_rows", len(X) - len(rows))
+                return self._proba(rows)[inverse]
+        out = np.empty((len(X),) + self.value.shape[1:])
+        for start in range(0, len(X), BATCH_CHUNK):
+            leaves = self.apply(X[start:start + BATCH_CHUNK])
+            # cumsum adds the trees one after another, the order sklearn accumulates them in
+            out[start:start + BATCH_CHUNK] = np.cumsum(self.value[leaves], axis=1)[:, -1] / self.n_estimators
+        return out
+
+    def predict_proba(self, X):
+        proba = self._proba(X)
+        if self.n_outputs == 1:
+            return proba[:, 0, :self.n_classes[0]]
+        return [proba[:, k, :count] for k, count in enumerate(self.n_classes)]
+
+    def predict(self, X) -> np.ndarray:
+        with track("ml.flat_forest_predict"):
+            proba = self._proba(X)
+            if self.n_outputs == 1:
+                return self.classes[0].take(np.argmax(proba[:, 0, :self.n_classes[0]], axis=1))
+            return np.stack([classes.take(np.argmax(proba[:, k, :count], axis=1))
+                             for k, (classes, count) in enumerate(zip(self.classes, self.n_classes))], axis=1)
+
+    def predict_one(self, row):
+        """Prediction for a single feature row: the class (a tuple of classes for multi-output models)"""
+        x = np.asarray(row, dtype=np.float32)
+        nodes = self.roots
+        for _ in range(self.max_depth):
+            nodes = self.left[nodes] + (x[self.feature[nodes]] > self.threshold[nodes])
+        proba = np.cumsum(self.value[nodes], axis=0)[-1] / self.n_estimators
+        labels = tuple(classes[np.argmax(proba[k, :count])]
+                       for k, (classes, count) in enumerate(zip(self.classes, self.n_classes)))
+        return labels[0] if self.n_outputs == 1 else labels
+
+
+_compiled = weakref.WeakKeyDictionary()
+
+
+def flat_forest_for(model) -> FlatForest:
+    """The FlatForest for a model: itself if already flat, else compiled once and cached with the model"""
+    if isinstance(model, FlatForest):
+        return model
+    flat = _compiled.get(model)
+    if flat is None:
+        flat = _compiled[model] = compile_forest(model)
+    return flat
+
+
+@timed("ml.compile_forest")
+def compile_forest(model) -> FlatForest:
+    return FlatForest.from_model(model)
+
+
+# Parity & latency test - the SB3 and SB3b forests against sklearn on every feature combination
+def run_flat_forest_test(batch_size: int = 100_000, repeats: int = 200):
+    from itertools import product
+    from MiniProject_SB3_MLcore import train_models
+    from MiniProject_SB3b_MLcore import SolutionRecommender, load_solution_dataset
+    from MiniProject_SB6_Benchmark import load_distributions, MICROBIAL_DATASET_PATH, FERTILIZER_DATASET_PATH
+
+    print("Starting Flat Forest Inference Test...\n")
+    solution_model, dosage_model, label_encoders = train_models(load_distributions()["rows"])
+    recommender = SolutionRecommender(load_solution_dataset(MICROBIAL_DATASET_PATH),
+                                      load_solution_dataset(FERTILIZER_DATASET_PATH))
+    forests = {"solution_model": (solution_model, label_encoders),
+               "dosage_model": (dosage_model, label_encoders),
+               **{name: (model, getattr(recommender, f"{name.split('_')[0]}_encoders"))
+                  for name, model in recommender.models().items() if name.endswith("_model")}}
+
+    rng = np.random.default_rng(42)
+    exact = True
+    for name, (model, encoders) in forests.items():
+        flat = compile_forest(model)
+        sizes = [len(encoders[c].classes_) for c in ["District", "Crop", "Soil Type", "Season"]]
+        grid = np.array(list(product(*(range(size) for size in sizes))), dtype=np.float64)
+        same = (np.array_equal(flat.predict(grid), model.predict(grid))
+                and np.array_equal(flat.predict_proba(grid), model.predict_proba(grid))
+                and all(flat.predict_one(row) == label for row, label in zip(grid[:200], model.predict(grid[:200]))))
+        exact &= same
+
+        row = grid[rng.integers(len(grid))].reshape(1, -1)
+        start = time.perf_counter()
+        for _ in range(max(repeats // 20, 1)):
+            model.predict(row)
+        sklearn_single = (time.perf_counter() - start) / max(repeats // 20, 1)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            flat.predict_one(row[0])
+        flat_single = (time.perf_counter() - start) / repeats
+
+        batch = grid[rng.integers(len(grid), size=batch_size)]
+        start = time.perf_counter()
+        model.predict(batch)
+        sklearn_batch = time.perf_counter() - start
+        start = time.perf_counter()
+        flat.predict(batch)
+        flat_batch = time.perf_counter() - start
+        print(f"{name}: {flat.n_estimators} trees, {len(flat.feature)} nodes, {flat.nbytes / 1024:.0f} KiB, "
+              f"identical on all {len(grid)} combinations: {same}")
+        print(f"  single row: sklearn {sklearn_single * 1e6:.0f} us, flat {flat_single * 1e6:.0f} us "
+              f"({sklearn_single / flat_single:.0f}x); {batch_size} rows: sklearn {batch_size / sklearn_batch:,.0f} "
+              f"rows/s, flat {batch_size / flat_batch:,.0f} rows/s")
+    print(f"\nAll forests exact: {exact}")
+    return exact
+
+
+if __name__ == "__main__":
+    run_flat_forest_test()
@@ -0,0 +1,131 @@
+# joint recommender models - one multi-output random forest predicting solution & dosage together (optionally the
+# microbial and fertilizer targets at once) instead of a forest per target, with a held-out comparison harness
+
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+
+from MiniProject_SB3d_FlatForest import compile_forest
+from MiniProject_SB3g_FeatureEncoder import CategoricalEncoder
+from MiniProject_SB7_Metrics import timed
+
+FEATURE_COLUMNS = ['District', 'Crop', 'Soil Type', 'Season']
+
+
+def encode_and_split(df_cleaned, target_columns: List[str], feature_columns: List[str] = FEATURE_COLUMNS):
+    """Encode features and targets (LabelEncoder codes) and make the ML cores' 80/20 split (random_state=42); the split
+    depends only on the row count, so every model trained from the same frame sees the same held-out rows"""
+    df_cleaned = df_cleaned.copy()
+    columns = feature_columns + target_columns
+    encoders = CategoricalEncoder.fit(df_cleaned, columns)
+    df_cleaned[columns] = encoders.transform(df_cleaned, columns)
+    X_train, X_test, Y_train, Y_test = train_test_split(
+        df_cleaned[feature_columns], df_cleaned[target_columns], test_size=0.2, random_state=42
+    )
+    return encoders, X_train, X_test, Y_train, Y_test
+
+
+@timed("ml.train_joint_model")
+def train_joint_model(df_cleaned, target_columns: List[str], n_estimators: int = 100, random_state: int = 42):
+    """One forest for all target columns (predict returns one column per target) and the encoders"""
+    encoders, X_train, _, Y_train, _ = encode_and_split(df_cleaned, target_columns)
+    model = RandomForestClassifier(n_estimators=n_estimators, random_state=random_state)
+    model.fit(X_train, Y_train)
+    return model, encoders
+
+
+def _fit(X_train, Y_train, n_estimators: int, random_state: int) -> Tuple[RandomForestClassifier, float]:
+    start = time.perf_counter()
+    model = RandomForestClassifier(n_estimators=n_estimators, random_state=random_state)
+    model.fit(X_train, Y_train if Y_train.shape[1] > 1 else Y_train.iloc[:, 0])
+    return model, time.perf_counter() - start
+
+
+def compare_on_holdout(df_cleaned, target_groups: Dict[str, List[List[str]]], n_estimators: int = 100,
+                       random_state: int = 42, repeats: int = 200) -> Dict[str, Dict]:
+    """Train each layout - a list of target groups, one forest per group - on the same split and report
+    held-out accuracy per target, rows with every target right, training time, model size and the
+    inference time of one request (every forest of the layout on one row)"""
+    targets = [col for group in next(iter(target_groups.values())) for col in group]
+    encoders, X_train, X_test, Y_train, Y_test = encode_and_split(df_cleaned, targets)
+    X_rows = X_test.to_numpy(dtype=np.float64)
+
+    report = {}
+    for layout, groups in target_groups.items():
+        models, train_seconds = [], 0.0
+        for group in groups:
+            model, seconds = _fit(X_train, Y_train[group], n_estimators, random_state)
+            models.append((group, model, compile_forest(model)))
+            train_seconds += seconds
+
+        predicted = {}
+        for group, _, flat in models:
+            output = flat.predict(X_rows).reshape(len(X_rows), -1)
+            for k, col in enumerate(group):
+                predicted[col] = output[:, k]
+        accuracy = {col: float(np.mean(predicted[col] == Y_test[col].to_numpy())) for col in targets}
+        all_right = np.all([predicted[col] == Y_test[col].to_numpy() for col in targets], axis=0)
+
+        start = time.perf_counter()
+        for i in range(repeats):
+            row = X_rows[i % len(X_rows)]
+            for _, _, flat in models:
+                flat.predict_one(row)
+        request_seconds = (time.perf_counter() - start) / repeats
+
+        report[layout] = {
+            "forests": len(models),
+            "accuracy": accuracy,
+            "all_targets_accuracy": float(all_right.mean()),
+            "train_seconds": train_seconds,
+            "nodes": int(sum(len(flat.feature) for _, _, flat in models)),
+            "model_bytes": int(sum(flat.nbytes for _, _, flat in models)),
+            "request_us": request_seconds * 1e6,
+            "test_rows": len(X_rows),
+        }
+    return report
+
+
+def print_comparison(title: str, report: Dict[str, Dict]):
+    print(f"\n{title} ({next(iter(report.values()))['test_rows']} held-out rows)")
+    for layout, data in report.items():
+        accuracy = ", ".join(f"{col} {value:.0%}" for col, value in data["accuracy"].items())
+        print(f"  {layout}: {data['forests']} forest(s), {data['nodes']} nodes ({data['model_bytes'] / 1024:.0f} KiB), "
+              f"trained in {data['train_seconds']:.2f}s, {data['request_us']:.0f} us per request")
+        print(f"    accuracy: {accuracy}; all targets right: {data['all_targets_accuracy']:.0%}")
+
+
+# Held-out comparison - separate forests vs joint forests for the SB3 and SB3b recommenders
+def run_joint_model_test():
+    from MiniProject_SB3b_MLcore import load_solution_dataset, micro_columns, fert_columns
+    from MiniProject_SB6_Benchmark import load_distributions, MICROBIAL_DATASET_PATH, FERTILIZER_DATASET_PATH
+
+    print("Starting Joint Model Test...")
+    agri = load_distributions()["rows"]
+    sb3_targets = ['Microbial Solution', 'Microbial Solution Dosage']
+    sb3 = compare_on_holdout(agri[FEATURE_COLUMNS + sb3_targets].dropna(), {
+        "separate": [[sb3_targets[0]], [sb3_targets[1]]],
+        "joint": [sb3_targets],
+    })
+    print_comparison("SB3 microbial solution / dosage", sb3)
+
+    df_micro = load_solution_dataset(MICROBIAL_DATASET_PATH)[micro_columns].dropna()
+    df_fert = load_solution_dataset(FERTILIZER_DATASET_PATH)[fert_columns].dropna()
+    merged = df_micro.reset_index(drop=True).join(
+        df_fert.reset_index(drop=True)[['Fertilizer Solution', 'Fertilizer Solution Dosage']])
+    micro = ['Microbial Solution', 'Microbial Solution Dosage']
+    fert = ['Fertilizer Solution', 'Fertilizer Solution Dosage']
+    sb3b = compare_on_holdout(merged, {
+        "separate": [[micro[0]], [micro[1]], [fert[0]], [fert[1]]],
+        "pairs": [micro, fert],
+        "all": [micro + fert],
+    })
+    print_comparison("SB3b microbial + fertilizer solution / dosage", sb3b)
+    return sb3, sb3b
+
+
+if __name__ == "__main__":
+    run_joint_model_test()
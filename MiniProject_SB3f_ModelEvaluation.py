@@ -0,0 +1,201 @@
+# model evaluation - cross-validated accuracy & macro-F1 of the solution / dosage forests on the shipped datasets,
+# with training time, model size and single-row / batched inference latency for a grid of forest settings
+
+import argparse
+import json
+import os
+import pickle
+import platform
+import time
+import warnings
+from datetime import datetime
+from itertools import product
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import f1_score, make_scorer
+from sklearn.model_selection import KFold, cross_validate
+
+from MiniProject_SB3d_FlatForest import compile_forest
+from MiniProject_SB3e_JointModels import FEATURE_COLUMNS, encode_and_split
+from MiniProject_SB6_Benchmark import (_clean, load_distributions, MICROBIAL_DATASET_PATH,
+                                       FERTILIZER_DATASET_PATH)
+from MiniProject_SB7_Metrics import timed
+
+DEFAULT_N_ESTIMATORS = [10, 25, 50, 100, 200]
+DEFAULT_MAX_DEPTHS = [None, 4, 8]
+DEFAULT_FOLDS = 5
+BATCH_SIZE = 10_000
+SCORING = {"accuracy": "accuracy", "macro_f1": make_scorer(f1_score, average="macro", zero_division=0)}
+
+
+def load_evaluation_datasets() -> Dict[str, Dict]:
+    """The shipped datasets with the target columns each ML core predicts from them"""
+    microbial = ['Microbial Solution', 'Microbial Solution Dosage']
+    fertilizer = ['Fertilizer Solution', 'Fertilizer Solution Dosage']
+    agri = load_distributions()["rows"]
+    df_micro = _clean(pd.read_excel(MICROBIAL_DATASET_PATH))
+    df_fert = _clean(pd.read_excel(FERTILIZER_DATASET_PATH))
+    return {
+        "haryana_agri": {"frame": agri[FEATURE_COLUMNS + microbial].dropna(), "targets": microbial},
+        "microbial": {"frame": df_micro[FEATURE_COLUMNS + microbial].dropna(), "targets": microbial},
+        "fertilizer": {"frame": df_fert[FEATURE_COLUMNS + fertilizer].dropna(), "targets": fertilizer},
+    }
+
+
+def _median_seconds(func, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples))
+
+
+def cross_validate_target(X: pd.DataFrame, y: pd.Series, n_estimators: int, max_depth: Optional[int],
+                          folds: int, n_jobs: int) -> Dict:
+    """Mean / std accuracy and macro-F1 over shuffled K folds (KFold, not stratified: most classes have fewer
+    rows than folds), the folds fitted in parallel"""
+    model = RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth, random_state=42)
+    scores = cross_validate(model, X, y, cv=KFold(folds, shuffle=True, random_state=42), scoring=SCORING,
+                            n_jobs=n_jobs)
+    return {name: {"mean": round(float(scores[f"test_{name}"].mean()), 4),
+                   "std": round(float(scores[f"test_{name}"].std()), 4)}
+            for name in SCORING}
+
+
+def measure_costs(models: List[RandomForestClassifier], X_rows: np.ndarray, rng: np.random.Generator,
+                  batch_size: int, repeats: int) -> Dict:
+    """Size and latency of one request's forests: sklearn predict and the FlatForest path the ML cores use,
+    for a single row and for a batch of random feature rows"""
+    flats = [compile_forest(model) for model in models]
+    row = X_rows[rng.integers(len(X_rows))]
+    batch = X_rows[rng.integers(len(X_rows), size=batch_size)]
+    frame = row.reshape(1, -1)
+    sklearn_single = _median_seconds(lambda: [model.predict(frame) for model in models], max(repeats // 10, 3))
+    flat_single = _median_seconds(lambda: [flat.predict_one(row) for flat in flats], repeats)
+    sklearn_batch = _median_seconds(lambda: [model.predict(batch) for model in models], 3)
+    flat_batch = _median_seconds(lambda: [flat.predict(batch) for flat in flats], 3)
+    return {
+        "nodes": int(sum(len(flat.feature) for flat in flats)),
+        "pickle_bytes": len(pickle.dumps(models)),
+        "flat_bytes": int(sum(flat.nbytes for flat in flats)),
+        "single_row_us": {"sklearn": round(sklearn_single * 1e6, 1), "flat": round(flat_single * 1e6, 1)},
+        "batch_rows_per_sec": {"sklearn": round(batch_size / sklearn_batch), "flat": round(batch_size / flat_batch)},
+    }
+
+
+@timed("ml.evaluate_setting")
+def evaluate_setting(frame: pd.DataFrame, targets: List[str], n_estimators: int, max_depth: Optional[int],
+                     folds: int = DEFAULT_FOLDS, n_jobs: int = -1, batch_size: int = BATCH_SIZE,
+                     repeats: int = 200) -> Dict:
+    """Quality and cost of one n_estimators / max_depth setting: cross-validated scores per target, then
+    training time, size and latency of the forests fitted the way the ML cores fit them (80% split)"""
+    encoders, X_train, _, Y_train, _ = encode_and_split(frame, targets)
+    encoded = frame.copy()
+    for col in FEATURE_COLUMNS + targets:
+        encoded[col] = encoders[col].transform(encoded[col])
+
+    quality = {col: cross_validate_target(encoded[FEATURE_COLUMNS], encoded[col], n_estimators, max_depth,
+                                          folds, n_jobs)
+               for col in targets}
+
+    # Fitted on arrays (no feature names), as the rows they are timed on are plain arrays
+    X_train = X_train.to_numpy(dtype=np.float64)
+    models, train_seconds = [], 0.0
+    for col in targets:
+        model = RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth, random_state=42, n_jobs=n_jobs)
+        start = time.perf_counter()
+        model.fit(X_train, Y_train[col])
+        train_seconds += time.perf_counter() - start
+        models.append(model)
+
+    grid = np.array(list(product(*(range(len(encoders[c].classes_)) for c in FEATURE_COLUMNS))), dtype=np.float64)
+    costs = measure_costs(models, grid, np.random.default_rng(42), batch_size, repeats)
+    return {
+        "n_estimators": n_estimators,
+        "max_depth": max_depth,
+        "quality": quality,
+        "mean_macro_f1": round(float(np.mean([q["macro_f1"]["mean"] for q in quality.values()])), 4),
+        "train_seconds": round(train_seconds, 4),
+        **costs,
+    }
+
+
+def cheapest_setting(results: List[Dict], tolerance: float = 0.02) -> Dict:
+    """The setting with the fastest single-row prediction (then the smallest model) whose mean macro-F1 is
+    within `tolerance` of the best setting's"""
+    best = max(result["mean_macro_f1"] for result in results)
+    keeping = [result for result in results if result["mean_macro_f1"] >= best - tolerance]
+    return min(keeping, key=lambda result: (result["single_row_us"]["flat"], result["flat_bytes"]))
+
+
+def print_evaluation(dataset: str, rows: int, results: List[Dict], choice: Dict):
+    print(f"\n{dataset} ({rows} rows)")
+    print(f"  {'trees':>5} {'depth':>5}  {'accuracy / macro-F1 per target':<34} {'train s':>7} {'KiB':>6} "
+          f"{'row us':>13} {'batch rows/s':>19}")
+    for result in results:
+        quality = "  ".join(f"{q['accuracy']['mean']:.2f}/{q['macro_f1']['mean']:.2f}"
+                            for q in result["quality"].values())
+        print(f"  {result['n_estimators']:>5} {str(result['max_depth']):>5}  {quality:<34} "
+              f"{result['train_seconds']:>7.2f} {result['flat_bytes'] / 1024:>6.0f} "
+              f"{result['single_row_us']['sklearn']:>6.0f}/{result['single_row_us']['flat']:<6.0f} "
+              f"{result['batch_rows_per_sec']['sklearn']:>9,}/{result['batch_rows_per_sec']['flat']:<9,}")
+    print(f"  cheapest within tolerance: {choice['n_estimators']} trees, max_depth {choice['max_depth']} "
+          f"(mean macro-F1 {choice['mean_macro_f1']:.3f})")
+
+
+def run_model_evaluation(n_estimators: List[int] = None, max_depths: List[Optional[int]] = None,
+                         folds: int = DEFAULT_FOLDS, n_jobs: int = -1, tolerance: float = 0.02,
+                         output_file: Optional[str] = "model_evaluation.json") -> Dict:
+    print("Starting Model Evaluation...")
+    # 44-row datasets with up to 27 classes: sklearn's "looks like regression" hint fires on every fit
+    warnings.filterwarnings("ignore", message="The number of unique classes is greater than 50%")
+    print("(latency columns are sklearn/flat; sizes are the flattened forests)")
+    n_estimators = n_estimators or DEFAULT_N_ESTIMATORS
+    max_depths = max_depths or DEFAULT_MAX_DEPTHS
+
+    datasets = {}
+    for name, dataset in load_evaluation_datasets().items():
+        results = [evaluate_setting(dataset["frame"], dataset["targets"], trees, depth, folds, n_jobs)
+                   for trees, depth in product(n_estimators, max_depths)]
+        choice = cheapest_setting(results, tolerance)
+        print_evaluation(name, len(dataset["frame"]), results, choice)
+        datasets[name] = {"rows": len(dataset["frame"]), "targets": dataset["targets"], "results": results,
+                          "cheapest": {"n_estimators": choice["n_estimators"], "max_depth": choice["max_depth"]}}
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "folds": folds,
+        "n_jobs": n_jobs,
+        "tolerance": tolerance,
+        "datasets": datasets,
+    }
+    if output_file:
+        with open(output_file, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nEvaluation results saved to {output_file}")
+    return report
+
+
+def _depth(value: str) -> Optional[int]:
+    return None if value.lower() == "none" else int(value)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solution / dosage model evaluation")
+    parser.add_argument("--trees", type=int, nargs="+", default=DEFAULT_N_ESTIMATORS, help="n_estimators values")
+    parser.add_argument("--depths", type=_depth, nargs="+", default=DEFAULT_MAX_DEPTHS,
+                        help="max_depth values ('none' for unlimited)")
+    parser.add_argument("--folds", type=int, default=DEFAULT_FOLDS)
+    parser.add_argument("--jobs", type=int, default=-1, help="n_jobs for cross-validation and training")
+    parser.add_argument("--tolerance", type=float, default=0.02, help="macro-F1 allowed below the best setting")
+    parser.add_argument("--output", default="model_evaluation.json")
+    args = parser.parse_args()
+
+    run_model_evaluation(args.trees, args.depths, args.folds, args.jobs, args.tolerance, args.output)
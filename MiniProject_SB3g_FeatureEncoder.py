@@ -0,0 +1,205 @@
+# categorical feature encoder - raw district / crop / soil / season strings to forest codes through dict lookups,
+# built once at training time, with one vectorized pass for whole frames & a configurable unknown-category policy
+
+import numbers
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from MiniProject_SB7_Metrics import increment
+
+UNKNOWN_POLICIES = ("error", "most_frequent")
+
+
+class UnknownCategoryError(ValueError):
+    """A value the encoder was not trained on, under the "error" policy"""
+
+
+def normalize_category(value) -> str:
+    """Lookup key for a raw value: whitespace collapsed and case folded (" sirsa  " -> "sirsa")"""
+    return " ".join(str(value).split()).casefold()
+
+
+class ColumnEncoder:
+    """One column's classes and their codes - the same codes LabelEncoder gives (sorted classes), so forests
+    trained on LabelEncoder output predict unchanged.
+
+    Exact values resolve first; otherwise the normalized value does, to the first class with that key (the
+    dosage columns hold classes that differ only in case). Values matching neither follow `unknown`:
+    "error" raises ValueError like LabelEncoder, "most_frequent" uses the column's most frequent training
+    class, and an int is used as the code itself (so it must be one of the column's codes)."""
+
+    def __init__(self, name: str, classes: Sequence, most_frequent: Optional[int] = None,
+                 unknown: Union[str, int] = "error"):
+        self.name = name
+        self.classes_ = np.asarray(classes)
+        if isinstance(unknown, numbers.Integral) and not isinstance(unknown, (bool, np.bool_)):
+            if not 0 <= unknown < len(self.classes_):
+                raise ValueError(f"{name}: unknown category code {unknown} is not one of its codes "
+                                 f"0..{len(self.classes_) - 1}")
+            unknown = int(unknown)
+        elif not isinstance(unknown, str) or unknown not in UNKNOWN_POLICIES:
+            raise ValueError(f"Unknown category policy must be one of {UNKNOWN_POLICIES} or a class code, "
+                             f"got {unknown!r}")
+        self.most_frequent = most_frequent
+        self.unknown = unknown
+        self.index: Dict[object, int] = {}
+        for code, value in enumerate(self.classes_.tolist()):
+            self.index.setdefault(normalize_category(value), code)
+        for code, value in enumerate(self.classes_.tolist()):
+            self.index[value] = code
+
+    def _lookup(self, value) -> Optional[int]:
+        code = self.index.get(value)
+        if code is None:
+            code = self.index.get(normalize_category(value))
+        return code
+
+    def _unknown_code(self, values: List) -> int:
+        increment("ml.unknown_categories", len(values))
+        if self.unknown == "error":
+            raise UnknownCategoryError(f"{self.name} contains previously unseen labels: {values}")
+        if self.unknown == "most_frequent":
+            if self.most_frequent is None:
+                raise ValueError(f"{self.name}: no training counts for the most_frequent policy, "
+                                 f"unseen labels: {values}")
+            return self.most_frequent
+        return self.unknown
+
+    def encode(self, value) -> int:
+        code = self._lookup(value)
+        return code if code is not None else self._unknown_code([value])
+
+    def transform(self, values) -> np.ndarray:
+        """Codes for a column of values: each distinct value is looked up once, then scattered back"""
+        if not isinstance(values, pd.Series):
+            values = pd.Series(np.asarray(values, dtype=object))
+        inverse, uniques = pd.factorize(values, use_na_sentinel=False)
+        codes = [self._lookup(value) for value in uniques]
+        missing = [value for value, code in zip(uniques, codes) if code is None]
+        if missing:
+            fallback = self._unknown_code(missing)
+            codes = [fallback if code is None else code for code in codes]
+        return np.asarray(codes, dtype=np.int64)[inverse]
+
+    def inverse_transform(self, codes) -> np.ndarray:
+        return self.classes_[np.asarray(codes)]
+
+    def decode(self, code: int):
+        return self.classes_[code]
+
+
+class CategoricalEncoder(dict):
+    """Column name -> ColumnEncoder. Drops in wherever the ML cores used their dict of LabelEncoders
+    (encoders[col].transform / inverse_transform / classes_, and shared memory publishing), and adds
+    encode_row for single requests and transform for whole frames"""
+
+    @classmethod
+    def fit(cls, df: pd.DataFrame, columns: Iterable[str], unknown: Union[str, int] = "error") -> "CategoricalEncoder":
+        encoder = cls()
+        for col in columns:
+            values = df[col].to_numpy()
+            classes, counts = np.unique(values, return_counts=True)
+            encoder[col] = ColumnEncoder(col, classes, int(np.argmax(counts)), unknown)
+        return encoder
+
+    @classmethod
+    def from_label_encoders(cls, encoders: Dict, unknown: Union[str, int] = "error") -> "CategoricalEncoder":
+        """Wrap a dict of fitted LabelEncoders (or SharedEncoders attached from shared memory, which carry
+        the training mode for the most_frequent policy); returned as is when it already is a CategoricalEncoder"""
+        if isinstance(encoders, CategoricalEncoder):
+            return encoders
+        return cls({col: ColumnEncoder(col, encoder.classes_, getattr(encoder, "most_frequent", None), unknown)
+                    for col, encoder in encoders.items()})
+
+    def set_unknown(self, unknown: Union[str, int], columns: Optional[Iterable[str]] = None):
+        """Change the unknown-category policy of `columns` (default all)"""
+        for col in list(self) if columns is None else columns:
+            encoder = self[col]
+            self[col] = ColumnEncoder(col, encoder.classes_, encoder.most_frequent, unknown)
+
+    def encode_row(self, columns: Sequence[str], values: Sequence) -> List[int]:
+        """Codes for one request's raw values, one dict lookup per field"""
+        return [self[col].encode(value) for col, value in zip(columns, values)]
+
+    def transform(self, X, columns: Optional[Sequence[str]] = None) -> np.ndarray:
+        """(rows, columns) codes for a DataFrame (its `columns`, default all it shares with the encoder) or a
+        2-D array of raw values whose columns are `columns`"""
+        if isinstance(X, pd.DataFrame):
+            columns = list(columns) if columns is not None else [col for col in X.columns if col in self]
+            data = [X[col] for col in columns]
+        else:
+            X = np.asarray(X, dtype=object)
+            if columns is None or X.ndim != 2 or X.shape[1] != len(columns):
+                raise ValueError("Arrays need `columns` naming each of their columns")
+            data = [X[:, k] for k in range(X.shape[1])]
+        if not data:
+            return np.empty((len(X), 0), dtype=np.int64)
+        return np.column_stack([self[col].transform(values) for col, values in zip(columns, data)])
+
+
+# Test - parity with LabelEncoder on the shipped datasets, normalization & policies, and encoding latency
+def run_feature_encoder_test(batch_size: int = 100_000, repeats: int = 2000):
+    import warnings
+    from sklearn.preprocessing import LabelEncoder
+    from MiniProject_SB3e_JointModels import FEATURE_COLUMNS
+    from MiniProject_SB3f_ModelEvaluation import load_evaluation_datasets
+
+    print("Starting Feature Encoder Test...\n")
+    warnings.filterwarnings("ignore", message="The number of unique classes is greater than 50%")
+    exact = True
+    for name, dataset in load_evaluation_datasets().items():
+        frame, columns = dataset["frame"], FEATURE_COLUMNS + dataset["targets"]
+        encoder = CategoricalEncoder.fit(frame, columns)
+        same = all(np.array_equal(encoder[col].transform(frame[col]), LabelEncoder().fit_transform(frame[col]))
+                   for col in columns)
+        exact &= same
+        print(f"{name}: codes identical to LabelEncoder for {len(columns)} columns: {same}")
+
+    frame = load_evaluation_datasets()["microbial"]["frame"]
+    encoder = CategoricalEncoder.fit(frame, FEATURE_COLUMNS)
+    raw = frame[FEATURE_COLUMNS].iloc[0].tolist()
+    messy = [f"  {value.upper()} " for value in raw]
+    print(f"\nNormalized lookup {messy} -> {encoder.encode_row(FEATURE_COLUMNS, messy)} "
+          f"(clean {encoder.encode_row(FEATURE_COLUMNS, raw)})")
+    try:
+        encoder.encode_row(FEATURE_COLUMNS, ["Atlantis"] + raw[1:])
+    except ValueError as e:
+        print(f"Policy 'error': {e}")
+    encoder.set_unknown("most_frequent")
+    print(f"Policy 'most_frequent': {encoder.encode_row(FEATURE_COLUMNS, ['Atlantis'] + raw[1:])}")
+    encoder.set_unknown(0)
+    print(f"Policy 0: {encoder.encode_row(FEATURE_COLUMNS, ['Atlantis'] + raw[1:])}")
+    encoder.set_unknown("error")
+
+    label_encoders = {col: LabelEncoder().fit(frame[col]) for col in FEATURE_COLUMNS}
+    start = time.perf_counter()
+    for _ in range(repeats):
+        [label_encoders[col].transform([value])[0] for col, value in zip(FEATURE_COLUMNS, raw)]
+    label_single = (time.perf_counter() - start) / repeats
+    start = time.perf_counter()
+    for _ in range(repeats):
+        encoder.encode_row(FEATURE_COLUMNS, raw)
+    dict_single = (time.perf_counter() - start) / repeats
+
+    batch = frame[FEATURE_COLUMNS].sample(batch_size, replace=True, random_state=42)
+    start = time.perf_counter()
+    expected = np.column_stack([label_encoders[col].transform(batch[col]) for col in FEATURE_COLUMNS])
+    label_batch = time.perf_counter() - start
+    start = time.perf_counter()
+    codes = encoder.transform(batch)
+    dict_batch = time.perf_counter() - start
+    exact &= np.array_equal(codes, expected)
+
+    print(f"\nOne request (4 fields): LabelEncoder {label_single * 1e6:.0f} us, dict {dict_single * 1e6:.1f} us "
+          f"({label_single / dict_single:.0f}x)")
+    print(f"{batch_size} rows: LabelEncoder {label_batch * 1000:.1f} ms, vectorized {dict_batch * 1000:.1f} ms "
+          f"({label_batch / dict_batch:.1f}x), identical: {np.array_equal(codes, expected)}")
+    print(f"\nAll codes exact: {exact}")
+    return exact
+
+
+if __name__ == "__main__":
+    run_feature_encoder_test()
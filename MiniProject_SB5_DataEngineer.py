@@ -1,9 +1,31 @@
 import sqlite3
 import random
+import numpy as np
+import threading
+import queue
+import time
+import os
+import shutil
+import tempfile
+from concurrent.futures import Future
+from MiniProject_SB7_Metrics import timed, track, increment
+
+DB_PATH = "agriculture.db"
+# Seed of the default reward engine, so ledger batches can be replayed; override with AGRIHUB_REWARD_SEED
+REWARD_SEED = int(os.environ.get("AGRIHUB_REWARD_SEED", "42"))
+
+# Connect to Database
+def get_connection(db_path=DB_PATH):
+    # isolation_level=None so that transactions are opened explicitly with BEGIN IMMEDIATE,
+    # which takes the write lock up front instead of failing half way through a sale
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    return conn
 
 # Database Setup
-def init_db():
-    conn = sqlite3.connect("agriculture.db")
+def init_db(db_path=DB_PATH):
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
     cursor.execute('''CREATE TABLE IF NOT EXISTS farmers (
                       id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -17,51 +39,217 @@ def init_db():
                       reward TEXT,
                       FOREIGN KEY(farmer_id) REFERENCES farmers(id)
                       )''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_farmers_name ON farmers(name)")
     conn.commit()
     conn.close()
 
 # Register Farmer
-def register_farmer(name):
-    conn = sqlite3.connect("agriculture.db")
+@timed("db.register_farmer")
+def register_farmer(name, db_path=DB_PATH):
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
     cursor.execute("INSERT INTO farmers (name) VALUES (?)", (name,))
     conn.commit()
     conn.close()
     print(f"Farmer {name} registered successfully!")
 
+# Register a farmer unless one with that name exists - quiet and safe to repeat (e.g. from the HTTP API)
+def ensure_farmer(name, db_path=DB_PATH):
+    """Returns True if the farmer was added, False if already registered"""
+    conn = get_connection(db_path)
+    try:
+        # IMMEDIATE takes the write lock before the existence check, so concurrent calls can't both insert
+        conn.execute("BEGIN IMMEDIATE")
+        cursor = conn.execute("INSERT INTO farmers (name) SELECT ? WHERE NOT EXISTS "
+                              "(SELECT 1 FROM farmers WHERE name=?)", (name, name))
+        conn.execute("COMMIT")
+        return cursor.rowcount == 1
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+# Reward types with their relative weight and the share of the sale amount paid as cashback
+DEFAULT_REWARD_TABLE = {
+    "Cashback": {"weight": 1.0, "rate": 0.05},
+    "Wallet Credit": {"weight": 1.0, "rate": 0.0},
+    "Discount Coupon": {"weight": 1.0, "rate": 0.0},
+}
+
+class RewardEngine:
+    """Vectorized reward generation driven by a seeded NumPy generator"""
+
+    def __init__(self, reward_table=None, seed=None):
+        reward_table = reward_table or DEFAULT_REWARD_TABLE
+        self.seed = seed
+        self.reward_types = np.array(list(reward_table.keys()))
+        weights = np.array([float(reward_table[r]["weight"]) for r in self.reward_types])
+        if (weights < 0).any() or weights.sum() <= 0:
+            raise ValueError("Reward weights must be non-negative and not all zero")
+        self.probabilities = weights / weights.sum()
+        self.rates = np.array([float(reward_table[r].get("rate", 0.0)) for r in self.reward_types])
+        self.rng = np.random.default_rng(seed)
+
+    def _generator(self, batch_id):
+        if batch_id is None:
+            return self.rng
+        if self.seed is None:
+            raise ValueError("Per-batch reward streams need a seeded RewardEngine")
+        # Independent stream per batch, so a batch can be replayed without replaying its predecessors
+        return np.random.default_rng([self.seed, batch_id])
+
+    def generate(self, amounts, batch_id=None):
+        """Return (reward_types, cashback) arrays for an array of sale amounts"""
+        amounts = np.asarray(amounts, dtype=float)
+        codes = self._generator(batch_id).choice(len(self.reward_types), size=amounts.shape, p=self.probabilities)
+        return self.reward_types[codes], amounts * self.rates[codes]
+
+    def generate_one(self, amount):
+        rewards, cashback = self.generate([amount])
+        return str(rewards[0]), float(cashback[0])
+
+    def summarize(self, reward_types, cashback):
+        """Count and total cashback per reward type for a simulated batch"""
+        summary = {}
+        for reward in self.reward_types:
+            mask = reward_types == reward
+            summary[str(reward)] = {"count": int(mask.sum()), "cashback": float(cashback[mask].sum())}
+        return summary
+
+_default_reward_engine = RewardEngine(seed=REWARD_SEED)
+
 # Generate Reward
-def generate_reward(amount):
-    rewards = ["Cashback", "Wallet Credit", "Discount Coupon"]
-    reward = random.choice(rewards)
-    cashback = 0.05 * amount if reward == "Cashback" else 0
-    return reward, cashback
+def generate_reward(amount, engine=None):
+    return (engine or _default_reward_engine).generate_one(amount)
 
-# Process Transaction
-def process_transaction(farmer_name, amount):
-    conn = sqlite3.connect("agriculture.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, wallet_balance FROM farmers WHERE name=?", (farmer_name,))
+# Apply one sale inside an already open write transaction
+def _apply_sale(cursor, farmer_name, amount, reward=None):
+    cursor.execute("SELECT id FROM farmers WHERE name=?", (farmer_name,))
     farmer = cursor.fetchone()
-    
     if not farmer:
-        print("Farmer not found!")
-        return
-    
-    farmer_id, wallet_balance = farmer
-    reward, cashback = generate_reward(amount)
-    
-    # Update wallet if cashback
-    new_balance = wallet_balance + cashback
-    cursor.execute("UPDATE farmers SET wallet_balance=? WHERE id=?", (new_balance, farmer_id))
-    cursor.execute("INSERT INTO transactions (farmer_id, amount, reward) VALUES (?, ?, ?)", 
+        return None
+
+    farmer_id = farmer[0]
+    reward, cashback = reward if reward is not None else generate_reward(amount)
+
+    # Increment in SQL so concurrent sales for the same farmer can't overwrite each other
+    cursor.execute("UPDATE farmers SET wallet_balance = wallet_balance + ? WHERE id=?", (cashback, farmer_id))
+    cursor.execute("INSERT INTO transactions (farmer_id, amount, reward) VALUES (?, ?, ?)",
                    (farmer_id, amount, reward))
-    conn.commit()
-    conn.close()
+    cursor.execute("SELECT wallet_balance FROM farmers WHERE id=?", (farmer_id,))
+    new_balance = cursor.fetchone()[0]
+    return reward, cashback, new_balance
+
+# Process Transaction
+@timed("db.process_transaction")
+def process_transaction(farmer_name, amount, db_path=DB_PATH, reward_engine=None):
+    conn = get_connection(db_path)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        result = _apply_sale(cursor, farmer_name, amount, generate_reward(amount, reward_engine))
+        if result is None:
+            cursor.execute("ROLLBACK")
+            print("Farmer not found!")
+            return None
+        cursor.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            cursor.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    reward, cashback, new_balance = result
     print(f"Transaction successful! Farmer {farmer_name} sold for {amount}. Reward: {reward}. Wallet: {new_balance}")
+    return result
+
+class LedgerWriter:
+    """Single-writer queue that group-commits many sales per transaction (and per fsync)"""
+
+    def __init__(self, db_path=DB_PATH, max_batch=256, max_wait=0.0, reward_engine=None):
+        self.db_path = db_path
+        self.reward_engine = reward_engine or _default_reward_engine
+        if self.reward_engine.seed is None:
+            # Each batch draws from the stream of its batch number, which needs a seed to be replayable
+            raise ValueError("LedgerWriter needs a seeded RewardEngine")
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = queue.Queue()
+        self.batches_committed = 0
+        self.sales_committed = 0
+        self._thread = threading.Thread(target=self._run, name="ledger-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, farmer_name, amount) -> Future:
+        """Queue a sale; the future resolves to (reward, cashback, new_balance) or None once committed"""
+        future = Future()
+        self.queue.put((farmer_name, amount, future))
+        return future
+
+    def process_transaction(self, farmer_name, amount):
+        """Blocking variant of submit"""
+        return self.submit(farmer_name, amount).result()
+
+    def close(self):
+        """Flush pending sales and stop the writer thread"""
+        self.queue.put(None)
+        self._thread.join()
+
+    def _next_batch(self):
+        item = self.queue.get()
+        if item is None:
+            return None, True
+        batch = [item]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                item = self.queue.get(timeout=timeout) if timeout > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        conn = get_connection(self.db_path)
+        cursor = conn.cursor()
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            if not batch:
+                continue
+            results = []
+            try:
+                # Rewards for the whole batch are drawn in one vectorized call, from the batch's own stream
+                reward_types, cashbacks = self.reward_engine.generate([amount for _, amount, _ in batch],
+                                                                      batch_id=self.batches_committed)
+                with track("db.ledger_group_commit"):
+                    cursor.execute("BEGIN IMMEDIATE")
+                    for (farmer_name, amount, _), reward, cashback in zip(batch, reward_types, cashbacks):
+                        results.append(_apply_sale(cursor, farmer_name, amount, (str(reward), float(cashback))))
+                    cursor.execute("COMMIT")
+            except Exception as e:
+                if conn.in_transaction:
+                    cursor.execute("ROLLBACK")
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches_committed += 1
+            self.sales_committed += len(batch)
+            increment("db.ledger_sales_committed", len(batch))
+            for (_, _, future), result in zip(batch, results):
+                future.set_result(result)
+        conn.close()
 
 # View Farmer Details
-def view_farmer_details(name):
-    conn = sqlite3.connect("agriculture.db")
+@timed("db.view_farmer_details")
+def view_farmer_details(name, db_path=DB_PATH):
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
     cursor.execute("SELECT id, wallet_balance FROM farmers WHERE name=?", (name,))
     farmer = cursor.fetchone()
@@ -76,6 +264,109 @@ def view_farmer_details(name):
         print("Farmer not found!")
     conn.close()
 
+# Stress test - concurrent sales against a scratch database, checks balances and measures throughput
+def run_stress_test(num_threads=8, sales_per_thread=250, num_farmers=5):
+    print("Starting Ledger Stress Test...\n")
+    tmp_dir = tempfile.mkdtemp(prefix="agrihub_ledger_")
+    farmer_names = [f"Farmer {i}" for i in range(num_farmers)]
+
+    def check_balances(db_path, expected, expected_count):
+        conn = sqlite3.connect(db_path)
+        balances = dict(conn.execute("SELECT name, wallet_balance FROM farmers").fetchall())
+        count = conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+        conn.close()
+        ok = count == expected_count and all(
+            abs(balances[name] - expected[name]) < 1e-6 for name in farmer_names
+        )
+        print(f"  Transactions recorded: {count}/{expected_count}")
+        print(f"  Balances consistent: {'yes' if ok else 'NO'}")
+        return ok
+
+    def run_mode(label, sell, prepare=None):
+        db_path = os.path.join(tmp_dir, f"{label}.db")
+        init_db(db_path)
+        conn = sqlite3.connect(db_path)
+        conn.executemany("INSERT INTO farmers (name) VALUES (?)", [(name,) for name in farmer_names])
+        conn.commit()
+        conn.close()
+        if prepare is not None:
+            prepare(db_path)
+
+        expected = {name: 0.0 for name in farmer_names}
+        lock = threading.Lock()
+
+        def worker(worker_id):
+            local = {name: 0.0 for name in farmer_names}
+            for i in range(sales_per_thread):
+                name = farmer_names[(worker_id + i) % num_farmers]
+                _, cashback, _ = sell(db_path, name, float(random.randint(100, 5000)))
+                local[name] += cashback
+            with lock:
+                for name, value in local.items():
+                    expected[name] += value
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(num_threads)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        total = num_threads * sales_per_thread
+        print(f"{label}: {total} sales in {elapsed:.2f}s ({total / elapsed:.0f} sales/sec)")
+        return check_balances(db_path, expected, total)
+
+    def direct_sale(db_path, name, amount):
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            result = _apply_sale(cursor, name, amount)
+            cursor.execute("COMMIT")
+        finally:
+            conn.close()
+        return result
+
+    writers = {}
+
+    def start_writer(db_path):
+        # One writer per database, started before the workers so its setup isn't part of the timing
+        writers[db_path] = LedgerWriter(db_path)
+
+    def queued_sale(db_path, name, amount):
+        return writers[db_path].process_transaction(name, amount)
+
+    try:
+        direct_ok = run_mode("BEGIN IMMEDIATE per sale", direct_sale)
+        queued_ok = run_mode("Single-writer group commit", queued_sale, prepare=start_writer)
+    finally:
+        for writer in writers.values():
+            writer.close()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    for writer in writers.values():
+        print(f"  Group commit: {writer.sales_committed} sales in {writer.batches_committed} commits")
+    return direct_ok and queued_ok
+
+# Season simulation - draws rewards for a full season of sales in one call and checks replay
+def run_reward_simulation(num_transactions=1_000_000, seed=42):
+    print("Starting Reward Simulation...\n")
+    engine = RewardEngine(seed=seed)
+    amounts = np.random.default_rng(seed).uniform(100, 5000, size=num_transactions).round(2)
+
+    start = time.perf_counter()
+    reward_types, cashback = engine.generate(amounts, batch_id=0)
+    elapsed = time.perf_counter() - start
+    print(f"Simulated {num_transactions} transactions in {elapsed * 1000:.1f} ms")
+
+    for reward, data in engine.summarize(reward_types, cashback).items():
+        print(f"{reward}: {data['count']} transactions, total cashback {data['cashback']:.2f}")
+
+    replay_types, replay_cashback = RewardEngine(seed=seed).generate(amounts, batch_id=0)
+    replayed = bool((replay_types == reward_types).all() and (replay_cashback == cashback).all())
+    print(f"Replay identical: {'yes' if replayed else 'NO'}")
+    return replayed
+
 # Example Usage
 if __name__ == "__main__":
     init_db()
@@ -0,0 +1,301 @@
+# benchmark harness - synthetic haryana-scale load (farms, resource centers, recommendation requests,
+# ledger transactions) generated from the shipped datasets & timings for every stage of the pipeline
+
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from MiniProject_SB1b_GISserviceTest import HaryanaGISService, Farm, ResourceCenter, Location
+from MiniProject_SB3_MLcore import train_models, predict_recommendation
+from MiniProject_SB5_DataEngineer import init_db, LedgerWriter, RewardEngine
+from MiniProject_SB7_Metrics import metrics
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+AGRI_DATASET_PATH = os.path.join(BASE_DIR, "Haryana Agri DataSet.csv")
+MICROBIAL_DATASET_PATH = os.path.join(BASE_DIR, "MicrobialSolutionHaryanaDataset.xlsx")
+FERTILIZER_DATASET_PATH = os.path.join(BASE_DIR, "FertilizerHaryanaDataSet.xlsx")
+
+DEFAULT_SIZES = [1000, 5000]
+CENTERS_PER_DISTRICT = 3
+HECTARE_TO_ACRE = 2.47105
+
+
+def _clean(df: pd.DataFrame) -> pd.DataFrame:
+    """Same cleanup as the ML cores: strip headers/cells and forward-fill the merged District column"""
+    df = df.loc[:, ~df.columns.astype(str).str.startswith("Unnamed")].copy()
+    df.columns = df.columns.str.strip()
+    df = df.apply(lambda col: col.map(lambda x: x.strip() if isinstance(x, str) else x))
+    df["District"] = df["District"].ffill()
+    return df
+
+
+def _cost_range(value) -> Tuple[float, float]:
+    numbers = [float(n) for n in re.findall(r"\d+\.?\d*", str(value))]
+    if len(numbers) >= 2:
+        return numbers[0], numbers[1]
+    if numbers:
+        return numbers[0], numbers[0]
+    return 0.0, 0.0
+
+
+def load_distributions() -> Dict:
+    """Load the crop rows and per-acre cost ranges the synthetic population is sampled from"""
+    agri = _clean(pd.read_csv(AGRI_DATASET_PATH))
+    agri = agri.dropna(subset=["Crop", "Soil Type", "Season"])
+
+    costs = []
+    for path in [MICROBIAL_DATASET_PATH, FERTILIZER_DATASET_PATH]:
+        df = _clean(pd.read_excel(path))
+        costs.extend(_cost_range(v) for v in df["Cost (INR/acre)"].dropna())
+
+    return {
+        "rows": agri.reset_index(drop=True),
+        "cost_ranges": np.array(costs, dtype=float),
+    }
+
+
+def generate_farms(count: int, rng: np.random.Generator, distributions: Dict,
+                   service: HaryanaGISService) -> List[Farm]:
+    """Sample farms from the dataset rows, jittered around the district centroids"""
+    rows = distributions["rows"]
+    picks = rng.integers(0, len(rows), size=count)
+    jitter = rng.uniform(-0.05, 0.05, size=(count, 2))
+    areas = rng.uniform(1.0, 10.0, size=count)
+    now = datetime.now()
+
+    farms = []
+    for i, row_index in enumerate(picks):
+        row = rows.iloc[row_index]
+        base_lat, base_lon = service.district_coordinates[row["District"]]
+        water = row.get("Water Requirement (mm)")
+        farms.append(Farm(
+            location=Location(
+                latitude=base_lat + jitter[i, 0],
+                longitude=base_lon + jitter[i, 1],
+                district=row["District"],
+                type="farm"
+            ),
+            area=float(areas[i]),
+            farmer_id=f"F{i + 1:07d}",
+            crop_types=[row["Crop"]],
+            soil_type=row["Soil Type"],
+            season=row["Season"],
+            soil_npk=str(row.get("Soil NPK", "Unknown")),
+            soil_ph=str(row.get("Soil pH", "Unknown")),
+            microbial_solution=str(row.get("Microbial Solution", "Unknown")),
+            water_requirement=str(water) if pd.notna(water) else "N/A",
+            registration_date=now
+        ))
+    return farms
+
+
+def generate_centers(per_district: int, rng: np.random.Generator, farms: List[Farm],
+                     service: HaryanaGISService) -> List[ResourceCenter]:
+    """Place centers around each district centroid with services matching the district's crops"""
+    district_crops: Dict[str, set] = {}
+    for farm in farms:
+        district_crops.setdefault(farm.location.district, set()).update(farm.crop_types)
+
+    centers = []
+    for district, (base_lat, base_lon) in service.district_coordinates.items():
+        crops = district_crops.get(district, set())
+        for _ in range(per_district):
+            services = ["soil_testing", "equipment_rental", "fertilizer_distribution"]
+            services += [f"{crop.lower()}_seed_distribution" for crop in sorted(crops)
+                         if crop in ("Rice", "Wheat", "Bajra", "Mustard")]
+            lat_variance, lon_variance = rng.uniform(-0.1, 0.1, size=2)
+            centers.append(ResourceCenter(
+                location=Location(
+                    latitude=base_lat + lat_variance,
+                    longitude=base_lon + lon_variance,
+                    district=district,
+                    type="resource_center"
+                ),
+                center_id=f"RC{len(centers) + 1:04d}",
+                services=services,
+                operating_hours="9AM-5PM",
+                contact_info=f"0184-{rng.integers(100000, 999999)}",
+                inventory=service.generate_inventory(services)
+            ))
+    return centers
+
+
+def generate_requests(count: int, rng: np.random.Generator, distributions: Dict) -> List[Tuple[str, str, str, str]]:
+    """Recommendation requests (district, crop, soil type, season) drawn from the dataset rows"""
+    rows = distributions["rows"]
+    picks = rng.integers(0, len(rows), size=count)
+    return [tuple(rows.iloc[i][["District", "Crop", "Soil Type", "Season"]]) for i in picks]
+
+
+def generate_transactions(farms: List[Farm], count: int, rng: np.random.Generator,
+                          distributions: Dict) -> List[Tuple[str, float]]:
+    """Ledger sales sized as a per-acre treatment cost from the datasets times the farm area"""
+    cost_ranges = distributions["cost_ranges"]
+    farm_picks = rng.integers(0, len(farms), size=count)
+    cost_picks = rng.integers(0, len(cost_ranges), size=count)
+    low, high = cost_ranges[cost_picks, 0], cost_ranges[cost_picks, 1]
+    areas = np.array([farms[i].area for i in farm_picks]) * HECTARE_TO_ACRE
+    amounts = np.round(rng.uniform(low, high) * areas, 2)
+    return [(farms[i].farmer_id, float(amount)) for i, amount in zip(farm_picks, amounts)]
+
+
+def _timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def _stage(seconds: float, operations: int) -> Dict:
+    return {
+        "seconds": round(seconds, 6),
+        "operations": operations,
+        "ops_per_sec": round(operations / seconds, 2) if seconds > 0 else None,
+    }
+
+
+def benchmark_size(size: int, seed: int, distributions: Dict, models, work_dir: str,
+                   query_count: int = 200, request_count: int = 500) -> Dict:
+    """Run every pipeline stage once against a synthetic population of `size` farms"""
+    rng = np.random.default_rng([seed, size])
+    random.seed(seed + size)  # generate_inventory draws from the random module
+
+    service = HaryanaGISService()
+    farms = generate_farms(size, rng, distributions, service)
+    centers = generate_centers(CENTERS_PER_DISTRICT, rng, farms, service)
+    requests = generate_requests(min(size, request_count), rng, distributions)
+    transactions = generate_transactions(farms, size, rng, distributions)
+    stages = {}
+
+    def register_all():
+        for center in centers:
+            service.register_resource_center(center)
+        for farm in farms:
+            service.register_farm(farm)
+
+    seconds, _ = _timed(register_all)
+    stages["registration"] = _stage(seconds, len(farms) + len(centers))
+
+    query_farms = [farms[i] for i in rng.integers(0, len(farms), size=min(size, query_count))]
+    seconds, _ = _timed(lambda: [service.find_nearest_centers(f.location, radius=25) for f in query_farms])
+    stages["nearest_centers"] = _stage(seconds, len(query_farms))
+
+    seconds, _ = _timed(service.calculate_coverage_statistics)
+    stages["coverage_statistics"] = _stage(seconds, len(farms))
+
+    solution_model, dosage_model, label_encoders = models
+
+    def recommend_all():
+        for district, crop, soil_type, season in requests:
+            predict_recommendation(solution_model, dosage_model, label_encoders,
+                                   district, crop, soil_type, season)
+
+    seconds, _ = _timed(recommend_all)
+    stages["recommendations"] = _stage(seconds, len(requests))
+
+    map_file = os.path.join(work_dir, f"bench_map_{size}.html")
+    seconds, _ = _timed(service.generate_map, map_file)
+    stages["map_export"] = _stage(seconds, len(farms) + len(centers))
+
+    db_path = os.path.join(work_dir, f"bench_ledger_{size}.db")
+    init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executemany("INSERT INTO farmers (name) VALUES (?)", [(farm.farmer_id,) for farm in farms])
+    conn.commit()
+    conn.close()
+
+    def write_ledger():
+        writer = LedgerWriter(db_path, reward_engine=RewardEngine(seed=seed))
+        futures = [writer.submit(name, amount) for name, amount in transactions]
+        for future in futures:
+            future.result()
+        writer.close()
+
+    seconds, _ = _timed(write_ledger)
+    stages["ledger_writes"] = _stage(seconds, len(transactions))
+
+    return {
+        "size": size,
+        "farms": len(farms),
+        "resource_centers": len(centers),
+        "stages": stages,
+    }
+
+
+def run_benchmark(sizes: List[int] = None, seed: int = 42, output_file: str = "benchmark_results.json") -> Dict:
+    print("Starting AgriHub Benchmark...\n")
+    sizes = sizes or DEFAULT_SIZES
+    distributions = load_distributions()
+
+    train_seconds, models = _timed(train_models, distributions["rows"])
+    print(f"Trained recommendation models in {train_seconds:.2f}s")
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="agrihub_bench_") as work_dir:
+        for size in sizes:
+            result = benchmark_size(size, seed, distributions, models, work_dir)
+            results.append(result)
+            print(f"\nSize: {size} farms, {result['resource_centers']} centers")
+            for stage, data in result["stages"].items():
+                print(f"  {stage}: {data['seconds']:.3f}s ({data['ops_per_sec']} ops/sec)")
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "seed": seed,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "model_training_seconds": round(train_seconds, 6),
+        "results": results,
+        "metrics": metrics.snapshot(),
+    }
+    with open(output_file, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nBenchmark results saved to {output_file}")
+    return report
+
+
+def compare_results(baseline_file: str, current_file: str, tolerance: float = 0.2) -> List[str]:
+    """Report stages that got slower than the baseline by more than `tolerance` (0.2 = 20%)"""
+    with open(baseline_file) as f:
+        baseline = {r["size"]: r["stages"] for r in json.load(f)["results"]}
+    with open(current_file) as f:
+        current = {r["size"]: r["stages"] for r in json.load(f)["results"]}
+
+    regressions = []
+    for size, stages in current.items():
+        for stage, data in stages.items():
+            before = baseline.get(size, {}).get(stage)
+            if not before or not before["seconds"]:
+                continue
+            ratio = data["seconds"] / before["seconds"]
+            if ratio > 1 + tolerance:
+                regressions.append(f"{stage} @ {size}: {before['seconds']:.3f}s -> {data['seconds']:.3f}s ({ratio:.2f}x)")
+
+    print("\nRegressions:" if regressions else "\nNo regressions found.")
+    for line in regressions:
+        print(f"  {line}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AgriHub load benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="farm counts to benchmark")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    run_benchmark(args.sizes, args.seed, args.output)
+    if args.baseline:
+        compare_results(args.baseline, args.output)
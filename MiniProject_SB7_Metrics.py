@@ -0,0 +1,304 @@
+# metrics - in-process latency histograms & counters for the hot paths (geocoding, distance, nearest center,
+# model inference, db calls, map rendering), exported as prometheus text or json to a file or http endpoint,
+# plus level-gated, sampled logging that replaces per-call prints in the services
+
+import bisect
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+# Upper bounds (seconds) of the latency buckets, from 10 microseconds to 10 seconds
+LATENCY_BUCKETS = [0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram"""
+
+    def __init__(self, buckets: List[float] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Approximate quantile, reported as the upper bound of the bucket it falls in"""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "sum_seconds": self.sum,
+            "mean_seconds": self.sum / self.count if self.count else 0.0,
+            "max_seconds": self.max,
+            "p50_seconds": self.quantile(0.5),
+            "p99_seconds": self.quantile(0.99),
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe store of latency histograms and counters, keyed by operation name"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float, error: bool = False):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+            if error:
+                self.counters[f"{name}.errors"] = self.counters.get(f"{name}.errors", 0) + 1
+
+    def increment(self, name: str, value: float = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "latency": {name: h.to_dict() for name, h in sorted(self.histograms.items())},
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """Render in the Prometheus text exposition format"""
+        lines = [
+            "# HELP agrihub_latency_seconds Latency of instrumented AgriHub operations",
+            "# TYPE agrihub_latency_seconds histogram",
+        ]
+        with self._lock:
+            for name, h in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(h.buckets, h.counts):
+                    cumulative += count
+                    lines.append(f'agrihub_latency_seconds_bucket{{op="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'agrihub_latency_seconds_bucket{{op="{name}",le="+Inf"}} {h.count}')
+                lines.append(f'agrihub_latency_seconds_sum{{op="{name}"}} {h.sum}')
+                lines.append(f'agrihub_latency_seconds_count{{op="{name}"}} {h.count}')
+            lines.append("# HELP agrihub_events_total Counters of AgriHub events")
+            lines.append("# TYPE agrihub_events_total counter")
+            for name, value in sorted(self.counters.items()):
+                lines.append(f'agrihub_events_total{{event="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """Write the metrics to a file (.json for JSON, anything else for Prometheus text), atomically"""
+        content = self.to_json() if path.endswith(".json") else self.to_prometheus()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+
+# Process-wide registry; set AGRIHUB_METRICS=0 to turn every probe into a no-op
+metrics = MetricsRegistry(enabled=os.environ.get("AGRIHUB_METRICS", "1") != "0")
+
+
+def set_enabled(enabled: bool):
+    metrics.enabled = enabled
+
+
+def increment(name: str, value: float = 1):
+    metrics.increment(name, value)
+
+
+@contextmanager
+def track(name: str):
+    """Context manager recording the latency of the enclosed block under `name`"""
+    if not metrics.enabled:
+        yield
+        return
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except Exception:
+        error = True
+        raise
+    finally:
+        metrics.observe(name, time.perf_counter() - start, error)
+
+
+def timed(name: str):
+    """Decorator recording the latency of every call to the wrapped function under `name`"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            error = False
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                error = True
+                raise
+            finally:
+                metrics.observe(name, time.perf_counter() - start, error)
+        return wrapper
+    return decorator
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            body, content_type = metrics.to_json(), "application/json"
+        elif self.path.startswith("/metrics"):
+            body, content_type = metrics.to_prometheus(), "text/plain; version=0.0.4"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int = 9100, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve /metrics (Prometheus text) and /metrics.json from a background thread"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+
+def print_report(registry: Optional[MetricsRegistry] = None):
+    """Print a latency summary, slowest total time first"""
+    snapshot = (registry or metrics).snapshot()
+    print("\nLatency Report:")
+    rows = sorted(snapshot["latency"].items(), key=lambda item: item[1]["sum_seconds"], reverse=True)
+    for name, data in rows:
+        print(f"{name}: {data['count']} calls, total {data['sum_seconds']:.3f}s, "
+              f"mean {data['mean_seconds'] * 1000:.3f} ms, p99 <= {data['p99_seconds'] * 1000:.3f} ms")
+    for name, value in snapshot["counters"].items():
+        print(f"{name}: {value}")
+
+
+class KeyValueFormatter(logging.Formatter):
+    """Structured log lines: ts=... level=... logger=... event=... key=value ... msg=\"...\""""
+
+    def format(self, record):
+        parts = [
+            f"ts={self.formatTime(record, '%Y-%m-%dT%H:%M:%S')}",
+            f"level={record.levelname}",
+            f"logger={record.name}",
+        ]
+        event = getattr(record, "event", None)
+        if event:
+            parts.append(f"event={event}")
+        for key, value in getattr(record, "fields", {}).items():
+            parts.append(f"{key}={value}")
+        parts.append(f"msg={json.dumps(record.getMessage())}")
+        return " ".join(parts)
+
+
+def configure_logging(level: str = None, structured: bool = False):
+    """Set up the agrihub logger; level defaults to AGRIHUB_LOG_LEVEL or WARNING (quiet bulk runs)"""
+    level = level or os.environ.get("AGRIHUB_LOG_LEVEL", "WARNING")
+    logger = logging.getLogger("agrihub")
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    logger.propagate = False
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    handler = logging.StreamHandler()
+    handler.setFormatter(KeyValueFormatter() if structured else logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    return logger
+
+
+def get_logger(name: str) -> logging.Logger:
+    logger = logging.getLogger("agrihub")
+    if not logger.handlers:
+        configure_logging()
+    return logging.getLogger(f"agrihub.{name}")
+
+
+class LazyMessage:
+    """Defers building an expensive log message until a handler actually formats it"""
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+
+    def __str__(self):
+        return self.func(*self.args)
+
+
+class EventLogger:
+    """Counts every event and logs only a sample of them: the first `first` occurrences of each event,
+    then one in every `every`. Messages use logging's lazy %-formatting and are skipped entirely when
+    the level is disabled, so high-frequency events cost a dict update"""
+
+    def __init__(self, logger: logging.Logger, first: int = 10, every: int = 1000):
+        self.logger = logger
+        self.first = first
+        self.every = every
+        self.counts: Dict[str, int] = {}
+
+    def enabled_for(self, level: int) -> bool:
+        return self.logger.isEnabledFor(level)
+
+    def event(self, name: str, msg: str, *args, level: int = logging.DEBUG, sample: bool = True, **fields):
+        count = self.counts.get(name, 0) + 1
+        self.counts[name] = count
+        if not self.logger.isEnabledFor(level):
+            return
+        if sample and count > self.first and count % self.every:
+            return
+        if sample and count > self.first:
+            fields["occurrence"] = count
+        self.logger.log(level, msg, *args, extra={"event": name, "fields": fields})
+
+    def summary(self) -> Dict[str, int]:
+        return dict(sorted(self.counts.items()))
+
+    def log_summary(self, level: int = logging.INFO):
+        """One line per event type instead of one line per occurrence"""
+        for name, count in self.summary().items():
+            self.logger.log(level, "%s: %d events", name, count, extra={"event": "summary", "fields": {"name": name, "count": count}})
+
+    def reset(self):
+        self.counts.clear()
@@ -0,0 +1,508 @@
+# http api - local asyncio server exposing recommendations, nearest centers, coverage statistics & ledger
+# transactions; model and GIS work runs on a process pool that loads the models once per worker, plus a load generator
+
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+
+from MiniProject_SB3b_MLcore import SolutionRecommender, load_solution_dataset
+from MiniProject_SB3c_SharedModels import publish_recommender, attach_recommender
+from MiniProject_SB3g_FeatureEncoder import UnknownCategoryError
+from MiniProject_SB5_DataEngineer import DB_PATH, init_db, ensure_farmer, LedgerWriter
+from MiniProject_SB7_Metrics import metrics, track, increment, get_logger
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MICROBIAL_DATASET_PATH = os.path.join(BASE_DIR, "MicrobialSolutionHaryanaDataset.xlsx")
+FERTILIZER_DATASET_PATH = os.path.join(BASE_DIR, "FertilizerHaryanaDataSet.xlsx")
+SNAPSHOT_PATH = "agrihub_registry.snap"
+DEFAULT_HOST, DEFAULT_PORT = "127.0.0.1", 8080
+MAX_BODY = 1 << 20
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+           500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+    def __reduce__(self):
+        # Raised inside pool workers; keep the status when pickled back to the server
+        return HTTPError, (self.status, str(self))
+
+
+# Worker side - each pool process trains the recommender and restores the GIS registry once, in the initializer
+_worker: Dict = {}
+
+
+def _init_worker(snapshot_path: Optional[str], df_micro, df_fert, manifest: Optional[Dict], joint: Optional[str],
+                 unknown: Union[str, int]):
+    from MiniProject_SB1b_GISserviceTest import HaryanaGISService
+    from MiniProject_SB3b_MLcore import SolutionRecommender
+
+    if manifest is not None:
+        # Forests and encoders published by the server process: attach instead of training
+        _worker["recommender"] = attach_recommender(manifest, df_micro, df_fert, unknown)
+    else:
+        _worker["recommender"] = SolutionRecommender(df_micro, df_fert, joint=joint, unknown=unknown)
+    _worker["gis"] = HaryanaGISService.from_snapshot(snapshot_path) if snapshot_path else None
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _recommend(district: str, crop: str, soil_type: str, season: str, land_size: float, unit: str) -> Dict:
+    try:
+        return _worker["recommender"].recommend(district, crop, soil_type, season, land_size, unit)
+    except UnknownCategoryError as e:
+        raise HTTPError(400, str(e))
+
+
+def _gis():
+    if _worker.get("gis") is None:
+        raise HTTPError(404, "No GIS registry loaded")
+    return _worker["gis"]
+
+
+def _nearest_centers(latitude: float, longitude: float, radius: float, service: Optional[str],
+                     k: Optional[int]) -> List[Dict]:
+    from MiniProject_SB1b_GISserviceTest import Location
+
+    gis = _gis()
+    location = Location(latitude, longitude)
+    if k is not None:
+        found = gis.find_k_nearest_centers(location, k, [service] if service else None)
+    else:
+        found = gis.find_nearest_centers(location, radius, service)
+    return [{"center_id": center.center_id, "distance_km": round(distance, 3), "district": center.location.district,
+             "latitude": center.location.latitude, "longitude": center.location.longitude,
+             "services": center.services, "operating_hours": center.operating_hours,
+             "contact_info": center.contact_info, "inventory": center.inventory} for distance, center in found]
+
+
+def _coverage() -> Dict:
+    return _gis().calculate_coverage_statistics()
+
+
+def _field(params: Dict, name: str, cast=str, default=None):
+    value = params.get(name, default)
+    if value is None:
+        raise HTTPError(400, f"Missing field: {name}")
+    try:
+        value = cast(value)
+    except (TypeError, ValueError, OverflowError):
+        raise HTTPError(400, f"Invalid {name}: {value!r}")
+    # json.loads takes NaN / Infinity and float() takes "nan" / "inf"; neither is a usable number
+    if isinstance(value, float) and not math.isfinite(value):
+        raise HTTPError(400, f"Invalid {name}: {value!r}")
+    return value
+
+
+class AgriHubAPI:
+    """JSON-over-HTTP/1.1 front end (keep-alive, no framework) for the recommendation, GIS and ledger cores.
+
+    The event loop only parses requests and writes responses. Recommendations and GIS queries run on a
+    spawn-context ProcessPoolExecutor whose workers restore the registry snapshot once at startup, and
+    sales go to the LedgerWriter group-commit thread, so no request blocks the loop. With shared_models
+    the forests are trained once here and published in shared memory, which every worker attaches to;
+    otherwise each worker trains its own copy.
+
+        POST /recommend               {"district", "crop", "soil_type", "season", "land_size", "unit"}
+        GET  /centers/nearest         ?lat=&lon=&radius=10&service=&k=
+        GET  /coverage
+        POST /ledger/farmers          {"name"}
+        POST /ledger/transactions     {"farmer_name", "amount"}
+        GET  /health, /metrics"""
+
+    def __init__(self, snapshot_path: Optional[str] = SNAPSHOT_PATH, workers: Optional[int] = None,
+                 db_path: str = DB_PATH, micro_path: str = MICROBIAL_DATASET_PATH,
+                 fert_path: str = FERTILIZER_DATASET_PATH, shared_models: bool = True, joint: Optional[str] = None,
+                 unknown: Union[str, int] = "error"):
+        self.workers = workers or os.cpu_count() or 1
+        self.db_path = db_path
+        df_micro, df_fert = load_solution_dataset(micro_path), load_solution_dataset(fert_path)
+        self.model_store = None
+        if shared_models:
+            self.model_store = publish_recommender(SolutionRecommender(df_micro, df_fert, joint=joint, unknown=unknown))
+        manifest = self.model_store.manifest if self.model_store is not None else None
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=_init_worker,
+                                        initargs=(snapshot_path, df_micro, df_fert, manifest, joint, unknown))
+        init_db(db_path)
+        self.ledger = LedgerWriter(db_path)
+        self.logger = get_logger("api")
+        self.routes = {
+            ("POST", "/recommend"): self.recommend,
+            ("GET", "/centers/nearest"): self.nearest_centers,
+            ("GET", "/coverage"): self.coverage,
+            ("POST", "/ledger/farmers"): self.register_farmer,
+            ("POST", "/ledger/transactions"): self.transaction,
+            ("GET", "/health"): self.health,
+            ("GET", "/metrics"): self.metrics,
+        }
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, func, *args)
+
+    async def warm_up(self):
+        """Start every worker (and wait for its models) before accepting traffic"""
+        pids = await asyncio.gather(*(self._run(_ping) for _ in range(self.workers)))
+        self.logger.info("%d API workers ready", len(set(pids)))
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> asyncio.AbstractServer:
+        await self.warm_up()
+        self.server = await asyncio.start_server(self._connection, host, port, backlog=1024)
+        self.logger.info("AgriHub API listening on http://%s:%d", host, port)
+        return self.server
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        self.ledger.close()
+        self.pool.shutdown()
+        if self.model_store is not None:
+            self.model_store.close()
+
+    # Handlers: params is the merged query string / JSON body
+    async def recommend(self, params: Dict):
+        return await self._run(_recommend, _field(params, "district"), _field(params, "crop"),
+                               _field(params, "soil_type"), _field(params, "season"),
+                               _field(params, "land_size", float, 1.0), _field(params, "unit", str, "Acre"))
+
+    async def nearest_centers(self, params: Dict):
+        k = _field(params, "k", int) if params.get("k") else None
+        return await self._run(_nearest_centers, _field(params, "lat", float), _field(params, "lon", float),
+                               _field(params, "radius", float, 10), params.get("service") or None, k)
+
+    async def coverage(self, params: Dict):
+        return await self._run(_coverage)
+
+    async def register_farmer(self, params: Dict):
+        name = _field(params, "name")
+        created = await asyncio.get_running_loop().run_in_executor(None, ensure_farmer, name, self.db_path)
+        return {"name": name, "created": created}
+
+    async def transaction(self, params: Dict):
+        farmer_name, amount = _field(params, "farmer_name"), _field(params, "amount", float)
+        if not (math.isfinite(amount) and amount > 0):
+            raise HTTPError(400, f"Amount must be positive, got {amount}")
+        result = await asyncio.wrap_future(self.ledger.submit(farmer_name, amount))
+        if result is None:
+            raise HTTPError(404, f"Farmer not found: {farmer_name}")
+        reward, cashback, balance = result
+        return {"farmer_name": farmer_name, "amount": amount, "reward": reward, "cashback": cashback,
+                "wallet_balance": balance}
+
+    async def health(self, params: Dict):
+        return {"status": "ok", "workers": self.workers}
+
+    async def metrics(self, params: Dict):
+        return metrics.snapshot()
+
+    async def dispatch(self, method: str, target: str, body: bytes) -> Tuple[int, object]:
+        url = urlsplit(target)
+        handler = self.routes.get((method, url.path))
+        if handler is None:
+            known = any(path == url.path for _, path in self.routes)
+            return (405, {"error": f"{method} not allowed"}) if known else (404, {"error": f"No route {url.path}"})
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            if body:
+                try:
+                    payload = json.loads(body)
+                except ValueError as e:  # JSONDecodeError, or bytes that are not UTF-8
+                    raise HTTPError(400, f"Invalid JSON body: {e}")
+                if not isinstance(payload, dict):
+                    raise HTTPError(400, "Body must be a JSON object")
+                params.update(payload)
+            with track(f"api{url.path.replace('/', '.')}"):
+                return 200, await handler(params)
+        except HTTPError as e:
+            return e.status, {"error": str(e)}
+        except Exception as e:
+            self.logger.exception("Request %s %s failed", method, url.path)
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+
+    async def _connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        increment("api.connections")
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    status, payload = 400, {"error": f"Invalid Content-Length: {headers['content-length']!r}"}
+                    keep_alive = False
+                elif length > MAX_BODY:
+                    status, payload = 413, {"error": "Body too large"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = await self.dispatch(method.upper(), target, body)
+                    connection = headers.get("connection", "").lower()
+                    keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+                data = json.dumps(payload).encode()
+                writer.write(f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(data)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def _unknown_policy(value: str) -> Union[str, int]:
+    """--unknown: a policy name or a class code"""
+    return int(value) if value.lstrip("-").isdigit() else value
+
+
+def ensure_snapshot(snapshot_path: str, farm_count: int, seed: int = 42) -> str:
+    """Build a synthetic registry (farms sampled from the datasets) and save it, unless the snapshot exists"""
+    if not os.path.exists(snapshot_path):
+        from MiniProject_SB1b_GISserviceTest import HaryanaGISService
+        from MiniProject_SB6_Benchmark import CENTERS_PER_DISTRICT, load_distributions, generate_farms, generate_centers
+
+        rng = np.random.default_rng(seed)
+        random.seed(seed)
+        service = HaryanaGISService()
+        farms = generate_farms(farm_count, rng, load_distributions(), service)
+        for center in generate_centers(CENTERS_PER_DISTRICT, rng, farms, service):
+            service.register_resource_center(center)
+        service.register_farms(farms)
+        service.save_snapshot(snapshot_path)
+    return snapshot_path
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, workers: Optional[int] = None,
+          snapshot_path: str = SNAPSHOT_PATH, farm_count: int = 10_000, db_path: str = DB_PATH,
+          shared_models: bool = True, joint: Optional[str] = None, unknown: Union[str, int] = "error"):
+    ensure_snapshot(snapshot_path, farm_count)
+    api = AgriHubAPI(snapshot_path, workers, db_path, shared_models=shared_models, joint=joint, unknown=unknown)
+
+    async def main():
+        await api.start(host, port)
+        stopping = asyncio.Event()
+        try:
+            # terminate() should shut the pool down too, not orphan its workers
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopping.set)
+        except NotImplementedError:
+            pass  # Windows: no loop signal handlers
+        print(f"AgriHub API listening on http://{host}:{port} with {api.workers} worker(s)", flush=True)
+        await stopping.wait()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.close()
+
+
+# Load generator - concurrent keep-alive clients replaying a request mix and reporting latency percentiles
+async def _request(reader, writer, method: str, path: str, body: Optional[Dict] = None) -> Tuple[int, bytes]:
+    data = json.dumps(body).encode() if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+def build_request_mix(count: int, seed: int = 42, farmers: int = 50,
+                      weights: Optional[Dict[str, float]] = None) -> List[Tuple[str, str, str, Optional[Dict]]]:
+    """(endpoint, method, path, body) requests: recommendations sampled from the dataset rows, nearest-center
+    queries at random points in Haryana, coverage reads and sales for the load-test farmers"""
+    from MiniProject_SB1c_DistanceKernels import HARYANA_BOUNDS
+    weights = weights or {"recommend": 0.4, "nearest": 0.3, "coverage": 0.05, "transaction": 0.25}
+    rows = load_solution_dataset(MICROBIAL_DATASET_PATH)[["District", "Crop", "Soil Type", "Season"]].dropna()
+    rows = rows.to_numpy().tolist()
+    rng = np.random.default_rng(seed)
+    names = list(weights)
+    kinds = rng.choice(len(names), size=count, p=np.array([weights[n] for n in names]) / sum(weights.values()))
+    b = HARYANA_BOUNDS
+    mix = []
+    for kind in kinds:
+        name = names[kind]
+        if name == "recommend":
+            district, crop, soil, season = rows[rng.integers(len(rows))]
+            mix.append((name, "POST", "/recommend", {"district": district, "crop": crop, "soil_type": soil,
+                                                    "season": season, "land_size": round(float(rng.uniform(1, 20)), 2),
+                                                    "unit": "Acre"}))
+        elif name == "nearest":
+            lat, lon = rng.uniform(b["min_lat"], b["max_lat"]), rng.uniform(b["min_lon"], b["max_lon"])
+            mix.append((name, "GET", f"/centers/nearest?lat={lat:.5f}&lon={lon:.5f}&k=3", None))
+        elif name == "coverage":
+            mix.append((name, "GET", "/coverage", None))
+        else:
+            mix.append((name, "POST", "/ledger/transactions",
+                        {"farmer_name": f"LT{rng.integers(farmers):04d}", "amount": round(float(rng.uniform(500, 5000)), 2)}))
+    return mix
+
+
+async def run_load(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, total: int = 2000, concurrency: int = 32,
+                   seed: int = 42, farmers: int = 50) -> Dict:
+    """Send `total` requests over `concurrency` keep-alive connections; p50 / p99 per endpoint and overall"""
+    for i in range(farmers):
+        reader, writer = await asyncio.open_connection(host, port)
+        await _request(reader, writer, "POST", "/ledger/farmers", {"name": f"LT{i:04d}"})
+        writer.close()
+
+    mix = build_request_mix(total, seed, farmers)
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    position = iter(range(len(mix)))
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for i in position:
+                endpoint, method, path, body = mix[i]
+                start = time.perf_counter()
+                status, _ = await _request(reader, writer, method, path, body)
+                latencies.setdefault(endpoint, []).append(time.perf_counter() - start)
+                if status != 200:
+                    errors[endpoint] = errors.get(endpoint, 0) + 1
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    def summary(values: List[float]) -> Dict:
+        ms = np.array(values) * 1000
+        return {"requests": len(ms), "p50_ms": round(float(np.percentile(ms, 50)), 3),
+                "p99_ms": round(float(np.percentile(ms, 99)), 3), "max_ms": round(float(ms.max()), 3)}
+
+    report = {"total": summary([v for values in latencies.values() for v in values]),
+              "requests_per_sec": round(total / elapsed, 1), "concurrency": concurrency,
+              "endpoints": {name: {**summary(values), "errors": errors.get(name, 0)}
+                            for name, values in sorted(latencies.items())}}
+    return report
+
+
+def print_load_report(report: Dict):
+    print(f"{report['total']['requests']} requests, concurrency {report['concurrency']}: "
+          f"{report['requests_per_sec']} req/s, p50 {report['total']['p50_ms']:.1f} ms, "
+          f"p99 {report['total']['p99_ms']:.1f} ms")
+    for name, data in report["endpoints"].items():
+        print(f"  {name}: {data['requests']} requests, p50 {data['p50_ms']:.1f} ms, p99 {data['p99_ms']:.1f} ms, "
+              f"{data['errors']} errors")
+
+
+def _wait_until_ready(host: str, port: int, process: subprocess.Popen, timeout: float = 300):
+    deadline = time.monotonic() + timeout
+
+    async def probe():
+        reader, writer = await asyncio.open_connection(host, port)
+        status, _ = await _request(reader, writer, "GET", "/health")
+        writer.close()
+        return status == 200
+
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"API server exited with code {process.returncode}")
+        try:
+            if asyncio.run(probe()):
+                return
+        except OSError:
+            time.sleep(0.5)
+    raise TimeoutError("API server did not become ready")
+
+
+# End-to-end test - start the server in a separate process and load it from this one
+def run_api_test(total: int = 2000, concurrency: int = 32, workers: Optional[int] = None, port: int = 8765):
+    print("Starting AgriHub API Load Test...\n")
+    with tempfile.TemporaryDirectory(prefix="agrihub_api_") as work_dir:
+        command = [sys.executable, os.path.abspath(__file__), "serve", "--port", str(port),
+                   "--snapshot", os.path.join(work_dir, "registry.snap"), "--db", os.path.join(work_dir, "ledger.db")]
+        if workers:
+            command += ["--workers", str(workers)]
+        process = subprocess.Popen(command, cwd=BASE_DIR)
+        try:
+            _wait_until_ready(DEFAULT_HOST, port, process)
+            report = asyncio.run(run_load(DEFAULT_HOST, port, total, concurrency))
+        finally:
+            process.terminate()
+            process.wait()
+    print_load_report(report)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AgriHub HTTP API")
+    commands = parser.add_subparsers(dest="command")
+    serve_parser = commands.add_parser("serve", help="run the API server")
+    serve_parser.add_argument("--host", default=DEFAULT_HOST)
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument("--workers", type=int, help="process pool size (default: cpu count)")
+    serve_parser.add_argument("--snapshot", default=SNAPSHOT_PATH, help="registry snapshot, built if missing")
+    serve_parser.add_argument("--farms", type=int, default=10_000, help="synthetic farms when building the snapshot")
+    serve_parser.add_argument("--db", default=DB_PATH, help="ledger database")
+    serve_parser.add_argument("--no-shared-models", action="store_true", help="train the models in every worker")
+    serve_parser.add_argument("--joint", choices=["pairs", "all"],
+                              help="multi-output forests: one per dataset (pairs) or one for all targets (all)")
+    serve_parser.add_argument("--unknown", type=_unknown_policy, default="error",
+                              help="unseen district / crop / soil / season: error (400), most_frequent or a class code")
+    load_parser = commands.add_parser("loadtest", help="load a running server and report p50 / p99 latency")
+    load_parser.add_argument("--host", default=DEFAULT_HOST)
+    load_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    load_parser.add_argument("--requests", type=int, default=2000)
+    load_parser.add_argument("--concurrency", type=int, default=32)
+    load_parser.add_argument("--output", help="write the report as JSON")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.host, args.port, args.workers, args.snapshot, args.farms, args.db, not args.no_shared_models,
+              args.joint, args.unknown)
+    elif args.command == "loadtest":
+        load_report = asyncio.run(run_load(args.host, args.port, args.requests, args.concurrency))
+        print_load_report(load_report)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(load_report, f, indent=2)
+    else:
+        run_api_test()